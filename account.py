@@ -0,0 +1,76 @@
+from cryptography.hazmat.primitives import serialization
+from descentracoin import DescentraCoin, to_base_units
+
+
+class Account:
+    """
+    Registro publico de una cuenta en la blockchain: direccion, clave publica (PEM), stake, flags de
+    stakeholder y validador y espacio IPFS. Es lo que se guarda en Blockchain.wallets y se envia a otros nodos;
+    las claves privadas solo estan en las wallets locales del nodo. El saldo esta en el registro de balances.
+    """
+
+    __slots__ = ("address", "public_key_pem", "is_stakeholder", "staked", "is_validator", "space", "_public_key")
+
+    def __init__(self, address, public_key_pem, is_stakeholder=False, staked=0, is_validator=False, space=None):
+        self.address = address
+        self.public_key_pem = public_key_pem  # bytes, la direccion es el SHA-256 de este PEM
+        self.is_stakeholder = is_stakeholder
+        self.staked = staked  # Cantidad en stake en unidades enteras
+        self.is_validator = is_validator
+        self.space = space
+        self._public_key = None  # Clave publica parseada, se carga al primer uso
+
+    @property
+    def staked_amount(self):
+        return DescentraCoin.from_base_units(self.staked)
+
+    @staked_amount.setter
+    def staked_amount(self, amount):
+        self.staked = to_base_units(amount.value)
+
+    @property
+    def public_key(self):
+        # Retorna None si el PEM recibido no es una clave valida, la transaccion se rechaza como firma invalida
+        if self._public_key is None and self.public_key_pem:
+            try:
+                self._public_key = serialization.load_pem_public_key(self.public_key_pem)
+            except ValueError:
+                return None
+        return self._public_key
+
+    @classmethod
+    def from_wallet(cls, wallet):
+        return cls(
+            address=wallet.address,
+            public_key_pem=wallet.public_key_pem(),
+            is_stakeholder=wallet.is_stakeholder,
+            staked=wallet.staked_units,
+            is_validator=wallet.is_validator,
+            space=wallet.space
+        )
+
+    def to_dict(self):
+        return {
+            "address": self.address,
+            "public_key": self.public_key_pem.decode('utf-8') if self.public_key_pem else None,
+            "is_stakeholder": self.is_stakeholder,
+            "staked_amount": self.staked_amount.to_dict(),
+            "is_validator": self.is_validator,
+            "space": self.space
+        }
+
+    @classmethod
+    def from_dict(cls, account_dict):
+        # Acepta tambien el diccionario completo de una wallet (bloques anteriores), los demas campos se ignoran
+        public_key = account_dict.get("public_key")
+        return cls(
+            address=account_dict["address"],
+            public_key_pem=public_key.encode('utf-8') if public_key else None,
+            is_stakeholder=account_dict.get("is_stakeholder", False),
+            staked=to_base_units(DescentraCoin.from_dict(account_dict.get("staked_amount", {})).value),
+            is_validator=account_dict.get("is_validator", False),
+            space=account_dict.get("space")
+        )
+
+    def __str__(self):
+        return f"\nAccount Address: \n{self.address}, Staked: {self.staked}"
@@ -0,0 +1,147 @@
+import json
+from transaction import Transaction
+
+ADDRESS_INDEX_FILE = "address_index.jsonl"  # Registro de solo anadir del indice, una linea JSON por bloque indexado
+
+
+class AddressIndex:
+    """
+    Indice por direccion de las transacciones incluidas en la cadena.
+    Se mantiene al anadir cada bloque, de forma que el balance y el historial de una direccion
+    no requieren recorrer toda la blockchain.
+    Con path, cada bloque indexado se anade a un registro en disco (tx_id, remitente, destinatario y cantidad
+    de sus transacciones); al reiniciar, load() lo lee sin decodificar los bloques y solo indexa los posteriores.
+    """
+
+    def __init__(self, path=None):
+        self.entries = {}  # address -> lista de (block_index, tx_position, delta) en orden de la cadena
+        self.balances = {}  # address -> saldo acumulado a partir de las transacciones de la cadena
+        self.block_addresses = []  # Por cada bloque indexado, direcciones involucradas (para poder deshacerlo)
+        self.tx_locations = {}  # tx_id -> (block_index, tx_position), para servir pruebas de inclusion
+        self.block_tx_ids = []  # Por cada bloque indexado, sus tx_id (para poder deshacerlo)
+        self.path = path
+        self.offsets = []  # Por cada bloque en el registro, offset de su linea
+        self.file = open(path, "a+b") if path else None
+
+    def _clear(self):
+        self.entries = {}
+        self.balances = {}
+        self.block_addresses = []
+        self.tx_locations = {}
+        self.block_tx_ids = []
+
+    def index_block(self, block):
+        rows = []
+        for encoded in block.transactions:
+            transaction = Transaction.decode(encoded)
+            rows.append((transaction.tx_id, transaction.sender, transaction.recipient, transaction.amount_units))
+        self._apply(block.index, rows)
+        if self.file is not None:
+            self._write(block.index, block.hash, rows)
+
+    def _apply(self, block_index, rows):
+        touched = []
+        tx_ids = []
+        for position, (tx_id, sender, recipient, amount) in enumerate(rows):
+            self.tx_locations[tx_id] = (block_index, position)
+            tx_ids.append(tx_id)
+            self._add_entry(sender, block_index, position, -amount)
+            self._add_entry(recipient, block_index, position, amount)
+            touched.append(sender)
+            touched.append(recipient)
+        self.block_addresses.append(touched)
+        self.block_tx_ids.append(tx_ids)
+
+    def _add_entry(self, address, block_index, position, delta):
+        self.entries.setdefault(address, []).append((block_index, position, delta))
+        self.balances[address] = self.balances.get(address, 0) + delta
+
+    def _write(self, block_index, block_hash, rows):
+        self.file.seek(0, 2)
+        self.offsets.append(self.file.tell())
+        record = {"index": block_index, "hash": block_hash, "transactions": rows}
+        self.file.write(json.dumps(record, separators=(",", ":")).encode('utf-8') + b"\n")
+        self.file.flush()
+
+    def _truncate(self, height):
+        # Deja en el registro solo los bloques con indice < height
+        if self.file is not None and len(self.offsets) > height:
+            self.file.truncate(self.offsets[height])
+            del self.offsets[height:]
+            self.file.flush()
+
+    def rollback_to(self, height):
+        # Elimina del indice los bloques con indice >= height, el coste depende solo de los bloques eliminados
+        while len(self.block_addresses) > height:
+            for tx_id in self.block_tx_ids.pop():
+                self.tx_locations.pop(tx_id, None)
+            for address in reversed(self.block_addresses.pop()):
+                _, _, delta = self.entries[address].pop()
+                self.balances[address] -= delta
+                if not self.entries[address]:
+                    del self.entries[address]
+                    del self.balances[address]
+        self._truncate(height)
+
+    def rebuild(self, chain):
+        self._clear()
+        self._truncate(0)
+        for block in chain:
+            self.index_block(block)
+
+    def load(self, chain):
+        # Carga el registro en disco y solo indexa los bloques de la cadena posteriores al ultimo registrado.
+        # Se descartan una linea incompleta (escritura interrumpida) y los registros de otra cadena.
+        # Retorna el numero de bloques cargados del registro
+        self._clear()
+        self.offsets = []
+        records = []
+        self.file.seek(0)
+        offset = 0
+        for line in self.file:
+            if not line.endswith(b"\n") or len(records) >= len(chain):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if record.get("index") != len(records):
+                break
+            records.append(record)
+            self.offsets.append(offset)
+            offset += len(line)
+
+        # Los hashes de la cadena se encadenan: si el ultimo bloque registrado coincide, coinciden todos los anteriores
+        if records and records[-1]["hash"] != chain[len(records) - 1].hash:
+            records = []
+            self.offsets = []
+            offset = 0
+        self.file.truncate(offset)
+        self.file.flush()
+
+        for record in records:
+            self._apply(record["index"], [tuple(row) for row in record["transactions"]])
+        for height in range(len(records), len(chain)):
+            self.index_block(chain[height])
+        return len(records)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def get_balance(self, address):
+        return self.balances.get(address, 0)
+
+    def count(self, address):
+        return len(self.entries.get(address, []))
+
+    def get_tx_location(self, tx_id):
+        # (block_index, tx_position) de una transaccion incluida en la cadena, None si no esta
+        return self.tx_locations.get(tx_id)
+
+    def get_positions(self, address, offset=0, limit=None):
+        # Posiciones (block_index, tx_position) de las transacciones de una direccion, paginadas
+        entries = self.entries.get(address, [])
+        end = len(entries) if limit is None else offset + limit
+        return [(block_index, position) for block_index, position, _ in entries[offset:end]]
@@ -0,0 +1,411 @@
+import logging
+import random
+import time
+from descentracoin import DescentraCoin
+from validator_sampler import ValidatorSampler
+
+
+# Seleccion de validador ---------------------------------------------------------
+
+class StakeWallet:
+    # Wallet minima con el stake, evita generar claves para miles de validadores
+    def __init__(self, staked_amount):
+        self.staked_amount = DescentraCoin(staked_amount)
+
+
+def choose_validator_linear(wallets, validators):
+    # Implementacion anterior de Blockchain.choose_validator: lista de stakes y recorrido acumulado en cada bloque
+    stakes = [wallets[address].staked_amount.value for address in validators]
+    total_stake_value = sum(stakes)
+    pick = random.uniform(0, total_stake_value)
+    current = 0
+    for i, address in enumerate(validators):
+        current += stakes[i]
+        if current > pick:
+            return address
+    return None
+
+
+def benchmark_choose_validator(num_validators=10000, rounds=2000):
+    print(f"\nSeleccion de validador: {num_validators} validadores, {rounds} bloques")
+    validators = [f"{i:064x}" for i in range(num_validators)]
+    wallets = {address: StakeWallet(random.randint(100, 10000)) for address in validators}
+
+    sampler = ValidatorSampler()
+    start = time.perf_counter()
+    for address in validators:
+        sampler.set_weight(address, wallets[address].staked_amount.value)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        choose_validator_linear(wallets, validators)
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        sampler.sample()
+    sampler_time = time.perf_counter() - start
+
+    # Cambios de stake entre bloques (Staking / Unstaking de validadores)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        sampler.set_weight(random.choice(validators), random.randint(100, 10000))
+    update_time = time.perf_counter() - start
+
+    print(f"Construccion del arbol de Fenwick: {build_time * 1000:.1f} ms")
+    print(f"Lineal:  {linear_time / rounds * 1e6:.1f} us por seleccion")
+    print(f"Fenwick: {sampler_time / rounds * 1e6:.1f} us por seleccion ({linear_time / sampler_time:.0f}x)")
+    print(f"Fenwick: {update_time / rounds * 1e6:.1f} us por actualizacion de stake")
+
+
+# Deserializacion de la blockchain ----------------------------------------------
+
+def build_sample_blockchain(num_wallets=5):
+    from blockchain import Blockchain
+    from wallet import Wallet
+    blockchain = Blockchain()
+    wallets = [Wallet(blockchain, 100) for _ in range(num_wallets)]
+    blockchain.validate_and_create_block(blockchain.wallets["V" * 64])
+    for sender, recipient in zip(wallets, wallets[1:]):
+        sender.send_transaction(recipient.address, DescentraCoin(1))
+    blockchain.validate_and_create_block(blockchain.wallets["V" * 64])
+    return blockchain
+
+
+def benchmark_from_dict(num_wallets=5, rounds=50):
+    from blockchain import Blockchain
+    logging.disable(logging.INFO)  # Los logs de cada transaccion dominarian la medicion
+    data = build_sample_blockchain(num_wallets).to_dict()
+    print(f"\nBlockchain.from_dict: {len(data['wallets'])} wallets, {len(data['chain'])} bloques, {rounds} repeticiones")
+
+    # Camino anterior: se construye el genesis (claves y transacciones) y despues se reemplaza
+    start = time.perf_counter()
+    for _ in range(rounds):
+        Blockchain().load_dict(data)
+    with_genesis_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        Blockchain.from_dict(data)
+    from_dict_time = time.perf_counter() - start
+    logging.disable(logging.NOTSET)
+
+    print(f"Con genesis: {with_genesis_time / rounds * 1000:.2f} ms por actualizacion")
+    print(f"Sin genesis: {from_dict_time / rounds * 1000:.2f} ms por actualizacion "
+          f"({(with_genesis_time - from_dict_time) / rounds * 1000:.2f} ms menos)")
+
+
+def benchmark_wallet_round_trip(num_wallets=5, rounds=200):
+    from wallet import Wallet
+    from cryptography.hazmat.primitives import serialization
+    logging.disable(logging.INFO)
+    blockchain = build_sample_blockchain(num_wallets)
+    wallet_dicts = [wallet.to_dict() for wallet in blockchain.local_wallets.values()]
+    logging.disable(logging.NOTSET)
+    print(f"\nWallet.from_dict + to_dict: {len(wallet_dicts)} wallets, {rounds} repeticiones")
+
+    # Camino anterior: parsear las dos claves y volver a serializarlas en cada ida y vuelta
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for wallet_dict in wallet_dicts:
+            public_key = serialization.load_pem_public_key(wallet_dict["public_key"].encode("utf-8"))
+            public_key.public_bytes(encoding=serialization.Encoding.PEM,
+                                    format=serialization.PublicFormat.SubjectPublicKeyInfo)
+            if wallet_dict.get("private_key"):
+                private_key = serialization.load_pem_private_key(wallet_dict["private_key"].encode("utf-8"), password=None)
+                private_key.private_bytes(encoding=serialization.Encoding.PEM,
+                                          format=serialization.PrivateFormat.PKCS8,
+                                          encryption_algorithm=serialization.NoEncryption())
+    eager_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for wallet_dict in wallet_dicts:
+            Wallet.from_dict(wallet_dict, blockchain).to_dict()
+    lazy_time = time.perf_counter() - start
+
+    per_round = 1000 / rounds
+    print(f"Claves parseadas: {eager_time * per_round:.3f} ms por ronda (solo las claves)")
+    print(f"Claves en PEM:    {lazy_time * per_round:.3f} ms por ronda (wallet completa)")
+
+
+def benchmark_account_registry(num_wallets=5, copies=2000):
+    import json
+    import tracemalloc
+    from wallet import Wallet
+    from account import Account
+    logging.disable(logging.INFO)
+    blockchain = build_sample_blockchain(num_wallets)
+    logging.disable(logging.NOTSET)
+    wallet_dicts = [wallet.to_dict() for wallet in blockchain.local_wallets.values()]
+    account_dicts = [account.to_dict() for account in blockchain.wallets.values()]
+    print(f"\nRegistro de cuentas: {len(account_dicts)} cuentas, {copies} copias en memoria")
+
+    wallet_size = len(json.dumps(wallet_dicts)) / len(wallet_dicts)
+    account_size = len(json.dumps(account_dicts)) / len(account_dicts)
+    print(f"Wallet completa: {wallet_size:.0f} bytes por cuenta en to_dict")
+    print(f"Cuenta publica:  {account_size:.0f} bytes por cuenta en to_dict")
+
+    # Memoria por cuenta del registro: wallets completas (claves parseadas) frente a cuentas con __slots__
+    def measure(build):
+        tracemalloc.start()
+        objects = [build(i) for i in range(copies)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+        return size / copies
+
+    def build_wallet(i):
+        wallet = Wallet.from_dict(wallet_dicts[i % len(wallet_dicts)], blockchain)
+        wallet.public_key  # Antes las claves se parseaban al deserializar
+        wallet.private_key
+        return wallet
+
+    wallet_memory = measure(build_wallet)
+    account_memory = measure(lambda i: Account.from_dict(account_dicts[i % len(account_dicts)]))
+    print(f"Wallet completa: {wallet_memory:.0f} bytes por cuenta en memoria")
+    print(f"Cuenta publica:  {account_memory:.0f} bytes por cuenta en memoria")
+
+
+# Representacion compacta de transacciones y bloques --------------------------------
+
+class LegacyTransaction:
+    # Mismos atributos que Transaction antes de __slots__, cada instancia con su __dict__
+    def __init__(self, transaction):
+        self.sender = transaction.sender
+        self.recipient = transaction.recipient
+        self.amount = transaction.amount
+        self._signing_bytes = bytes(transaction.signing_bytes())
+        self._digest = transaction.digest
+        self._encoded = transaction.encode()
+        self._tx_id = transaction.tx_id
+        self._signature = transaction.signature
+        self.type = transaction.type
+        self.timestamp = transaction.timestamp
+        self.new_Wallet = transaction.new_Wallet
+        self.file_size = transaction.file_size
+
+
+def benchmark_transaction_memory(num_transactions=20000):
+    import os
+    import tracemalloc
+    from transaction import Transaction
+    from transaction_buffer import TransactionBuffer
+    encoded = [
+        Transaction(os.urandom(32).hex(), os.urandom(32).hex(), None, "regular", base_units=1 + i, timestamp=time.time(), signature=os.urandom(71)).encode()
+        for i in range(num_transactions)
+    ]
+    print(f"\nMemoria por transaccion: {num_transactions} transacciones de {len(encoded[0])} bytes codificadas")
+
+    def measure(build):
+        tracemalloc.start()
+        objects = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+        return size / num_transactions
+
+    # Transacciones de un bloque: una lista de bytes frente a un buffer contiguo con offsets
+    list_bytes = measure(lambda: [bytes(bytearray(e)) for e in encoded])
+    buffer_bytes = measure(lambda: TransactionBuffer.from_encoded(encoded))
+    print(f"Bloque, lista de bytes:   {list_bytes:.0f} bytes por transaccion")
+    print(f"Bloque, buffer contiguo:  {buffer_bytes:.0f} bytes por transaccion")
+
+    # Transacciones decodificadas con tx_id y digest calculados (mempool, reconstruccion del estado)
+    def decode_all(wrap):
+        decoded = []
+        for e in encoded:
+            transaction = Transaction.decode(e)
+            transaction.tx_id, transaction.digest
+            decoded.append(wrap(transaction))
+        return decoded
+
+    legacy_bytes = measure(lambda: decode_all(LegacyTransaction))
+    slots_bytes = measure(lambda: decode_all(lambda transaction: transaction))
+    print(f"Decodificada, __dict__:   {legacy_bytes:.0f} bytes por transaccion")
+    print(f"Decodificada, __slots__:  {slots_bytes:.0f} bytes por transaccion")
+
+
+# Conexiones HTTP con los peers -------------------------------------------------------
+
+def start_peer_server():
+    # Servidor HTTP/1.1 local que responde como /transaction de un peer, retorna (servidor, url base)
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class PeerHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Cabeceras y cuerpo se escriben por separado
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.server.request_count += 1
+            body = b'{"message": "ok"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PeerHandler)
+    server.request_count = 0  # Peticiones recibidas
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def benchmark_peer_connections(num_requests=500):
+    import requests
+    from http_pool import HTTPSessionPool
+    server, base_url = start_peer_server()
+    url = f"{base_url}/transaction"
+    payload = {"sender": "0" * 64, "recipient": "1" * 64, "amount": {"value": 1.0}}
+    print(f"\nEnvio de {num_requests} transacciones a un peer local")
+
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        requests.post(url, json=payload, timeout=2)
+    fresh_time = time.perf_counter() - start
+
+    pool = HTTPSessionPool()
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        pool.post(url, json=payload, timeout=2)
+    pooled_time = time.perf_counter() - start
+    reuse_rate = pool.stats()["reuse_rate"]
+    pool.close()
+    server.shutdown()
+    server.server_close()
+
+    print(f"Conexion nueva por peticion: {fresh_time * 1000 / num_requests:.3f} ms por peticion")
+    print(f"Sesion keep-alive:           {pooled_time * 1000 / num_requests:.3f} ms por peticion (reutilizacion {reuse_rate:.1%})")
+
+
+# Difusion de transacciones: gossip frente a envio a todos los nodos --------------------
+
+class SimulatedTransport:
+    # Envios de un nodo de la simulacion: se entregan tras una latencia aleatoria por salto
+    def __init__(self, network, node_id):
+        self.network = network
+        self.node_id = node_id
+
+    def submit(self, peer, path, payload):
+        self.network.schedule(self.node_id, peer["id"], path, payload)
+        return True
+
+
+class SimulatedNetwork:
+    # Red en proceso con reloj simulado: cada mensaje tarda entre min_ms y max_ms en llegar a su destino
+    def __init__(self, num_nodes, fanout, ttl, min_ms=5.0, max_ms=40.0, seed=1):
+        from gossip import GossipRelay
+        self.rng = random.Random(seed)
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.now = 0.0
+        self.events = []
+        self.sequence = 0
+        self.messages = 0
+        self.egress = {}
+        self.node_ids = [f"node{n}" for n in range(num_nodes)]
+        self.relays = {node_id: GossipRelay(SimulatedTransport(self, node_id), fanout=fanout, ttl=ttl, rng=random.Random(seed + n))
+                       for n, node_id in enumerate(self.node_ids)}
+        self.peers = {node_id: [{"id": other} for other in self.node_ids if other != node_id] for node_id in self.node_ids}
+
+    def schedule(self, sender, target, path, payload):
+        import heapq
+        self.sequence += 1
+        self.messages += 1
+        self.egress[sender] = self.egress.get(sender, 0) + 1
+        arrival = self.now + self.rng.uniform(self.min_ms, self.max_ms)
+        heapq.heappush(self.events, (arrival, self.sequence, target, path, payload))
+
+    def run(self, origin, payload):
+        # Difunde payload desde origin y retorna el instante (ms) en que cada nodo lo recibio
+        import heapq
+        from gossip import GossipRelay
+        message_id = GossipRelay.payload_id(payload)
+        delivered = {origin: 0.0}
+        self.relays[origin].publish(self.peers[origin], "transaction", message_id, payload)
+        while self.events:
+            self.now, _, target, path, message = heapq.heappop(self.events)
+            relay = self.relays[target]
+            if relay.receive(message_id):
+                delivered[target] = self.now
+                relay.relay(self.peers[target], path, message)
+        return delivered
+
+
+def benchmark_gossip_propagation(num_nodes=200, fanout=4, ttl=8, rounds=20):
+    print(f"\nDifusion de una transaccion en {num_nodes} nodos (fanout {fanout}, TTL {ttl}, {rounds} rondas)")
+    payload = {"sender": "0" * 64, "recipient": "1" * 64, "amount": {"value": 1.0}}
+
+    # Envio a todos: el origen manda un mensaje a cada nodo
+    all_to_all = SimulatedNetwork(num_nodes, fanout=num_nodes - 1, ttl=1)
+    delivered = all_to_all.run("node0", payload)
+    print(f"Envio a todos: {all_to_all.messages} mensajes, {all_to_all.egress['node0']} desde el origen, "
+          f"ultimo nodo a los {max(delivered.values()):.1f} ms")
+
+    coverage, latencies, p50s, messages, origin_egress = [], [], [], [], []
+    for round_number in range(rounds):
+        network = SimulatedNetwork(num_nodes, fanout=fanout, ttl=ttl, seed=round_number)
+        delivered = network.run("node0", {**payload, "round": round_number})
+        times = sorted(delivered.values())
+        coverage.append(len(delivered) / num_nodes)
+        latencies.append(times[-1])
+        p50s.append(times[len(times) // 2])
+        messages.append(network.messages)
+        origin_egress.append(network.egress["node0"])
+    print(f"Gossip:        {sum(messages) / rounds:.0f} mensajes, {max(origin_egress)} desde el origen, "
+          f"cobertura media {sum(coverage) / rounds:.2%} (minima {min(coverage):.2%}), "
+          f"mediana {sum(p50s) / rounds:.1f} ms, ultimo nodo a los {sum(latencies) / rounds:.1f} ms")
+
+
+def benchmark_outbound_coalescing(num_transactions=1000, num_peers=4):
+    from http_pool import HTTPSessionPool
+    from peer_broadcaster import PeerBroadcaster
+    from coalescer import OutboundCoalescer
+
+    class LocalBroadcaster(PeerBroadcaster):
+        # Todos los peers son el servidor local
+        def url_for(self, peer, path):
+            return f"{base_url}/{path}"
+
+    server, base_url = start_peer_server()
+    peers = [{"id": f"node{n}"} for n in range(num_peers)]
+    payloads = [{"sender": "0" * 64, "recipient": "1" * 64, "amount": {"value": 1.0}, "timestamp": n} for n in range(num_transactions)]
+    print(f"\nRafaga de {num_transactions} transacciones a {num_peers} peers")
+    logging.disable(logging.INFO)
+
+    for name, coalesce in (("Una peticion por transaccion:", False), ("Lotes por peer:", True)):
+        server.request_count = 0
+        pool = HTTPSessionPool()
+        broadcaster = LocalBroadcaster(max_pending=num_transactions * num_peers, post=pool.post)
+        sender = OutboundCoalescer(broadcaster) if coalesce else broadcaster
+        start = time.perf_counter()
+        for payload in payloads:
+            for peer in peers:
+                sender.submit(peer, "transaction", payload)
+        if coalesce:
+            sender.close()
+        broadcaster.close()
+        elapsed = time.perf_counter() - start
+        pool.close()
+        print(f"{name:<30} {server.request_count} peticiones HTTP, {elapsed * 1000:.0f} ms hasta enviar todo")
+
+    logging.disable(logging.NOTSET)
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    benchmark_choose_validator()
+    benchmark_from_dict()
+    benchmark_wallet_round_trip()
+    benchmark_account_registry()
+    benchmark_transaction_memory()
+    benchmark_peer_connections()
+    benchmark_gossip_propagation()
+    benchmark_outbound_coalescing()
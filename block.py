@@ -1,8 +1,17 @@
+import base64
 import hashlib
 import json
+import struct
 from transaction import Transaction
+from transaction_buffer import TransactionBuffer
+from merkle import merkle_root, merkle_proof
+from encoding import pack_text, unpack_text
+
+BLOCK_ENCODING_VERSION = 1 # Version de la codificacion binaria de los bloques (almacen en disco)
 
 class Block:
+    __slots__ = ("index", "previous_hash", "timestamp", "transactions", "validator", "merkle_root", "hash")
+
     def __init__(self, index, previous_hash, transactions, timeStamp, validator):
         if index > 0 and not previous_hash:
             raise ValueError("Previous hash cannot be empty for blocks after genesis block.")
@@ -10,24 +19,92 @@ class Block:
         self.index = index
         self.previous_hash = previous_hash
         self.timestamp = timeStamp
-        self.transactions = [json.dumps(tx.to_dict_with_signature()) for tx in transactions]
+        # Codificacion binaria canonica de las transacciones, en un unico buffer contiguo
+        self.transactions = TransactionBuffer.from_encoded(tx.encode() for tx in transactions)
         self.validator = validator
+        # Raiz de Merkle de los tx_id, se calcula una sola vez; el hash del bloque solo cubre la cabecera
+        self.merkle_root = merkle_root([tx.tx_id for tx in transactions])
         self.hash = None  # Inicializa el hash como None antes de calcularlo
         self.hash = self.calculate_hash()
 
+    def header(self):
+        # Cabecera de tamano fijo: es lo unico que entra en el hash del bloque
+        return {
+            "index": self.index,
+            "previous_hash": self.previous_hash,
+            "timestamp": self.timestamp,
+            "validator": self.validator,
+            "merkle_root": self.merkle_root
+        }
+
     def calculate_hash(self):
-        # Copia el bloque actual para no modificar el original
-        block_data = self.__dict__.copy()
-        # Elimina el hash actual para no incluirlo en el nuevo cálculo del hash
-        block_data.pop('hash', None)  # Remueve el hash si existe, de lo contrario no hace nada
-        block_string = json.dumps(block_data, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        return self.hash_header(self.header())
+
+    @staticmethod
+    def hash_header(header):
+        header_string = json.dumps(header, sort_keys=True)
+        return hashlib.sha256(header_string.encode()).hexdigest()
+
+    def get_tx_ids(self):
+        return [Transaction.compute_tx_id(encoded) for encoded in self.transactions]
+
+    def has_valid_merkle_root(self):
+        # La raiz de la cabecera (cubierta por el hash) debe corresponder a las transacciones del bloque
+        return self.merkle_root == merkle_root(self.get_tx_ids())
+
+    def get_transaction(self, position):
+        # Decodifica una sola transaccion del bloque
+        return self.transactions.decode(position)
+
+    def get_merkle_proof(self, position):
+        return merkle_proof(self.get_tx_ids(), position)
+
+    def encode(self):
+        # Codificacion binaria del bloque: cabecera, hash y transacciones ya codificadas.
+        # El timestamp se guarda como JSON para conservar exactamente el valor que entra en el hash
+        parts = [
+            struct.pack(">BQ", BLOCK_ENCODING_VERSION, self.index),
+            pack_text(self.previous_hash),
+            pack_text(json.dumps(self.timestamp)),
+            pack_text(self.validator),
+            pack_text(self.merkle_root),
+            pack_text(self.hash),
+            struct.pack(">I", len(self.transactions)),
+            self.transactions.buffer,  # Ya tiene el formato longitud + codificacion de cada transaccion
+        ]
+        return b"".join(parts)
+
+    @classmethod
+    def decode(cls, encoded):
+        # No decodifica las transacciones ni recalcula la raiz de Merkle: se conserva lo que se codifico.
+        # is_chain_valid comprueba que la raiz corresponde a las transacciones (has_valid_merkle_root)
+        version, index = struct.unpack_from(">BQ", encoded, 0)
+        if version != BLOCK_ENCODING_VERSION:
+            raise ValueError(f"Unsupported block encoding version: {version}")
+        offset = struct.calcsize(">BQ")
+        previous_hash, offset = unpack_text(encoded, offset)
+        timestamp, offset = unpack_text(encoded, offset)
+        validator, offset = unpack_text(encoded, offset)
+        root, offset = unpack_text(encoded, offset)
+        block_hash, offset = unpack_text(encoded, offset)
+        (count,) = struct.unpack_from(">I", encoded, offset)
+        offset += 4
+        transactions, offset = TransactionBuffer.parse(encoded, offset, count)
+
+        block = cls.__new__(cls)
+        block.index = index
+        block.previous_hash = previous_hash
+        block.timestamp = json.loads(timestamp)
+        block.transactions = transactions
+        block.validator = validator
+        block.merkle_root = root
+        block.hash = block_hash
+        return block
 
     def __str__(self):
-        # Copia el bloque actual para no modificar el original
-        block_data = self.__dict__.copy()
-        # Elimina el hash para la representación en cadena del bloque
-        block_data.pop('hash', None)
+        # Atributos del bloque sin el hash (las transacciones se muestran codificadas)
+        block_data = {name: getattr(self, name) for name in self.__slots__ if name != 'hash'}
+        block_data['transactions'] = list(self.transactions)
         return str(block_data)
 
     def to_dict(self):
@@ -35,20 +112,25 @@ class Block:
             "index": self.index,
             "previous_hash": self.previous_hash,
             "timestamp": self.timestamp,
-            "transactions": self.transactions,  # Si son strings JSON, déjalos como están
+            "transactions": [base64.b64encode(encoded).decode('utf-8') for encoded in self.transactions],  # Codificacion binaria en Base64
             "validator": self.validator,
+            "merkle_root": self.merkle_root,
             "hash": self.hash
         }
     
     @classmethod
     def from_dict(cls, block_dict):
-        # Asegúrate de convertir los strings JSON en instancias de Transaction
-        transactions = [Transaction.from_dict(json.loads(tx_json)) for tx_json in block_dict["transactions"]]
-        return cls(
+        # Decodifica las transacciones recibidas en Base64; conservan su codificacion original
+        transactions = [Transaction.decode(base64.b64decode(encoded)) for encoded in block_dict["transactions"]]
+        block = cls(
             index=block_dict["index"],
             previous_hash=block_dict["previous_hash"],
             transactions=transactions,
             timeStamp=block_dict["timestamp"],
             validator=block_dict["validator"]
         )
+        # Conservar el hash recibido para que is_chain_valid / add_block puedan detectar bloques alterados
+        # (la raiz de Merkle se recalcula a partir de las transacciones recibidas)
+        block.hash = block_dict.get("hash", block.hash)
+        return block
 
@@ -0,0 +1,165 @@
+import mmap
+import os
+import struct
+from array import array
+from block import Block
+
+BLOCK_DATA_FILE = "blocks.dat"  # Segmento de solo anadir con los bloques codificados
+BLOCK_INDEX_FILE = "blocks.idx"  # Por cada bloque: offset en el segmento y hash
+RECORD_HEADER = struct.Struct(">I")  # Longitud de cada registro del segmento
+INDEX_RECORD = struct.Struct(">Q32s")  # offset, hash del bloque (32 bytes)
+
+
+class BlockStore:
+    """
+    Almacen persistente de bloques. Los bloques se anaden codificados a un segmento de solo anadir
+    y se leen con mmap; un indice altura -> offset y hash -> altura permite leer cualquier bloque en O(1)
+    sin mantener la cadena en memoria. Se comporta como una lista de bloques (len, indices, slices,
+    iteracion, append, extend y del de un sufijo), de forma que Blockchain lo puede usar como su cadena.
+    """
+
+    def __init__(self, directory, fsync=True):
+        self.directory = directory
+        self.fsync = fsync  # fsync tras cada bloque: el bloque sobrevive a una caida del sistema, no solo del proceso
+        os.makedirs(self.directory, exist_ok=True)
+        self.data_path = os.path.join(directory, BLOCK_DATA_FILE)
+        self.index_path = os.path.join(directory, BLOCK_INDEX_FILE)
+
+        self.offsets = array("Q")  # altura -> offset del registro en el segmento
+        self.heights = {}  # hash -> altura
+        self.data_file = open(self.data_path, "a+b")
+        self.index_file = open(self.index_path, "a+b")
+        self.map = None
+        self.last_block = None  # Ultimo bloque decodificado, get_last_block no vuelve a leer del disco
+        self._load_index()
+
+    def _load_index(self):
+        # Carga el indice y descarta registros incompletos de una escritura interrumpida
+        self.index_file.seek(0)
+        index_data = self.index_file.read()
+        data_size = os.path.getsize(self.data_path)
+        hashes = []
+        for position in range(0, len(index_data) - INDEX_RECORD.size + 1, INDEX_RECORD.size):
+            offset, block_hash = INDEX_RECORD.unpack_from(index_data, position)
+            if offset + RECORD_HEADER.size > data_size:
+                break
+            self.offsets.append(offset)
+            hashes.append(block_hash.hex())
+
+        # El ultimo registro indexado puede no haber llegado a escribirse completo
+        while self.offsets and self._record_end(len(self.offsets) - 1) > data_size:
+            self.offsets.pop()
+            hashes.pop()
+        self.heights = {block_hash: height for height, block_hash in enumerate(hashes)}
+
+        data_end = self._record_end(len(self.offsets) - 1) if self.offsets else 0
+        self._truncate_files(len(self.offsets), data_end)
+        if self.offsets:
+            self.last_block = self._read(len(self.offsets) - 1)
+
+    def _record_end(self, height):
+        offset = self.offsets[height]
+        self.data_file.seek(offset)
+        (length,) = RECORD_HEADER.unpack(self.data_file.read(RECORD_HEADER.size))
+        return offset + RECORD_HEADER.size + length
+
+    def _truncate_files(self, count, data_end):
+        self._close_map()
+        self.data_file.truncate(data_end)
+        self.index_file.truncate(count * INDEX_RECORD.size)
+        self._sync()
+
+    def _sync(self):
+        self.data_file.flush()
+        self.index_file.flush()
+        if self.fsync:
+            os.fsync(self.data_file.fileno())
+            os.fsync(self.index_file.fileno())
+
+    def _close_map(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def _get_map(self, end):
+        # El mapa se rehace solo cuando se lee mas alla de lo mapeado (bloques anadidos despues)
+        if self.map is None or end > len(self.map):
+            self._close_map()
+            self.map = mmap.mmap(self.data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.map
+
+    def _read(self, height):
+        offset = self.offsets[height]
+        data_map = self._get_map(offset + RECORD_HEADER.size)
+        (length,) = RECORD_HEADER.unpack_from(data_map, offset)
+        start = offset + RECORD_HEADER.size
+        data_map = self._get_map(start + length)
+        return Block.decode(data_map[start:start + length])
+
+    # Interfaz de lista -------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[height] for height in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError("block height out of range")
+        if key == len(self) - 1:
+            return self.last_block
+        return self._read(key)
+
+    def __iter__(self):
+        for height in range(len(self)):
+            yield self[height]
+
+    def __delitem__(self, key):
+        # Solo se admite eliminar un sufijo de la cadena (bifurcaciones): del store[height:]
+        if not isinstance(key, slice) or key.stop is not None or key.step is not None:
+            raise TypeError("BlockStore only supports deleting a suffix: del store[height:]")
+        self.truncate(key.start or 0)
+
+    def append(self, block):
+        encoded = block.encode()
+        self.data_file.seek(0, os.SEEK_END)
+        offset = self.data_file.tell()
+        self.data_file.write(RECORD_HEADER.pack(len(encoded)) + encoded)
+        self.data_file.flush()
+        # El indice se escribe despues de los datos: un registro indexado siempre esta completo en el segmento
+        self.index_file.write(INDEX_RECORD.pack(offset, bytes.fromhex(block.hash)))
+        self._sync()
+        self.offsets.append(offset)
+        self.heights[block.hash] = len(self.offsets) - 1
+        self.last_block = block
+
+    def extend(self, blocks):
+        for block in blocks:
+            self.append(block)
+
+    def truncate(self, height):
+        # Elimina los bloques con altura >= height
+        if height >= len(self):
+            return
+        data_end = self.offsets[height]
+        while len(self.offsets) > height:
+            self.offsets.pop()
+        self.heights = {block_hash: h for block_hash, h in self.heights.items() if h < height}
+        self._truncate_files(height, data_end)
+        self.last_block = self._read(height - 1) if height > 0 else None
+
+    # Busquedas ------------------------------------------------------------------------
+
+    def get_height(self, block_hash):
+        return self.heights.get(block_hash)
+
+    def get_by_hash(self, block_hash):
+        height = self.heights.get(block_hash)
+        return self[height] if height is not None else None
+
+    def close(self):
+        self._close_map()
+        self.data_file.close()
+        self.index_file.close()
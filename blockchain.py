@@ -1,4 +1,6 @@
 import logging
+import os
+import base64
 import hashlib
 import json
 import random
@@ -6,8 +8,17 @@ import time
 import sys
 from block import Block
 from transaction import Transaction
-from descentracoin import DescentraCoin
-from wallet import Wallet
+from descentracoin import DescentraCoin, to_base_units
+from wallet import Wallet, transaction_digest, is_valid_public_key, verify_transaction_signature
+from account import Account
+from address_index import AddressIndex, ADDRESS_INDEX_FILE
+from state_replay import iter_block_transactions, default_replay_workers
+from checkpoint import CheckpointManager, CHECKPOINT_INTERVAL, CHECKPOINT_VERSION, state_hash
+from mempool import Mempool
+from validator_sampler import ValidatorSampler
+from signature_verifier import get_shared_verifier, SIGNATURE_VERIFY_WORKERS
+from scheduler import ConflictScheduler, EXECUTION_WORKERS
+from state_store import MemoryStateStore
 
 # Configuración básica de logging
 logging.basicConfig(level=logging.INFO)
@@ -15,57 +26,149 @@ logging.basicConfig(level=logging.INFO)
 GENESIS_ADDRESS = "0" * 64  # Cadena de 64 ceros
 STAKING_ADDRESS = "S" * 64  # Cadena de 64 caracteres 'S' para representar el staking
 FIRST_VALIDATOR_ADDRESS = "V" * 64 # Cadena de 64 caracteres 'V' para representar el primer validador
+SPECIAL_ADDRESSES = (GENESIS_ADDRESS, STAKING_ADDRESS, FIRST_VALIDATOR_ADDRESS)
 
 BLOCKCHAIN_BALANCE = 1000000  # 1 millón de DSC
 MIN_PENDING_TRANSACTIONS = 1  # Minimo de transacciones pendientes para crear un bloque
 BLOCK_REWARD = 50 # Recompensa por crear un bloque
 STAKE_REWARD = 10 # Recompensa por hacer stake
 MIN_STAKE_AMOUNT = 100
+MIN_STAKE_UNITS = to_base_units(MIN_STAKE_AMOUNT) # Balances y stake se guardan en unidades enteras
+IPFS_BLOCKCHAIN_PERCENTAGE = 10 # Porcentaje de la tarifa IPFS que se queda la blockchain
 
 class Blockchain:
 
-    def __init__(self, existing_chain=None):
+    def __init__(self, existing_chain=None, checkpoint_dir=None, checkpoint_interval=CHECKPOINT_INTERVAL, signature_workers=SIGNATURE_VERIFY_WORKERS, execution_workers=EXECUTION_WORKERS, block_store=None, state_store=None, create_genesis=True, key_store=None):
         
         # Configuración del logger
         self.logger = logging.getLogger('Blockchain')
         self.logger.setLevel(logging.INFO)
 
-        self.pending_transactions = []  # Lista de transacciones pendientes
+        self.pending_transactions = Mempool()  # Transacciones pendientes indexadas por hash, sin duplicados y con tamano maximo
         self.validated_transactions = [] # Lista de transacciones validadas
         self.invalid_transactions = [] # Lista de transacciones invalidadas
-        self.wallets = {}  # Diccionario de wallets
-        self.stakeholders = [] # Lista de stakeholders
-        self.validators = [] # Lista de validators
-        self.balances = {} # Registro de los saldos y el ultimo bloque en el que una direccion estuvo involucrada
+        # Estado: balances (saldo y ultimo bloque de cada direccion), registro de wallets, stakeholders y validators.
+        # Por defecto en memoria; con SQLiteStateStore se consulta por direccion y se conserva entre reinicios
+        self.state = state_store if state_store is not None else MemoryStateStore()
+        self.state.attach(self)
+        # Wallets con clave privada de este nodo (especiales y las creadas aqui), no forman parte del estado ni se envian
+        self.local_wallets = {}
+        self.key_store = key_store # Si se indica, las claves de las wallets especiales se conservan entre reinicios
+        self.validator_sampler = ValidatorSampler() # Stake de cada validador para elegir validador en O(log n)
+        self.verified_height = -1 # Altura del ultimo bloque cuya cadena hasta el genesis ya fue verificada
+        self.verified_hash = None # Hash del bloque en verified_height, detecta si la cadena se reemplazo
+        # Indice direccion -> transacciones de la cadena y saldo acumulado; con almacen de bloques se guarda junto al segmento
+        self.address_index = AddressIndex(os.path.join(block_store.directory, ADDRESS_INDEX_FILE) if block_store is not None else None)
+        # Checkpoints periodicos del estado en disco, solo si se indica un directorio
+        self.checkpoints = CheckpointManager(checkpoint_dir, checkpoint_interval) if checkpoint_dir else None
+        self.signature_verifier = get_shared_verifier(signature_workers) # Verificacion de firmas en paralelo antes de crear un bloque, pool compartido
+        self.execution_scheduler = ConflictScheduler(workers=execution_workers) # Ejecucion en paralelo de transacciones sin conflictos
 
         if existing_chain:
             self.chain = existing_chain
+        elif block_store is not None and len(block_store) > 0:
+            # Reinicio con un almacen de bloques en disco: se conserva la cadena y se reconstruye el estado
+            self.chain = block_store
+            # Solo se decodifican los bloques que no llegaron a registrarse en el indice
+            self.address_index.load(self.chain)
+            self._mark_verified(len(self.chain) - 1) # Los bloques se guardaron tras ser verificados
+            last_block = self.get_last_block()
+            if self.state.get_tip() == (last_block.index, last_block.hash):
+                # El estado persistido corresponde al ultimo bloque, no hace falta reproducir la cadena.
+                # Las cuentas especiales ya estan en el registro, solo se cargan sus claves
+                if not self.load_special_wallets(register=False):
+                    # El registro persistido ya tiene las cuentas del genesis; sin sus claves el nodo no firma por ellas
+                    self.logger.warning("Special wallet keys not found, this node cannot sign for the special accounts.")
+                self.rebuild_validator_sampler()
+            else:
+                self.create_special_wallets()
+                self.recalculate_balances()
         else:
-            # La cadena de bloques se inicia con un bloque génesis
-            self.chain = []
-            self.create_genesis_block()
+            # La cadena de bloques se inicia con un bloque génesis (en memoria o en el almacen de bloques)
+            self.chain = block_store if block_store is not None else []
+            if block_store is not None:
+                self.address_index.load(self.chain) # Almacen vacio: descarta un indice de una cadena anterior
+            # Sin genesis (deserializacion): no se generan claves ni se ejecuta nada, el contenido se carga despues
+            if create_genesis:
+                self.create_genesis_block()
+
+    @property
+    def balances(self):
+        return self.state.balances
+
+    @property
+    def wallets(self):
+        return self.state.wallets
+
+    @property
+    def stakeholders(self):
+        return self.state.stakeholders
+
+    @property
+    def validators(self):
+        return self.state.validators
 
     def return_chain(self):
         return self.chain
 
-    def create_genesis_block(self):
+    def create_special_wallets(self):
+        # Con un almacen de claves se reutilizan las claves guardadas, las cuentas del registro no cambian entre reinicios
+        if self.load_special_wallets():
+            return
+
+        # Las wallets especiales se registran solas (add_local_wallet): la wallet local firma y su cuenta va al registro
+        # Wallet genesis
+        Wallet(blockchain=self, balance=0, is_genesis=True)
+
+        # Wallet staking
+        Wallet(self, balance=0, is_staking=True)
+
+        # Wallet validador
+        Wallet(self, balance=0, is_first_validator=True)
 
-        # Crear una wallet genesis y agregarla al diccionario de billeteras
-        genesis_wallet = Wallet(blockchain=self, balance=0, is_genesis=True)
-        self.wallets[GENESIS_ADDRESS] = genesis_wallet
+        if self.key_store is not None:
+            self.key_store.save(self.local_wallets[address] for address in SPECIAL_ADDRESSES)
 
-        # Crear una wallet staking y agregarla al diccionario de billeteras
-        staking_wallet = Wallet(self, balance=0, is_staking=True)
-        self.wallets[STAKING_ADDRESS] = staking_wallet
+    def load_special_wallets(self, register=True):
+        # Carga las wallets especiales del almacen de claves; retorna False si no hay almacen o faltan claves.
+        # register=False solo las anade a las wallets locales (el registro persistido ya tiene sus cuentas)
+        stored = self.key_store.load() if self.key_store is not None else {}
+        if any(address not in stored for address in SPECIAL_ADDRESSES):
+            return False
+        for address in SPECIAL_ADDRESSES:
+            wallet = Wallet.from_dict(stored[address], self)
+            wallet.set_blockchain(self)
+            if register:
+                self.add_local_wallet(wallet)
+            else:
+                self.local_wallets[address] = wallet
+            wallet.update_balance()
+        return True
+
+    def load_local_wallet(self, wallet_dict):
+        # Wallet de este nodo guardada en un almacen de claves (Wallet.to_dict). Su cuenta no se modifica en el
+        # registro: si ya se inicializo, la cadena tiene su cuenta y su saldo
+        wallet = Wallet.from_dict(wallet_dict, self)
+        wallet.set_blockchain(self)
+        self.local_wallets[wallet.address] = wallet
+        wallet.update_balance()
+        return wallet
 
-        # Crear una wallet validador y agregarla al diccionario de billeteras
-        validator_wallet = Wallet(self, balance=0, is_first_validator=True)
-        self.wallets[FIRST_VALIDATOR_ADDRESS] = validator_wallet
+    def add_local_wallet(self, wallet):
+        # Wallet con clave privada de este nodo; en el registro publico solo se guarda su cuenta
+        self.local_wallets[wallet.address] = wallet
+        self.wallets[wallet.address] = Account.from_wallet(wallet)
 
-        # Crear una transacción génesis que asigna todas las monedas iniciales a una dirección
-        genesis_transaction = Transaction(None, GENESIS_ADDRESS, DescentraCoin(BLOCKCHAIN_BALANCE), "Genesis transaction")
-        initialize_staking_transaction = Transaction(None, STAKING_ADDRESS, DescentraCoin(1000), "Staking transaction")
-        initialize_validator_transaction = Transaction(None, FIRST_VALIDATOR_ADDRESS, DescentraCoin(2000), "Validator transaction")
+    def create_genesis_block(self):
+        self.create_special_wallets()
+
+        # Crear una transacción génesis que asigna todas las monedas iniciales a una dirección.
+        # Cada transaccion lleva la cuenta publica de la wallet especial: el genesis fija sus claves publicas para
+        # todos los nodos que adopten la cadena (get_genesis_accounts)
+        special_accounts = {address: Account.from_wallet(self.local_wallets[address]).to_dict() for address in SPECIAL_ADDRESSES}
+        genesis_transaction = Transaction(None, GENESIS_ADDRESS, DescentraCoin(BLOCKCHAIN_BALANCE), "Genesis transaction", special_accounts[GENESIS_ADDRESS])
+        initialize_staking_transaction = Transaction(None, STAKING_ADDRESS, DescentraCoin(1000), "Staking transaction", special_accounts[STAKING_ADDRESS])
+        initialize_validator_transaction = Transaction(None, FIRST_VALIDATOR_ADDRESS, DescentraCoin(2000), "Validator transaction", special_accounts[FIRST_VALIDATOR_ADDRESS])
         
         transactions = []
         transactions.append(genesis_transaction)
@@ -77,48 +180,94 @@ class Blockchain:
         block = Block(0, "0", transactions, timeStamp, None)
 
         # Ejecutar las transacciones tras crear el bloque
-        for transaction in transactions:
-            self.execute_transaction(transaction)
-            # Actualizar balance de las wallets
-            recipient = self.wallets.get(transaction.recipient)
-            recipient.set_blockchain(self)
-            recipient.update_balance()
+        with self.state.transaction():
+            for transaction in transactions:
+                self.execute_transaction(transaction)
+                # Actualizar balance de las wallets
+                self.local_wallets[transaction.recipient].update_balance()
 
-        # Retornar el bloque genesis
+            # Retornar el bloque genesis
+            self._append_block(block)
+
+    # Punto unico por el que se anaden bloques a la cadena
+    # verified indica que el bloque ya fue comprobado (creado localmente o validado en add_block)
+    def _append_block(self, block, verified=True):
         self.chain.append(block)
+        self.address_index.index_block(block)
+        self.state.set_tip(block.index, block.hash)
+        if verified and self.verified_height == block.index - 1:
+            self._mark_verified(block.index)
+        if self.checkpoints and self.checkpoints.is_due(block.index):
+            self.save_checkpoint()
+
+    def _mark_verified(self, height):
+        self.verified_height = height
+        self.verified_hash = self.chain[height].hash if height >= 0 else None
+
+    def get_verified_height(self):
+        # Si la cadena fue reemplazada o truncada, lo verificado anteriormente ya no es valido
+        if self.verified_height >= len(self.chain) or (
+                self.verified_height >= 0 and self.chain[self.verified_height].hash != self.verified_hash):
+            self._mark_verified(min(0, len(self.chain) - 1))
+        return self.verified_height
 
     def get_last_block(self):
         # Obtener el último bloque en la cadena
         return self.chain[-1]
 
     def add_transaction(self, transaction: Transaction):
-        # Añadir una transacción a la lista de transacciones pendientes
-        self.pending_transactions.append(transaction)
+        # Añadir una transacción al mempool, retorna False si ya estaba pendiente o no cabe
+        return self.pending_transactions.add(transaction)
 
-   # Obtiene el balance de una direccion recorriendo todos los bloques de la blockchain
+    # Obtiene el balance de una direccion a partir del indice de direcciones de la blockchain
     def get_balance_blockchain(self, address):
-        # Calcular el saldo de una dirección en particular
-        balance = DescentraCoin(0)
-        for block in self.chain:
-            for tx_json in block.transactions:
-                # Parseamos la cadena JSON de la transacción de vuelta a un diccionario
-                transaction = json.loads(tx_json)
-                if transaction['sender'] == address:
-                    balance -= DescentraCoin(transaction['amount'])
-                if transaction['recipient'] == address:
-                    balance += DescentraCoin(transaction['amount'])
-        return balance
+        return DescentraCoin.from_base_units(self.address_index.get_balance(address))
+
+    # Historial paginado de transacciones de una direccion, servido desde el indice de direcciones
+    def get_address_history(self, address, offset=0, limit=None):
+        history = []
+        for block_index, position in self.address_index.get_positions(address, offset, limit):
+            history.append({
+                "block_index": block_index,
+                "position": position,
+                "transaction": self.chain[block_index].get_transaction(position).to_dict_with_signature()
+            })
+        return history
     
+    # Prueba de inclusion de una transaccion: posicion en la cadena, cabecera del bloque y camino de Merkle
+    def get_transaction_proof(self, tx_id):
+        location = self.address_index.get_tx_location(tx_id)
+        if location is None:
+            return None
+        block_index, position = location
+        block = self.chain[block_index]
+        return {
+            "tx_id": tx_id,
+            "block_index": block_index,
+            "position": position,
+            "header": block.header(),
+            "block_hash": block.hash,
+            "proof": block.get_merkle_proof(position),
+            "transaction": base64.b64encode(block.transactions[position]).decode('utf-8')
+        }
+
     def get_balance(self, address):
         # Obtenemos el balance de una direccion a partir del registro de balances
+        return DescentraCoin.from_base_units(self.get_balance_units(address))
+
+    def get_balance_units(self, address):
+        # Balance en unidades enteras, es lo que guarda el registro de balances
         balance_entry = self.balances.get(address, {"balance": 0, "last_block_index": 0})
-        return DescentraCoin(balance_entry["balance"])
+        return balance_entry["balance"]
 
     def initialize_wallet(self, wallet_address, amount, wallet): # Inicializa una wallet con una cantidad de DSC
 
-        genesis_wallet = self.wallets.get(GENESIS_ADDRESS)
-        genesis_wallet.set_blockchain(self)
-        self.logger.info(f"Diccionario wallet a anadir a la blockchain: {wallet.to_dict()}")
+        genesis_wallet = self.local_wallets.get(GENESIS_ADDRESS)
+        if genesis_wallet is None:
+            raise ValueError("This node does not hold the genesis key of the chain, it cannot initialize wallets.")
+        # La wallet es de este nodo: se guarda para firmar sus transacciones (stake), la blockchain solo registra su cuenta
+        self.local_wallets[wallet_address] = wallet
+        self.logger.info(f"Cuenta a anadir a la blockchain: {wallet.to_public_dict()}")
         return genesis_wallet.send_transaction(wallet_address, amount, type="Initialize wallet", wallet=wallet) # Se envia la cantidad de DSC a la wallet creada
          
     # Funciones para anadir o eliminar validadores y stakeholders
@@ -133,41 +282,41 @@ class Blockchain:
     def add_validator(self, address):
         if address not in self.validators:
             self.validators.append(address)
+        self.update_validator_stake(address)
 
     def remove_validator(self, address):
         if address in self.validators:
             self.validators.remove(address)
+        self.validator_sampler.remove(address)
+
+    def update_validator_stake(self, address):
+        # Mantiene actualizado el stake de un validador en el selector de validadores
+        if address in self.validators:
+            self.validator_sampler.set_weight(address, self.wallets[address].staked)
+
+    def rebuild_validator_sampler(self):
+        self.validator_sampler.rebuild(
+            (address, self.wallets[address].staked) for address in self.validators if address in self.wallets
+        )
 
     # Funcion para obtener el public key de una direccion
     def get_public_key(self, address):
-        wallet = self.wallets.get(address)
-        wallet.set_blockchain(self)
-        if wallet:
-            return wallet.public_key
+        account = self.wallets.get(address)
+        if account:
+            return account.public_key
         else:
             # Si la dirección no corresponde a ninguna billetera, levantar una excepción
             raise ValueError("Address not found in the blockchain.")
         
-    # Funcion para escoger un validador
+    # Funcion para escoger un validador, ponderado por el stake de cada validador
     def choose_validator(self):
         if not self.validators:
             return FIRST_VALIDATOR_ADDRESS
 
-        # Obtiene la cantidad apostada para cada validador
-        stakes = [self.wallets[address].staked_amount.value for address in self.validators]
-        total_stake_value = sum(stakes)
-
-        if total_stake_value == 0:
+        address = self.validator_sampler.sample()
+        if address is None: # Sin stake total no se puede elegir un validador
             return FIRST_VALIDATOR_ADDRESS
-
-        pick = random.uniform(0, total_stake_value)
-        current = 0
-        for i, address in enumerate(self.validators):
-            current += stakes[i]
-            if current > pick:
-                return address
-            
-        return FIRST_VALIDATOR_ADDRESS
+        return address
 
     # Funciones para validar y crear un bloque
     def validate_and_create_block(self, validator_wallet):
@@ -179,70 +328,119 @@ class Blockchain:
         if not validator_wallet.is_validator:
             raise ValueError("Must be a validator to validate transactions.")
 
-        valid_transactions = []
-
-        for transaction in self.pending_transactions:
-
-           if self.is_transaction_valid(transaction, validator_wallet):
-                
-                if isinstance(transaction, dict):
-                    transaction = Transaction.from_dict(transaction)
-                
-                self.execute_transaction(transaction)
-
-                self.logger.info(f"Recipient address: {transaction.recipient}")
-                self.logger.info(f"Sender address: {transaction.sender}")
-
-                sender = self.wallets.get(transaction.sender)
-                sender.set_blockchain(self)
-                recipient = self.wallets.get(transaction.recipient)
-                recipient.set_blockchain(self)
+        # Todo el bloque se aplica al estado en una unica transaccion
+        with self.state.transaction():
+            valid_transactions = []
+            pending = self.pending_transactions.drain() # Transacciones pendientes en orden de llegada
+
+            # Etapa previa sin estado: se verifican todas las firmas del lote en paralelo
+            signature_results = self.verify_signatures(pending, validator_wallet)
+
+            # Se validan y ejecutan las transacciones; las que no comparten direcciones pueden ejecutarse en paralelo
+            known_addresses = {address for _, tx in pending for address in (tx.sender, tx.recipient) if address in self.balances}
+            results = self.execution_scheduler.run(
+                pending,
+                lambda tx_hash, transaction: self.apply_pending_transaction(transaction, validator_wallet, signature_results.get(tx_hash))
+            )
+
+            for (tx_hash, transaction), is_valid in zip(pending, results):
+                if is_valid:
+                    valid_transactions.append(transaction)
+                else:
+                    self.invalid_transactions.append(transaction) # Se anade las transacciones que no son validas a la lista de transacciones invalidas
+
+            if self.execution_scheduler.executor is not None:
+                self.order_new_balances(valid_transactions, known_addresses)
+
+            # Se eliminan del mempool solo las transacciones procesadas, las que llegaron mientras tanto siguen pendientes
+            self.pending_transactions.remove(tx_hash for tx_hash, _ in pending)
+
+            self.validated_transactions.extend(valid_transactions) # Se anaden las transacciones validadas a la lista de transacciones validadas
+
+            # Crear un nuevo bloque si hay transacciones válidas
+            if valid_transactions:
+                last_block = self.get_last_block()
+                #print(f"Creating block, validator address: {validator_wallet.address}----------------------------------------------------- ")
+                self.logger.info(f"Creating block, validator address: {validator_wallet.address}")
+                timeStamp = time.time()
+                new_block = Block(len(self.chain), last_block.hash, valid_transactions, timeStamp, validator_wallet.address)
+                self._append_block(new_block)
+
+                if validator_wallet.address != FIRST_VALIDATOR_ADDRESS:
+                    # Dar la recompensa al validador tras realizar proceso de validacion
+                    reward_transaction = self.reward_function(validator_wallet.address, BLOCK_REWARD)
+                    return reward_transaction    
+        
+            return 0
 
-                self.logger.info(f"Objeto recipient: {recipient}")   
-                self.logger.info(f"Objeto sender: {sender}")             
+    def apply_pending_transaction(self, transaction, validator_wallet, signature_valid=None):
+        # Valida y ejecuta una transaccion pendiente, retorna si era valida
+        if not self.is_transaction_valid(transaction, validator_wallet, signature_valid):
+            return False
 
-                sender.update_balance()
-                recipient.update_balance()
-                valid_transactions.append(transaction)
-        else:
-            self.invalid_transactions.append(transaction) # Se anade las transacciones que no son validas a la lista de transacciones invalidas
+        self.execute_transaction(transaction)
 
-        self.validated_transactions.extend(valid_transactions) # Se anaden las transacciones validadas a la lista de transacciones validadas
+        self.logger.info(f"Recipient address: {transaction.recipient}")
+        self.logger.info(f"Sender address: {transaction.sender}")
 
-        # Crear un nuevo bloque si hay transacciones válidas
-        if valid_transactions:
-            last_block = self.get_last_block()
-            #print(f"Creating block, validator address: {validator_wallet.address}----------------------------------------------------- ")
-            self.logger.info(f"Creating block, validator address: {validator_wallet.address}")
-            timeStamp = time.time()
-            new_block = Block(len(self.chain), last_block.hash, valid_transactions, timeStamp, validator_wallet.address)
-            self.chain.append(new_block)
-
-            # Limpiar transacciones pendientes
-            self.pending_transactions = []
-
-            if validator_wallet.address != FIRST_VALIDATOR_ADDRESS:
-                # Dar la recompensa al validador tras realizar proceso de validacion
-                reward_transaction = self.reward_function(validator_wallet.address, BLOCK_REWARD)
-                return reward_transaction    
-        
-        return 0
+        self.update_wallet_balances(transaction)
+        return True
 
-    def is_transaction_valid(self, transaction, validator_wallet):
+    def order_new_balances(self, transactions, known_addresses):
+        # Tras una ejecucion en paralelo, deja las direcciones nuevas del registro de balances en el mismo orden
+        # que tendrian con una ejecucion en serie (orden de aparicion en las transacciones del bloque)
+        new_addresses = []
+        for transaction in transactions:
+            for address in (transaction.sender, transaction.recipient):
+                if address not in known_addresses:
+                    known_addresses.add(address)
+                    new_addresses.append(address)
+        for address in new_addresses:
+            self.balances[address] = self.balances.pop(address)
+
+    def requires_signature_check(self, transaction, validator_wallet):
+        return validator_wallet.address != FIRST_VALIDATOR_ADDRESS and transaction.type != "Initialize wallet"
+
+    def verify_signatures(self, pending, validator_wallet):
+        # Verifica las firmas de un lote de transacciones (lista de (tx_hash, transaction)) en el pool de verificacion.
+        # Retorna tx_hash -> True / False; las transacciones que no requieren firma no aparecen en el resultado
+        keys = []
+        items = []
+        results = {}
+        for tx_hash, transaction in pending:
+            if not self.requires_signature_check(transaction, validator_wallet):
+                continue
+            sender_wallet = self.wallets.get(transaction.sender)
+            if not sender_wallet: # Wallet creada en este mismo lote, se verifica despues en is_transaction_valid
+                continue
+            if not transaction.signature or not is_valid_public_key(sender_wallet.public_key):
+                results[tx_hash] = False
+                continue
+            keys.append(tx_hash)
+            items.append((sender_wallet.public_key, transaction.signature, transaction_digest(transaction)))
+
+        for tx_hash, is_valid in zip(keys, self.signature_verifier.verify_batch(items)):
+            results[tx_hash] = is_valid
+
+        invalid = [tx_hash for tx_hash, is_valid in results.items() if not is_valid]
+        self.logger.info(f"Signatures verified: {len(results)}, invalid: {len(invalid)} {invalid}")
+        return results
+
+    # signature_valid es el resultado de la verificacion previa de la firma, si es None se verifica aqui
+    def is_transaction_valid(self, transaction, validator_wallet, signature_valid=None):
         # Verificar balances
         # Convertir transaction a una instancia de Transaction si es un diccionario
         if isinstance(transaction, dict):
             transaction = Transaction.from_dict(transaction)
 
-        sender_balance = self.get_balance(transaction.sender)
+        sender_balance = self.get_balance_units(transaction.sender)
             
-        if sender_balance < transaction.amount:
+        if sender_balance < transaction.amount_units:
             self.logger.info(f"Transaction {transaction} is invalid: insufficient balance.")
             # print(f"Transaction {transaction} is invalid: insufficient balance.")
             return False
 
         sender_wallet = self.wallets.get(transaction.sender)
-        sender_wallet.set_blockchain(self)
 
         if validator_wallet.address != FIRST_VALIDATOR_ADDRESS:
             # Verificar sender
@@ -254,14 +452,15 @@ class Blockchain:
             # Verificar recipient
             if transaction.type != "Initialize wallet":
                 recipient_wallet = self.wallets.get(transaction.recipient)
-                recipient_wallet.set_blockchain(self)
                 if not recipient_wallet:
                     self.logger.info(f"Transaction {transaction} is invalid: recipient not found.")
                     #print(f"Transaction {transaction} is invalid: recipient not found.")
                     return False
                 
                 # Verificar firma
-                if not sender_wallet.verify_signature(transaction, transaction.signature, sender_wallet.public_key):
+                if signature_valid is None:
+                    signature_valid = verify_transaction_signature(transaction, transaction.signature, sender_wallet.public_key)
+                if not signature_valid:
                     self.logger.info(f"Transaction {transaction} is invalid: invalid signature.")
                     #print(f"Transaction {transaction}, is invalid: invalid signature.")
                     return False
@@ -270,30 +469,49 @@ class Blockchain:
         self.logger.info(f"Transaction {transaction} is valid.")
         return True
 
+    # Actualiza el balance de las wallets locales involucradas en una transaccion (las cuentas del registro no
+    # guardan saldo, se consulta en self.balances)
+    def update_wallet_balances(self, transaction):
+        sender = self.local_wallets.get(transaction.sender)
+        recipient = self.local_wallets.get(transaction.recipient)
+
+        self.logger.info(f"Objeto recipient: {recipient}")
+        self.logger.info(f"Objeto sender: {sender}")
+
+        for wallet in (sender, recipient):
+            if wallet:
+                wallet.update_balance()
+
     # Funciones para ejecutar una transaccion 
-    def execute_transaction(self, transaction: Transaction):
+    # emit_rewards=False se usa al aplicar bloques ya creados por otro nodo: las recompensas que genera la
+    # transaccion (por ejemplo upload-IPFS) ya fueron emitidas por el validador y llegaran en bloques posteriores
+    # block_index es el indice del bloque que contiene la transaccion, por defecto el siguiente bloque de la cadena
+    def execute_transaction(self, transaction: Transaction, emit_rewards=True, block_index=None):
 
         if isinstance(transaction, dict):
             transaction = Transaction.from_dict(transaction)
 
+        if block_index is None:
+            block_index = len(self.chain)
+
         # Actualizar el saldo del remitente en el diccionario self.balances
         sender_balance_entry = self.balances.get(transaction.sender, {"balance": 0, "last_block_index": 0})
-        sender_balance_entry["balance"] -= transaction.amount.value
-        sender_balance_entry["last_block_index"] = len(self.chain) + 1
+        sender_balance_entry["balance"] -= transaction.amount_units
+        sender_balance_entry["last_block_index"] = block_index + 1
         self.balances[transaction.sender] = sender_balance_entry
 
         # Actualizar el saldo del destinatario en el diccionario self.balances
         recipient_balance_entry = self.balances.get(transaction.recipient, {"balance": 0, "last_block_index": 0})
-        recipient_balance_entry["balance"] += transaction.amount.value
-        recipient_balance_entry["last_block_index"] = len(self.chain) + 1
+        recipient_balance_entry["balance"] += transaction.amount_units
+        recipient_balance_entry["last_block_index"] = block_index + 1
         self.balances[transaction.recipient] = recipient_balance_entry
 
         if transaction.type == "Staking":
             aux_wallet = self.wallets.get(transaction.sender)
-            aux_wallet.set_blockchain(self)
-            aux_wallet.staked_amount += transaction.amount.value
+            aux_wallet.staked += transaction.amount_units
+            self.update_validator_stake(aux_wallet.address)
 
-            if aux_wallet.staked_amount.value == transaction.amount.value:
+            if aux_wallet.staked == transaction.amount_units:
                 aux_wallet.is_stakeholder = True
                 self.add_stakeholder(aux_wallet.address)
             else:
@@ -302,24 +520,22 @@ class Blockchain:
 
         elif transaction.type == "Unstaking":
             aux_wallet = self.wallets.get(transaction.recipient)
-            aux_wallet.set_blockchain(self)
-            aux_wallet.staked_amount -= transaction.amount.value
+            aux_wallet.staked -= transaction.amount_units
+            self.update_validator_stake(aux_wallet.address)
         
-            if aux_wallet.staked_amount.value == 0:  # Si el monto stakeado es 0, no es más un stakeholder
+            if aux_wallet.staked == 0:  # Si el monto stakeado es 0, no es más un stakeholder
                 aux_wallet.is_stakeholder = False
                 self.remove_stakeholder(aux_wallet.address)
         
         elif transaction.type == "Become validator":
             aux_wallet = self.wallets.get(transaction.sender)
-            aux_wallet.set_blockchain(self)
-            if not aux_wallet.is_stakeholder or aux_wallet.staked_amount.value < MIN_STAKE_AMOUNT:
+            if not aux_wallet.is_stakeholder or aux_wallet.staked < MIN_STAKE_UNITS:
                 raise ValueError(f"Must be a stakeholder with at least {MIN_STAKE_AMOUNT} DSC staked to become a validator.".format(MIN_STAKE_AMOUNT))
             aux_wallet.is_validator = True
             self.add_validator(aux_wallet.address)
 
         elif transaction.type == "Cease validator":
             aux_wallet = self.wallets.get(transaction.sender)
-            aux_wallet.set_blockchain(self)
             if not aux_wallet.is_validator:
                 raise ValueError("Not a validator.")
             aux_wallet.is_validator = False
@@ -327,8 +543,9 @@ class Blockchain:
 
         elif transaction.type == "Initialize wallet": 
             #print("Initializing wallet...")
-            new_wallet = Wallet.from_dict(transaction.new_Wallet, blockchain=self) 
-            new_wallet.blockchain = self # Al parecer no se estaba asignando bien la blockchain al momento de crear la wallet en el metodo initialize_wallet
+            # Solo se registra la cuenta publica, aunque el diccionario recibido sea el de una wallet completa
+            wallet_dict = transaction.new_Wallet if isinstance(transaction.new_Wallet, dict) else transaction.new_Wallet.to_dict()
+            new_wallet = Account.from_dict(wallet_dict)
 
             self.logger.info(f"Diccionario Wallets Antes: ")
             self.logger.info(f"{self.print_wallets()}")
@@ -343,8 +560,8 @@ class Blockchain:
             self.logger.info(f"\n\nDiccionario Wallets Despues: ")
             self.logger.info(f"\n{self.print_wallets()}\n")
         
-        elif transaction.type == "upload-IPFS": # Si la transaccion es de subida de archivo, se calcula el fee y se distribuyen las recompensas            
-            self.distribute_rewards_IPFS(total_fee=transaction.amount.value)#, file_size=transaction.file_size)
+        elif transaction.type == "upload-IPFS" and emit_rewards: # Si la transaccion es de subida de archivo, se calcula el fee y se distribuyen las recompensas            
+            self.distribute_rewards_IPFS(total_fee=transaction.amount_units)#, file_size=transaction.file_size)
 
 
     # Funciones para imprimir la blockchain, las transacciones pendientes, las wallets y los balances
@@ -378,30 +595,37 @@ class Blockchain:
     # Funciones para realizar el stake y unstake
 
     def stake_function(self, staker_address, amount):
-        staker_wallet = self.wallets.get(staker_address)
-        staker_wallet.set_blockchain(self)
+        # Firma el staker: solo es posible para las wallets locales de este nodo
+        staker_wallet = self.local_wallets.get(staker_address)
         return staker_wallet.send_transaction(STAKING_ADDRESS, amount, type="Staking")
 
     def unstake_function(self, staker_address, amount):
-        staking_wallet = self.wallets.get(STAKING_ADDRESS)
-        staking_wallet.set_blockchain(self)
+        staking_wallet = self.local_wallets.get(STAKING_ADDRESS)
+        if staking_wallet is None:
+            raise ValueError("This node does not hold the staking key of the chain, it cannot sign unstaking transactions.")
         return staking_wallet.send_transaction(staker_address, amount, type="Unstaking")
     
     # Funciones para dar recomenpensas a los validadores y stakeholders
+    # Retorna None si este nodo no tiene la clave genesis de la cadena: su firma no seria valida en los demas nodos
     def reward_function(self, validator_address, amount):
-        genesis_wallet = self.wallets.get(GENESIS_ADDRESS)
-        genesis_wallet.set_blockchain(self)
+        genesis_wallet = self.local_wallets.get(GENESIS_ADDRESS)
+        if genesis_wallet is None:
+            self.logger.warning(f"Reward for {validator_address} not issued, this node does not hold the genesis key.")
+            return None
         return genesis_wallet.send_transaction(validator_address, DescentraCoin(amount), type="Reward")
 
     def distribute_stakeholders_rewards(self, amount): # VER DONDE SE IMPLEMENTA EL STAKE REWARD
         for address in self.stakeholders:
             self.reward_function(address, amount)
 
-    def is_chain_valid(self, chain=[]):
-        if not chain:
+    def is_chain_valid(self, chain=[], start=1):
+        # Sobre la cadena propia solo se verifican los bloques posteriores al ultimo verificado
+        own_chain = not chain or chain is self.chain
+        if own_chain:
             chain = self.chain
-        
-        for i in range(1, len(chain)): # Comenzar desde 1 ya que no podemos comparar el bloque genesis con un bloque previo
+            start = max(start, self.get_verified_height() + 1)
+
+        for i in range(max(start, 1), len(chain)): # Comenzar desde 1 ya que no podemos comparar el bloque genesis con un bloque previo
             current_block = chain[i]
             previous_block = chain[i - 1]
 
@@ -409,38 +633,232 @@ class Blockchain:
             if current_block.hash != current_block.calculate_hash():
                 print(f"Hash incorrectos ---------------------------------------")
                 print(current_block.hash)
-                print(current_block.__dict__)
+                print(current_block.header())
                 print(current_block.calculate_hash())
 
                 print(f"Hash incorrecto, bloque {current_block} corrupto, hash almacenado incorrecto")
                 return False
 
+            # Verificar que las transacciones son las que cubre la raiz de Merkle de la cabecera
+            if not current_block.has_valid_merkle_root():
+                print(f"Raiz de Merkle incorrecta, bloque {current_block.index} corrupto, transacciones alteradas")
+                return False
+
             # Verificar si el bloque apunta al hash del bloque anterior
             if current_block.previous_hash != previous_block.hash:
                 print(f"Hash incorrecto, bloque {current_block} corrupto, no apunta al hash del bloque anterior")
                 return False
+
+            if own_chain:
+                self._mark_verified(i)
         
         # Si llegamos hasta aquí, la cadena es válida
         return True
+
+    def find_common_ancestor(self, new_chain):
+        # Busca, desde arriba, el bloque mas alto ya verificado que tambien esta en new_chain.
+        # El coste depende de la profundidad de la bifurcacion, no de la longitud de la cadena
+        height = min(len(new_chain) - 1, self.get_verified_height())
+        while height >= 0:
+            if new_chain[height].hash == self.chain[height].hash:
+                return height
+            height -= 1
+        return -1
     
     def update_chain(self, new_chain):
-        if self.is_chain_valid(new_chain):
-            self.chain = new_chain
-            self.recalculate_balances()
-            return True
-        return False
+        # Solo se adopta una cadena estrictamente mas larga: dos bifurcaciones de la misma longitud no se reemplazan
+        # una a otra indefinidamente y una cadena mas corta nunca sustituye a la local
+        if len(new_chain) <= len(self.chain):
+            self.logger.info(f"Received chain ({len(new_chain)} blocks) is not longer than the local chain ({len(self.chain)} blocks).")
+            return False
+
+        ancestor = self.find_common_ancestor(new_chain)
+
+        # Solo se verifica el sufijo nuevo, los bloques hasta el ancestro comun ya fueron verificados
+        if not self.is_chain_valid(new_chain, start=ancestor + 1):
+            return False
+
+        # Se reutilizan los bloques locales ya verificados hasta el ancestro comun, solo se sustituye el sufijo
+        new_blocks = list(new_chain[ancestor + 1:])
+        del self.chain[ancestor + 1:]
+        self.chain.extend(new_blocks)
+        self.address_index.rollback_to(ancestor + 1)
+        for block in new_blocks:
+            self.address_index.index_block(block)
+            # Las transacciones incluidas en los bloques adoptados dejan de estar pendientes, como en add_block
+            self.pending_transactions.remove_included(block.transactions)
+        self._mark_verified(len(self.chain) - 1)
+        self.recalculate_balances()
+        return True
     
 
+    # Funciones para la sincronizacion incremental de bloques entre nodos
+
+    def get_blocks_from(self, height):
+        # Retorna los bloques a partir de una altura, serializados para enviarlos a otro nodo
+        return [block.to_dict() for block in self.chain[max(height, 0):]]
+
+    def get_headers_from(self, height):
+        # Cabeceras (con su hash) de los bloques a partir de una altura, para los nodos ligeros
+        return [dict(block.header(), hash=block.hash) for block in self.chain[max(height, 0):]]
+
+    def add_block(self, block):
+        # Aplica un bloque recibido de otro nodo sobre la cadena local, sin reconstruir la blockchain
+        if isinstance(block, dict):
+            block = Block.from_dict(block)
+
+        last_block = self.get_last_block()
+        if block.index != len(self.chain) or block.previous_hash != last_block.hash:
+            self.logger.info(f"Block {block.index} does not extend the local chain.")
+            return False
+
+        if block.hash != block.calculate_hash():
+            self.logger.info(f"Block {block.index} is corrupt, stored hash is incorrect.")
+            return False
+
+        with self.state.transaction():
+            for encoded in block.transactions:
+                transaction = Transaction.decode(encoded)
+                self.execute_transaction(transaction, emit_rewards=False)
+                self.update_wallet_balances(transaction)
+                self.validated_transactions.append(transaction)
+
+            self._append_block(block)
+        # Las transacciones incluidas en el bloque dejan de estar pendientes
+        self.pending_transactions.remove_included(block.transactions)
+        return True
+
+    # Reconstruccion del estado a partir de la cadena
+
+    def get_genesis_accounts(self):
+        # Cuentas especiales que registra el bloque genesis de la cadena (en new_wallet de sus transacciones)
+        accounts = {}
+        if len(self.chain) == 0:
+            return accounts
+        genesis_block = self.chain[0]
+        for position in range(len(genesis_block.transactions)):
+            transaction = genesis_block.get_transaction(position)
+            account_dict = transaction.new_Wallet
+            if transaction.recipient in SPECIAL_ADDRESSES and isinstance(account_dict, dict) and account_dict.get("address") == transaction.recipient:
+                accounts[transaction.recipient] = Account.from_dict(account_dict)
+        return accounts
+
+    def reset_state(self):
+        # Vacia el estado derivado de la cadena, conservando las cuentas especiales. Sus claves publicas son las del
+        # genesis de la cadena, tambien si se adopto de otro nodo; si el genesis no las incluye, las de las wallets locales
+        special_accounts = self.get_genesis_accounts()
+        for address in SPECIAL_ADDRESSES:
+            if address in special_accounts:
+                continue
+            if address in self.local_wallets:
+                special_accounts[address] = Account.from_wallet(self.local_wallets[address])
+            elif address in self.wallets:
+                special_accounts[address] = self.wallets[address]
+        self.state.reset()
+        self.validator_sampler = ValidatorSampler()
+
+        for address, account in special_accounts.items():
+            account.is_stakeholder = False
+            account.staked = 0
+            account.is_validator = address == FIRST_VALIDATOR_ADDRESS
+            self.wallets[address] = account
+            # Una clave local distinta de la del genesis no firma transacciones validas para los demas nodos
+            local_wallet = self.local_wallets.get(address)
+            if local_wallet is not None and local_wallet.public_key_pem() != account.public_key_pem:
+                self.logger.warning(f"Local key of special account {address} does not match the chain genesis, it is not used.")
+                del self.local_wallets[address]
+
+    def recalculate_balances(self, workers=None):
+        # Reconstruye balances, stake, stakeholders, validadores y registro de wallets solo a partir de la cadena.
+        # Si hay un checkpoint de un bloque de la cadena se parte de el y solo se reproducen los bloques posteriores.
+        # Los bloques se decodifican y ejecutan de uno en uno; en cadenas largas la decodificacion usa un pool de procesos
+        checkpoint = self.checkpoints.load_latest_for_chain(self.chain) if self.checkpoints else None
+        with self.state.transaction():
+            if checkpoint:
+                self.restore_checkpoint(checkpoint)
+                start = checkpoint["height"] + 1
+            else:
+                self.reset_state()
+                start = 0
+
+        if workers is None:
+            workers = default_replay_workers(len(self.chain) - start)
+
+        # Los bloques se leen de uno en uno, la cadena puede estar en disco
+        blocks = (self.chain[height] for height in range(start, len(self.chain)))
+        # Una transaccion del estado por bloque reproducido
+        for block, transactions in iter_block_transactions(blocks, workers):
+            with self.state.transaction():
+                for transaction in transactions:
+                    self.execute_transaction(transaction, emit_rewards=False, block_index=block.index)
+                self.state.set_tip(block.index, block.hash)
+
+        for wallet in self.local_wallets.values():
+            wallet.update_balance()
+
+    # Checkpoints del estado
+
+    def create_checkpoint(self):
+        # Estado tras el ultimo bloque de la cadena. Los balances se guardan como lista de pares para conservar
+        # el orden y la direccion None de las transacciones genesis
+        last_block = self.get_last_block()
+        special_addresses = (GENESIS_ADDRESS, STAKING_ADDRESS, FIRST_VALIDATOR_ADDRESS)
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "height": last_block.index,
+            "hash": last_block.hash,
+            "balances": [[address, entry] for address, entry in self.balances.items()],
+            "stakeholders": list(self.stakeholders),
+            "validators": list(self.validators),
+            "special_wallets": {
+                address: {
+                    "is_stakeholder": wallet.is_stakeholder,
+                    "is_validator": wallet.is_validator,
+                    "staked_amount": wallet.staked
+                } for address, wallet in self.wallets.items() if address in special_addresses
+            },
+            "wallets": [wallet.to_dict() for address, wallet in self.wallets.items() if address not in special_addresses]
+        }
+        checkpoint["state_hash"] = state_hash(checkpoint)
+        return checkpoint
+
+    def save_checkpoint(self):
+        checkpoint = self.create_checkpoint()
+        self.checkpoints.write(checkpoint)
+        self.logger.info(f"Checkpoint saved at height {checkpoint['height']}")
+
+    def restore_checkpoint(self, checkpoint):
+        # Las wallets especiales conservan sus claves locales, solo se restauran sus datos de stake
+        self.reset_state()
+        for address, entry in checkpoint["balances"]:
+            self.balances[address] = dict(entry)
+        self.stakeholders.extend(checkpoint["stakeholders"])
+        self.validators.extend(checkpoint["validators"])
+
+        for address, info in checkpoint["special_wallets"].items():
+            wallet = self.wallets.get(address)
+            if wallet:
+                wallet.is_stakeholder = info["is_stakeholder"]
+                wallet.is_validator = info["is_validator"]
+                wallet.staked = info["staked_amount"]
+
+        for account_dict in checkpoint["wallets"]:
+            account = Account.from_dict(account_dict)
+            self.wallets[account.address] = account
+        self.rebuild_validator_sampler()
+        self.state.set_tip(checkpoint["height"], checkpoint["hash"])
+        self.logger.info(f"State restored from checkpoint at height {checkpoint['height']}")
+
     def get_wallet_addresses_transactions(self, transactions_list):
         wallet_address_list = []
 
         for transaction in transactions_list:
             if transaction.new_Wallet is not None:
-                # Comprobar si new_Wallet es un objeto Wallet o un diccionario
-                if isinstance(transaction.new_Wallet, Wallet):
-                    wallet_address = transaction.new_Wallet.address
-                else:  # asumir que es un diccionario
+                # Comprobar si new_Wallet es un objeto (Wallet o Account) o un diccionario
+                if isinstance(transaction.new_Wallet, dict):
                     wallet_address = transaction.new_Wallet.get('address')
+                else:
+                    wallet_address = transaction.new_Wallet.address
                 wallet_address_list.append(wallet_address)
             else:
                 wallet_address_list.append(None)
@@ -450,10 +868,10 @@ class Blockchain:
 
     # Funciones para dar recompensas de almacenamiento IPFS
 
+    # total_fee y las recompensas en unidades enteras: la division entera redondea hacia abajo y el resto queda en genesis
     def distribute_rewards_IPFS(self, total_fee):#, file_size):
         # Porcentaje para la blockchain
-        blockchain_percentage = 0.1  # 10%
-        blockchain_fee = total_fee * blockchain_percentage
+        blockchain_fee = total_fee * IPFS_BLOCKCHAIN_PERCENTAGE // 100
 
         # Monto a distribuir entre los nodos IPFS
         ipfs_reward_pool = total_fee - blockchain_fee
@@ -465,12 +883,15 @@ class Blockchain:
         # Calcular y distribuir recompensas para cada nodo
         for address, wallet in self.wallets.items():
 
-            genesis_wallet = self.wallets.get(GENESIS_ADDRESS)
-            genesis_wallet.set_blockchain(self)
+            genesis_wallet = self.local_wallets.get(GENESIS_ADDRESS)
+            if genesis_wallet is None:
+                self.logger.warning("IPFS rewards not issued, this node does not hold the genesis key.")
+                return
 
             if address not in [GENESIS_ADDRESS, STAKING_ADDRESS, FIRST_VALIDATOR_ADDRESS]:
                 reward = self.calculate_node_reward(ipfs_reward_pool, total_node_space, wallet.space)
-                genesis_wallet.send_transaction(address, DescentraCoin(reward), type="reward-IPFS")
+                if reward > 0: # Una transaccion no puede tener cantidad 0
+                    genesis_wallet.send_transaction(address, None, type="reward-IPFS", base_units=reward)
 
 
 
@@ -478,7 +899,7 @@ class Blockchain:
         # Verificar que el espacio total de los nodos no sea cero para evitar división por cero
         if total_node_space > 0:
             # Calcular la recompensa proporcional al espacio aportado
-            reward = (node_space / total_node_space) * reward_pool
+            reward = int(reward_pool * (node_space or 0) // total_node_space) # Unidades enteras aunque el espacio llegue como float
             return reward
         else:
             return 0  # Si no hay espacio total, no se puede calcular la recompensa
@@ -489,9 +910,9 @@ class Blockchain:
     def to_dict(self):
         return{
             "wallets": {address: wallet.to_dict() for address, wallet in self.wallets.items()},
-            "stakeholders": self.stakeholders,
-            "validators": self.validators,
-            "balances": self.balances,
+            "stakeholders": list(self.stakeholders),
+            "validators": list(self.validators),
+            "balances": {address: dict(entry) for address, entry in self.balances.items()},
             "pending_addresses": self.get_wallet_addresses_transactions(self.pending_transactions),
             "validated_addresses": self.get_wallet_addresses_transactions(self.validated_transactions),
             "invalid_addresses": self.get_wallet_addresses_transactions(self.invalid_transactions),
@@ -503,17 +924,24 @@ class Blockchain:
     
     @staticmethod
     def from_dict(data):
-        # Crear una instancia nueva de Blockchain
-        blockchain = Blockchain(existing_chain=None)
-   
-        # Deserializar y reconstruir las wallets
-        blockchain.wallets = {
-        address: Wallet.from_dict(wallet_dict, blockchain) for address, wallet_dict in data["wallets"].items()
-        }
-        # Asignar stakeholders, validators y balances directamente
-        blockchain.stakeholders = data["stakeholders"]
-        blockchain.validators = data["validators"]
-        blockchain.balances = data["balances"]
+        # Crear una instancia nueva de Blockchain vacia: las wallets y la cadena se reemplazan con las recibidas,
+        # no hace falta generar las claves ni ejecutar las transacciones del bloque genesis
+        blockchain = Blockchain(create_genesis=False)
+        blockchain.load_dict(data)
+        return blockchain
+
+    def load_dict(self, data):
+        # Reemplaza el contenido de la blockchain por el de un diccionario generado con to_dict
+
+        # Deserializar y reconstruir el registro de cuentas (las wallets locales no se envian)
+        self.state.reset()
+        for address, account_dict in data["wallets"].items():
+            self.wallets[address] = Account.from_dict(account_dict)
+        # Copiar stakeholders, validators y balances para no compartir estado con el diccionario recibido
+        self.stakeholders.extend(data["stakeholders"])
+        self.validators.extend(data["validators"])
+        for address, entry in data["balances"].items():
+            self.balances[address] = dict(entry)
 
         #Obtener las direcciones de las wallets de las transacciones antes de obtener las transacciones
         pending_addresses = data["pending_addresses"]
@@ -526,12 +954,12 @@ class Blockchain:
             raise ValueError("Las listas de direcciones y transacciones pendientes no coinciden en longitud.")
 
         # Deserializar y reconstruir las transacciones pendientes
-        blockchain.pending_transactions = []
+        self.pending_transactions = Mempool()
         for i, tx_dict in enumerate(data["pending_transactions"]):
             address = pending_addresses[i]
-            wallet = blockchain.wallets.get(address)
+            wallet = self.wallets.get(address)
             transaction = Transaction.from_dict(tx_dict, wallet)
-            blockchain.pending_transactions.append(transaction)
+            self.pending_transactions.add(transaction)
 
         # Validated transactions
         # Verificar si las longitudes de las listas de direcciones y transacciones coinciden
@@ -539,12 +967,12 @@ class Blockchain:
             raise ValueError("Las listas de direcciones y transacciones validadas no coinciden en longitud.")
         
         # Deserializar y reconstruir las transacciones validadas
-        blockchain.validated_transactions = []
+        self.validated_transactions = []
         for i, tx_dict in enumerate(data["validated_transactions"]):
             address = validated_addresses[i]
-            wallet = blockchain.wallets.get(address)
+            wallet = self.wallets.get(address)
             transaction = Transaction.from_dict(tx_dict, wallet)
-            blockchain.validated_transactions.append(transaction)
+            self.validated_transactions.append(transaction)
 
         # Invalid transactions
         # Verificar si las longitudes de las listas de direcciones y transacciones coinciden
@@ -552,35 +980,35 @@ class Blockchain:
             raise ValueError("Las listas de direcciones y transacciones invalidadas no coinciden en longitud.")
         
         # Deserializar y reconstruir las transacciones invalidadas
-        blockchain.invalid_transactions = []
+        self.invalid_transactions = []
         for i, tx_dict in enumerate(data["invalid_transactions"]):
             address = invalid_addresses[i]
-            wallet = blockchain.wallets.get(address)
+            wallet = self.wallets.get(address)
             transaction = Transaction.from_dict(tx_dict, wallet)
-            blockchain.invalid_transactions.append(transaction)
+            self.invalid_transactions.append(transaction)
 
         # Deserializar y reconstruir la cadena de bloques
-        blockchain.chain = [
+        self.chain = [
             Block.from_dict(block_dict) for block_dict in data["chain"]
         ]
-
-        return blockchain
+        self.address_index.rebuild(self.chain)
+        self._mark_verified(min(0, len(self.chain) - 1))
+        self.rebuild_validator_sampler()
     
 
     def get_wallet_info(self, address):
         """
         Retorna una tupla con información detallada de una wallet específica.
-        La tupla contiene: (is_validator, is_stakeholder, balance, staked_amount).
+        La tupla contiene: (is_validator, is_stakeholder, balance, staked_amount), cantidades en unidades enteras.
         """
         wallet = self.wallets.get(address)
-        wallet.set_blockchain(self)
 
         if not wallet:
             raise ValueError("Wallet not found in the blockchain.")
 
         is_validator = wallet.is_validator
         is_stakeholder = wallet.is_stakeholder
-        balance = wallet.balance.value  # o simplemente wallet.balance para obtener el objeto DescentraCoin
-        staked_amount = wallet.staked_amount.value  # o simplemente wallet.staked_amount
+        balance = self.get_balance_units(address)  # El saldo se consulta en el registro de balances
+        staked_amount = wallet.staked
 
         return (is_validator, is_stakeholder, balance, staked_amount)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import re
+
+CHECKPOINT_INTERVAL = 100  # Se guarda un checkpoint cada CHECKPOINT_INTERVAL bloques
+CHECKPOINTS_TO_KEEP = 3  # Numero de checkpoints que se conservan en disco
+CHECKPOINT_VERSION = 3  # Version del formato; desde la 2 balances y stake en unidades enteras, desde la 3 con state_hash
+
+CHECKPOINT_FILE_PATTERN = re.compile(r"^checkpoint_(\d+)_([0-9a-f]+)\.json$")
+BLOCK_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")  # Hash de bloque (SHA-256 en hexadecimal)
+CHECKPOINT_FIELDS = {"balances": list, "stakeholders": list, "validators": list, "special_wallets": dict, "wallets": list}
+
+
+def state_hash(checkpoint):
+    # SHA-256 del contenido del checkpoint sin el propio state_hash, en JSON canonico
+    content = {key: value for key, value in checkpoint.items() if key != "state_hash"}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, separators=(",", ":")).encode('utf-8')).hexdigest()
+
+
+def is_valid_checkpoint(checkpoint):
+    # Comprueba version, altura (entero), hash del bloque (hexadecimal), campos del estado y state_hash.
+    # No comprueba que el bloque pertenezca a una cadena, eso depende de la cadena con la que se use
+    if not isinstance(checkpoint, dict) or checkpoint.get("version") != CHECKPOINT_VERSION:
+        return False
+    height, block_hash = checkpoint.get("height"), checkpoint.get("hash")
+    if type(height) is not int or height < 0:
+        return False
+    if not isinstance(block_hash, str) or not BLOCK_HASH_PATTERN.match(block_hash):
+        return False
+    if any(not isinstance(checkpoint.get(field), field_type) for field, field_type in CHECKPOINT_FIELDS.items()):
+        return False
+    return checkpoint.get("state_hash") == state_hash(checkpoint)
+
+
+class CheckpointManager:
+    """
+    Guarda en disco checkpoints del estado de la blockchain (balances, stake, validadores y registro de wallets),
+    etiquetados con la altura y el hash del bloque, para no tener que reconstruir el estado desde el genesis.
+    """
+
+    def __init__(self, directory, interval=CHECKPOINT_INTERVAL, keep=CHECKPOINTS_TO_KEEP):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        os.makedirs(self.directory, exist_ok=True)
+
+    def is_due(self, height):
+        return height > 0 and height % self.interval == 0
+
+    def path_for(self, height, block_hash):
+        return os.path.join(self.directory, f"checkpoint_{height}_{block_hash}.json")
+
+    def list_checkpoints(self):
+        # Lista de (height, hash) de los checkpoints en disco, del mas reciente al mas antiguo
+        checkpoints = []
+        for file_name in os.listdir(self.directory):
+            match = CHECKPOINT_FILE_PATTERN.match(file_name)
+            if match:
+                checkpoints.append((int(match.group(1)), match.group(2)))
+        return sorted(checkpoints, reverse=True)
+
+    def write(self, checkpoint):
+        # Escritura atomica: se escribe un fichero temporal y se renombra.
+        # La altura y el hash forman el nombre del fichero, se validan antes de escribir
+        if not is_valid_checkpoint(checkpoint):
+            raise ValueError("Invalid checkpoint: version, height, hash or state hash do not match.")
+        path = self.path_for(checkpoint["height"], checkpoint["hash"])
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as archivo:
+            json.dump(checkpoint, archivo, separators=(",", ":"))
+        os.replace(temp_path, path)
+        self.prune()
+
+    def prune(self):
+        for height, block_hash in self.list_checkpoints()[self.keep:]:
+            os.remove(self.path_for(height, block_hash))
+
+    def load(self, height, block_hash):
+        with open(self.path_for(height, block_hash), "r") as archivo:
+            return json.load(archivo)
+
+    def load_latest(self):
+        checkpoints = self.list_checkpoints()
+        if not checkpoints:
+            return None
+        return self.load(*checkpoints[0])
+
+    def load_latest_for_chain(self, chain):
+        # Checkpoint mas reciente cuyo bloque pertenece a la cadena indicada
+        for height, block_hash in self.list_checkpoints():
+            if height < len(chain) and chain[height].hash == block_hash:
+                checkpoint = self.load(height, block_hash)
+                # Los checkpoints de otra version o alterados no se restauran, se sigue buscando uno anterior
+                if is_valid_checkpoint(checkpoint) and (checkpoint["height"], checkpoint["hash"]) == (height, block_hash):
+                    return checkpoint
+        return None
@@ -0,0 +1,99 @@
+import threading
+import time
+
+COALESCE_DELAY_MS = 5  # Milisegundos que una transaccion espera a otras antes de enviarse
+COALESCE_MAX_ITEMS = 100  # Transacciones por peticion como maximo; al llegar a este numero se envia sin esperar
+COALESCE_PATH = "transaction"  # Mensajes que se agrupan
+BATCH_PATH = "transactions"  # Endpoint de los peers que recibe los lotes
+
+
+class OutboundCoalescer:
+    """
+    Agrupa las transacciones salientes por peer: en lugar de una peticion por transaccion y peer, se acumulan
+    durante delay_ms o hasta max_items y se envian al peer en una unica peticion a /transactions
+    ({"transactions": [...]}). Tiene la interfaz del broadcaster (submit(peer, path, payload)), de forma que
+    el gossip lo usa sin cambios; los mensajes de otros paths se pasan al broadcaster directamente.
+    """
+
+    def __init__(self, broadcaster, delay_ms=COALESCE_DELAY_MS, max_items=COALESCE_MAX_ITEMS):
+        self.broadcaster = broadcaster
+        self.delay = delay_ms / 1000
+        self.max_items = max_items
+        self.buffers = {}  # peer id -> (peer, transacciones, instante limite de envio)
+        self.condition = threading.Condition()
+        self.closed = False
+        self.counters = {"items": 0, "batches": 0}
+        self.flusher = threading.Thread(target=self.run, name="coalescer", daemon=True)
+        self.flusher.start()
+
+    def submit(self, peer, path, payload):
+        if path != COALESCE_PATH:
+            return self.broadcaster.submit(peer, path, payload)
+        with self.condition:
+            self.counters["items"] += 1
+            if self.closed:
+                # El hilo ya no envia lotes: la transaccion se envia sola en lugar de quedarse en un buffer que nadie vacia
+                transactions = [payload]
+            else:
+                entry = self.buffers.get(peer["id"])
+                if entry is None:
+                    entry = (peer, [], time.monotonic() + self.delay)
+                    self.buffers[peer["id"]] = entry
+                    self.condition.notify()
+                entry[1].append(payload)
+                if len(entry[1]) < self.max_items:
+                    return True
+                del self.buffers[peer["id"]]
+                transactions = entry[1]
+        return self.send(peer, transactions)
+
+    def send(self, peer, transactions):
+        with self.condition:
+            self.counters["batches"] += 1
+        return self.broadcaster.submit(peer, BATCH_PATH, {"transactions": transactions})
+
+    def run(self):
+        # Envia los lotes cuyo plazo vencio; espera hasta el plazo mas proximo o hasta que llegue un lote nuevo
+        while True:
+            with self.condition:
+                while not self.closed:
+                    now = time.monotonic()
+                    due = [peer_id for peer_id, (_, _, deadline) in self.buffers.items() if deadline <= now]
+                    if due:
+                        break
+                    deadlines = [deadline for _, _, deadline in self.buffers.values()]
+                    self.condition.wait(min(deadlines) - now if deadlines else None)
+                if self.closed:
+                    due = list(self.buffers)
+                ready = [self.buffers.pop(peer_id) for peer_id in due]
+                closed = self.closed
+            for peer, transactions, _ in ready:
+                self.send(peer, transactions)
+            if closed:
+                return
+
+    def flush(self):
+        # Envia todos los lotes pendientes sin esperar su plazo
+        with self.condition:
+            ready = list(self.buffers.values())
+            self.buffers = {}
+        for peer, transactions, _ in ready:
+            self.send(peer, transactions)
+
+    def stats(self):
+        with self.condition:
+            items, batches = self.counters["items"], self.counters["batches"]
+            pending = sum(len(transactions) for _, transactions, _ in self.buffers.values())
+        return {
+            "items": items,
+            "batches": batches,
+            "pending": pending,
+            "items_per_batch": round((items - pending) / batches, 2) if batches else 0.0
+        }
+
+    def close(self):
+        # Envia los lotes pendientes y detiene el hilo
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.flusher.join()
@@ -1,5 +1,14 @@
 from coin import Coin
 
+DSC_DECIMALS = 8 # Decimales de DescentraCoin en la codificacion binaria de las transacciones
+BASE_UNITS_PER_DSC = 10 ** DSC_DECIMALS # Unidades enteras por cada DescentraCoin
+
+
+def to_base_units(value):
+    # Convierte una cantidad en DescentraCoin a unidades enteras
+    return round(value * BASE_UNITS_PER_DSC)
+
+
 class DescentraCoin(Coin):
     def __init__(self, amount):
         super().__init__("DSC", "Descentra Coin", amount)
@@ -12,4 +21,7 @@ class DescentraCoin(Coin):
         return cls(
             amount=coin_dict.get("value", 0)  # Usando get para manejar valores por defecto
         )
-    
\ No newline at end of file
+
+    @classmethod
+    def from_base_units(cls, units):
+        return cls(units / BASE_UNITS_PER_DSC)
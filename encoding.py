@@ -0,0 +1,30 @@
+import struct
+
+NONE_TEXT_LENGTH = 0xFFFF  # Longitud reservada para codificar un campo de texto None
+
+
+# Funciones comunes de la codificacion binaria de transacciones y bloques
+
+def pack_bytes(data, length_format=">H"):
+    return struct.pack(length_format, len(data)) + data
+
+
+def unpack_bytes(data, offset, length_format=">H"):
+    (length,) = struct.unpack_from(length_format, data, offset)
+    offset += struct.calcsize(length_format)
+    return bytes(data[offset:offset + length]), offset + length
+
+
+def pack_text(text):
+    # Algunos campos pueden ser None (p. ej. el remitente de las transacciones genesis), se codifican con longitud 0xFFFF
+    if text is None:
+        return struct.pack(">H", NONE_TEXT_LENGTH)
+    return pack_bytes(text.encode("utf-8"))
+
+
+def unpack_text(data, offset):
+    (length,) = struct.unpack_from(">H", data, offset)
+    if length == NONE_TEXT_LENGTH:
+        return None, offset + 2
+    text, offset = unpack_bytes(data, offset)
+    return text.decode("utf-8"), offset
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import random
+import threading
+from seen_filter import RotatingBloomFilter
+
+GOSSIP_FANOUT = 4  # Peers aleatorios a los que se reenvia cada mensaje nuevo; un nodo no lo recibe con probabilidad ~e^-fanout
+GOSSIP_TTL = 6  # Saltos maximos de un mensaje desde el nodo que lo origina
+GOSSIP_TTL_FIELD = "gossip_ttl"  # Campo del mensaje con los saltos que le quedan despues del actual
+
+
+class GossipRelay:
+    """
+    Difusion epidemica de transacciones y anuncios de bloques. El nodo que origina un mensaje lo envia a
+    fanout peers aleatorios en lugar de a todos; cada nodo que lo recibe por primera vez lo reenvia a otros
+    fanout peers con un salto menos, hasta agotar el TTL. Los repetidos se descartan con un conjunto acotado
+    de identificadores vistos, de forma que cada nodo procesa y reenvia cada mensaje una sola vez.
+    Los envios se hacen con el broadcaster (submit(peer, path, payload)).
+    """
+
+    def __init__(self, broadcaster, fanout=GOSSIP_FANOUT, ttl=GOSSIP_TTL, seen=None, rng=None):
+        self.broadcaster = broadcaster
+        self.fanout = fanout
+        self.ttl = ttl
+        self.seen = seen if seen is not None else RotatingBloomFilter()
+        self.rng = rng or random.Random()
+        self.lock = threading.Lock()
+        self.counters = {"published": 0, "received": 0, "duplicates": 0, "relayed": 0}
+
+    @staticmethod
+    def payload_id(payload):
+        # Identificador de un mensaje sin campos de gossip: el mismo en todos los nodos, sin decodificarlo
+        if not isinstance(payload, dict):
+            raise TypeError(f"Gossip payload must be a dict, got {type(payload).__name__}")
+        content = {key: value for key, value in payload.items() if key != GOSSIP_TTL_FIELD}
+        return hashlib.sha256(json.dumps(content, sort_keys=True, separators=(",", ":")).encode('utf-8')).hexdigest()
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def select_peers(self, peers):
+        peers = list(peers)
+        if len(peers) <= self.fanout:
+            return peers
+        return self.rng.sample(peers, self.fanout)
+
+    def send(self, peers, path, payload, ttl):
+        message = {**payload, GOSSIP_TTL_FIELD: ttl}
+        sent = 0
+        for peer in self.select_peers(peers):
+            if self.broadcaster.submit(peer, path, message):
+                sent += 1
+        return sent
+
+    def publish(self, peers, path, message_id, payload):
+        # Mensaje originado en este nodo: se marca como visto para no procesarlo de nuevo cuando vuelva
+        if not isinstance(payload, dict):
+            raise TypeError(f"Gossip payload must be a dict, got {type(payload).__name__}")
+        self.seen.add(message_id)
+        self.count("published")
+        return self.send(peers, path, payload, self.ttl - 1)
+
+    def receive(self, message_id):
+        # Retorna True si el mensaje es nuevo y hay que procesarlo y reenviarlo, False si es un repetido
+        if not self.seen.add(message_id):
+            self.count("duplicates")
+            return False
+        self.count("received")
+        return True
+
+    def relay(self, peers, path, payload):
+        # Reenvia un mensaje recibido con un salto menos; con el TTL agotado (o sin TTL) no se reenvia
+        ttl = min(int(payload.get(GOSSIP_TTL_FIELD, 0)), self.ttl - 1)
+        if ttl <= 0:
+            return 0
+        sent = self.send(peers, path, payload, ttl - 1)
+        self.count("relayed", sent)
+        return sent
+
+    def stats(self):
+        with self.lock:
+            return {"fanout": self.fanout, "ttl": self.ttl, **self.counters}
@@ -0,0 +1,87 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_SIZE = 10  # Conexiones keep-alive por destino (host:puerto)
+
+
+class HTTPSessionPool:
+    """
+    Una requests.Session por destino (host:puerto) con un pool de conexiones keep-alive, de forma que los
+    mensajes frecuentes a un mismo peer o servicio reutilizan la conexion TCP en lugar de abrir una por peticion.
+    Tiene la misma interfaz que el modulo requests (get, post, put, request). stats() informa por destino
+    las peticiones, las conexiones abiertas y la tasa de reutilizacion de conexiones.
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, pool_sizes=None):
+        self.pool_size = pool_size
+        self.pool_sizes = pool_sizes or {}  # host:puerto -> tamano del pool, para destinos con otra concurrencia
+        self.sessions = {}  # host:puerto -> Session
+        self.request_counts = {}  # host:puerto -> peticiones realizadas
+        self.lock = threading.Lock()
+
+    def session_for(self, destination):
+        with self.lock:
+            session = self.sessions.get(destination)
+            if session is None:
+                size = self.pool_sizes.get(destination, self.pool_size)
+                session = requests.Session()
+                # pool_block=False: si todas las conexiones estan ocupadas se abre una extra que no se conserva
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=False)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[destination] = session
+                self.request_counts[destination] = 0
+            self.request_counts[destination] += 1
+            return session
+
+    def request(self, method, url, **kwargs):
+        return self.session_for(urlsplit(url).netloc).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def connections_opened(self, session):
+        # Conexiones TCP abiertas por los pools de urllib3 de la sesion
+        adapter = session.get_adapter("http://")
+        pools = adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def stats(self):
+        with self.lock:
+            sessions = dict(self.sessions)
+            request_counts = dict(self.request_counts)
+        destinations = {}
+        total_requests = total_connections = 0
+        for destination, session in sessions.items():
+            requests_made = request_counts[destination]
+            connections = self.connections_opened(session)
+            total_requests += requests_made
+            total_connections += connections
+            destinations[destination] = {
+                "requests": requests_made,
+                "connections": connections,
+                "reuse_rate": self.reuse_rate(requests_made, connections)
+            }
+        return {"reuse_rate": self.reuse_rate(total_requests, total_connections), "destinations": destinations}
+
+    @staticmethod
+    def reuse_rate(requests_made, connections):
+        # Fraccion de peticiones que no abrieron una conexion nueva
+        if requests_made == 0:
+            return 0.0
+        return round(max(0.0, 1 - connections / requests_made), 4)
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+            self.request_counts = {}
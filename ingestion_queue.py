@@ -0,0 +1,95 @@
+import logging
+import math
+import queue
+import threading
+import time
+
+INGESTION_QUEUE_SIZE = 10000  # Transacciones recibidas en espera de procesarse como maximo
+WAIT_EWMA_ALPHA = 0.1  # Peso de la ultima medicion en las medias de espera y de procesamiento
+
+
+class IngestionQueue:
+    """
+    Cola acotada de transacciones recibidas de los peers, procesadas en orden por un unico hilo. Los handlers
+    de Flask solo encolan (offer) y responden; cuando la cola esta llena offer retorna False y el handler
+    responde 429 con Retry-After (retry_after()). stats() informa la profundidad de la cola y el tiempo de
+    espera de las transacciones antes de procesarse.
+    """
+
+    def __init__(self, handler, max_size=INGESTION_QUEUE_SIZE):
+        self.logger = logging.getLogger('IngestionQueue')
+        self.handler = handler  # Funcion que procesa cada elemento, se llama desde el hilo de la cola
+        self.max_size = max_size
+        self.queue = queue.Queue(maxsize=max_size)
+        self.lock = threading.Lock()
+        self.counters = {"accepted": 0, "rejected": 0, "processed": 0, "failed": 0}
+        self.avg_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.avg_process_ms = 0.0
+        self.worker = threading.Thread(target=self.run, name="ingestion", daemon=True)
+        self.worker.start()
+
+    def offer(self, item):
+        # Encola sin bloquear; retorna False si la cola esta llena
+        try:
+            self.queue.put_nowait((time.perf_counter(), item))
+        except queue.Full:
+            with self.lock:
+                self.counters["rejected"] += 1
+            return False
+        with self.lock:
+            self.counters["accepted"] += 1
+        return True
+
+    def run(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                return
+            enqueued, item = entry
+            start = time.perf_counter()
+            try:
+                self.handler(item)
+                ok = True
+            except Exception as e:
+                self.logger.error(f"Error processing queued item: {e}")
+                ok = False
+            finally:
+                self.queue.task_done()
+            self.record((start - enqueued) * 1000, (time.perf_counter() - start) * 1000, ok)
+
+    def record(self, wait_ms, process_ms, ok):
+        with self.lock:
+            self.counters["processed" if ok else "failed"] += 1
+            self.avg_wait_ms += WAIT_EWMA_ALPHA * (wait_ms - self.avg_wait_ms)
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.avg_process_ms += WAIT_EWMA_ALPHA * (process_ms - self.avg_process_ms)
+
+    def retry_after(self):
+        # Segundos estimados hasta que se vacie la cola, como minimo 1 (valor de la cabecera Retry-After)
+        with self.lock:
+            avg_process_ms = self.avg_process_ms
+        return max(1, math.ceil(self.queue.qsize() * avg_process_ms / 1000))
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "depth": self.queue.qsize(),
+                "capacity": self.max_size,
+                **self.counters,
+                "avg_wait_ms": round(self.avg_wait_ms, 2),
+                "max_wait_ms": round(self.max_wait_ms, 2),
+                "avg_process_ms": round(self.avg_process_ms, 2)
+            }
+
+    def join(self):
+        # Espera a que se procesen todos los elementos encolados
+        self.queue.join()
+
+    def close(self):
+        self.join()
+        self.queue.put(None)
+        self.worker.join()
@@ -0,0 +1,31 @@
+import json
+import os
+
+
+class LocalKeyStore:
+    """
+    Guarda en disco las wallets locales con clave privada (las wallets especiales de la blockchain), fuera del
+    estado y de los bloques. Al reiniciar se cargan las mismas claves, de forma que las cuentas del registro
+    siguen correspondiendo a las claves con las que firma el nodo. El fichero solo es legible por el usuario.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        # address -> diccionario de Wallet.to_dict(), vacio si todavia no se guardo ninguna clave
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as archivo:
+            return json.load(archivo)
+
+    def save(self, wallets):
+        # Escritura atomica: se escribe un fichero temporal (permisos 0600) y se renombra
+        temp_path = self.path + ".tmp"
+        descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w") as archivo:
+            json.dump({wallet.address: wallet.to_dict() for wallet in wallets}, archivo)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,71 @@
+import base64
+import binascii
+import struct
+from block import Block
+from merkle import verify_merkle_proof
+from transaction import Transaction
+
+
+class HeaderChain:
+    """
+    Cadena de cabeceras de un nodo ligero. Solo guarda la cabecera y el hash de cada bloque, no las
+    transacciones, y comprueba localmente las pruebas de inclusion de Merkle que envian los nodos completos.
+    """
+
+    def __init__(self):
+        self.headers = []  # Cabeceras en orden de altura, cada una con su hash
+
+    def __len__(self):
+        return len(self.headers)
+
+    def get_last_header(self):
+        return self.headers[-1] if self.headers else None
+
+    def add_headers(self, headers):
+        # Anade cabeceras que continuan la cadena local. Retorna False si alguna no encaja o su hash no es correcto
+        for header in headers:
+            header = dict(header)
+            block_hash = header.pop("hash", None)
+            if header.get("index") != len(self.headers):
+                return False
+            if self.headers and header.get("previous_hash") != self.headers[-1]["hash"]:
+                return False
+            if block_hash != Block.hash_header(header):
+                return False
+            header["hash"] = block_hash
+            self.headers.append(header)
+        return True
+
+    def replace_headers(self, headers):
+        # Sustituye la cadena de cabeceras (la cadena del nodo completo diverge de la local)
+        previous_headers = self.headers
+        self.headers = []
+        if not self.add_headers(headers):
+            self.headers = previous_headers
+            return False
+        return True
+
+    def verify_proof(self, proof, tx_id):
+        """
+        Comprueba una respuesta de /proof/<tx_id>: la transaccion enviada es una codificacion valida cuyo tx_id
+        es el pedido, el camino de Merkle lleva a la raiz de la cabecera y la cabecera es la que el nodo ligero
+        tiene a esa altura.
+        """
+        block_index = proof["block_index"]
+        if block_index >= len(self.headers):
+            return False
+        header = self.headers[block_index]
+        if header["hash"] != proof["block_hash"]:
+            return False
+
+        # Se decodifica la transaccion: unos bytes cualquiera con el hash adecuado no son una transaccion
+        try:
+            transaction = Transaction.decode(base64.b64decode(proof["transaction"], validate=True))
+        except (ValueError, struct.error, binascii.Error):
+            return False
+        if transaction.tx_id != tx_id or proof["tx_id"] != tx_id:
+            return False
+        return verify_merkle_proof(tx_id, proof["proof"], header["merkle_root"])
+
+    def confirmations(self, block_index):
+        return len(self.headers) - block_index
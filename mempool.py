@@ -0,0 +1,95 @@
+from collections import OrderedDict, deque
+from transaction import Transaction
+
+MEMPOOL_MAX_TRANSACTIONS = 5000  # Maximo de transacciones pendientes
+MEMPOOL_MAX_BYTES = 5 * 1024 * 1024  # Maximo de bytes (codificacion binaria) de transacciones pendientes
+
+
+class Mempool:
+    """
+    Transacciones pendientes indexadas por el digest firmado (Transaction.digest en hexadecimal). El tx_id incluye
+    la firma y una firma ECDSA se puede alterar sin la clave (s -> n - s), asi que el tx_id no sirve para detectar
+    duplicados: la misma transaccion con otra firma tiene el mismo digest.
+    Evita duplicados, mantiene una cola por remitente y limita el tamano total; cuando se supera el limite
+    se descarta la transaccion mas reciente del remitente con mas transacciones pendientes.
+    Al iterar se obtienen las transacciones en orden de llegada, que respeta el orden de cada remitente.
+    """
+
+    def __init__(self, max_transactions=MEMPOOL_MAX_TRANSACTIONS, max_bytes=MEMPOOL_MAX_BYTES):
+        self.max_transactions = max_transactions
+        self.max_bytes = max_bytes
+        self.transactions = OrderedDict()  # tx_hash -> (transaction, size) en orden de llegada
+        self.sender_queues = {}  # sender -> deque de tx_hash en orden de llegada
+        self.total_bytes = 0
+        self.evicted = 0
+
+    def add(self, transaction):
+        # Retorna False si la transaccion ya estaba pendiente o fue descartada por falta de espacio
+        if isinstance(transaction, dict):
+            transaction = Transaction.from_dict(transaction)
+
+        tx_hash = transaction.digest.hex()
+        if tx_hash in self.transactions:
+            return False
+
+        size = len(transaction.encode())
+        self.transactions[tx_hash] = (transaction, size)
+        self.sender_queues.setdefault(transaction.sender, deque()).append(tx_hash)
+        self.total_bytes += size
+
+        while len(self.transactions) > self.max_transactions or self.total_bytes > self.max_bytes:
+            self._evict()
+        return tx_hash in self.transactions
+
+    def _evict(self):
+        sender = max(self.sender_queues, key=lambda address: len(self.sender_queues[address]))
+        self._remove(self.sender_queues[sender][-1])
+        self.evicted += 1
+
+    def _remove(self, tx_hash):
+        transaction, size = self.transactions.pop(tx_hash)
+        self.total_bytes -= size
+        queue = self.sender_queues[transaction.sender]
+        if queue[-1] == tx_hash:
+            queue.pop()
+        elif queue[0] == tx_hash:
+            queue.popleft()
+        else:
+            queue.remove(tx_hash)
+        if not queue:
+            del self.sender_queues[transaction.sender]
+
+    def remove(self, tx_hashes):
+        for tx_hash in tx_hashes:
+            if tx_hash in self.transactions:
+                self._remove(tx_hash)
+
+    def remove_included(self, encoded_transactions):
+        # Elimina las transacciones incluidas en un bloque (codificaciones binarias de Block.transactions)
+        self.remove(Transaction.decode(encoded).digest.hex() for encoded in encoded_transactions)
+
+    def drain(self, limit=None):
+        # Lista (tx_hash, transaction) en orden de llegada para construir un bloque; se eliminan con remove()
+        items = []
+        for tx_hash, (transaction, _) in self.transactions.items():
+            if limit is not None and len(items) >= limit:
+                break
+            items.append((tx_hash, transaction))
+        return items
+
+    def get_sender_transactions(self, sender):
+        return [self.transactions[tx_hash][0] for tx_hash in self.sender_queues.get(sender, ())]
+
+    def clear(self):
+        self.transactions.clear()
+        self.sender_queues.clear()
+        self.total_bytes = 0
+
+    def __contains__(self, tx_hash):
+        return tx_hash in self.transactions
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __iter__(self):
+        return (transaction for transaction, _ in self.transactions.values())
@@ -0,0 +1,63 @@
+import hashlib
+
+EMPTY_MERKLE_ROOT = hashlib.sha256(b"").hexdigest()  # Raiz de un bloque sin transacciones
+LEAF_PREFIX = b"\x00"  # Prefijo de las hojas: se hashea el tx_id, no la transaccion
+NODE_PREFIX = b"\x01"  # Prefijo de los nodos internos
+# Hojas y nodos internos se hashean con prefijos distintos sobre entradas de 32 y 64 bytes: un nodo interno
+# no puede presentarse como hoja aunque una codificacion de transaccion empiece por el byte de NODE_PREFIX
+
+
+def hash_leaf(tx_id):
+    return hashlib.sha256(LEAF_PREFIX + tx_id).digest()
+
+
+def hash_pair(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_levels(leaves):
+    """
+    Construye los niveles del arbol de Merkle a partir de los tx_id en bytes (el primer nivel son sus hashes de hoja).
+    Un nodo sin pareja sube tal cual al nivel siguiente, sin duplicarse, de forma que dos listas
+    distintas de transacciones no pueden producir la misma raiz.
+    """
+    levels = [[hash_leaf(tx_id) for tx_id in leaves]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        next_level = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        levels.append(next_level)
+    return levels
+
+
+def merkle_root(tx_ids):
+    # tx_ids: lista de tx_id en hexadecimal, en el orden del bloque
+    if not tx_ids:
+        return EMPTY_MERKLE_ROOT
+    return build_levels(bytes.fromhex(tx_id) for tx_id in tx_ids)[-1][0].hex()
+
+
+def merkle_proof(tx_ids, position):
+    # Prueba de inclusion de la transaccion en la posicion dada: lista de [lado, hash hermano]
+    levels = build_levels(bytes.fromhex(tx_id) for tx_id in tx_ids)
+    proof = []
+    for level in levels[:-1]:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append(["left" if sibling < position else "right", level[sibling].hex()])
+        position //= 2
+    return proof
+
+
+def verify_merkle_proof(tx_id, proof, root):
+    current = hash_leaf(bytes.fromhex(tx_id))
+    for side, sibling_hex in proof:
+        sibling = bytes.fromhex(sibling_hex)
+        if side == "left":
+            current = hash_pair(sibling, current)
+        elif side == "right":
+            current = hash_pair(current, sibling)
+        else:
+            return False
+    return current.hex() == root
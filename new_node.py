@@ -1,13 +1,26 @@
+import base64
+import binascii
 import json
 import logging
 import os
+import struct
 import subprocess
 import time
-import requests
 from flask import Flask, request, jsonify, send_file
-from threading import Thread
+from threading import Thread, RLock
 from wallet import Wallet, Transaction, DescentraCoin
 from blockchain import Blockchain
+from block import Block
+from block_store import BlockStore
+from state_store import SQLiteStateStore
+from key_store import LocalKeyStore
+from signature_cache import SIGNATURE_CACHE
+from light_client import HeaderChain
+from peer_broadcaster import PeerBroadcaster
+from http_pool import HTTPSessionPool
+from gossip import GossipRelay
+from coalescer import OutboundCoalescer
+from ingestion_queue import IngestionQueue
 
 # Configuración básica de logging
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +31,33 @@ CLUSTER_API_URL = "http://localhost:9094"
 REGISTRY_FOLDER = 'registry'
 REGISTRO_JSON = os.path.join(REGISTRY_FOLDER, 'registro_archivos.json')
 MIN_PENDING_TRANSACTIONS = 3
+HISTORY_PAGE_SIZE = 50 # Tamano de pagina por defecto de /history/<address>
+HISTORY_MAX_PAGE_SIZE = 500
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", "checkpoints") # Directorio de checkpoints del estado de la blockchain
+CHECKPOINT_INTERVAL = int(os.environ.get("CHECKPOINT_INTERVAL", 100)) # Bloques entre checkpoints
+SIGNATURE_VERIFY_WORKERS = int(os.environ.get("SIGNATURE_VERIFY_WORKERS", 4)) # Procesos para verificar firmas antes de crear un bloque
+EXECUTION_WORKERS = int(os.environ.get("EXECUTION_WORKERS", 4)) # Hilos para ejecutar en paralelo transacciones sin conflictos
+BLOCK_STORE_DIR = os.environ.get("BLOCK_STORE_DIR", "blocks") # Almacen de bloques en disco, la cadena se conserva entre reinicios
+STATE_DB = os.environ.get("STATE_DB", os.path.join("state", "state.db")) # Estado (balances, wallets, stake) en SQLite
+NODE_WALLET_FILE = os.environ.get("NODE_WALLET_FILE", os.path.join("state", "node_wallet.json")) # Clave de la wallet del nodo, la direccion y sus fondos se conservan entre reinicios
+NODE_WALLET_BALANCE = 10000 # DSC con los que se inicializa la wallet del nodo la primera vez
+SPECIAL_KEYS_FILE = os.environ.get("SPECIAL_KEYS_FILE", os.path.join("state", "special_keys.json")) # Claves de las wallets especiales, se conservan entre reinicios; los nodos que emiten recompensas comparten este fichero con el nodo que creo el genesis
+LIGHT_NODE = os.environ.get("LIGHT_NODE", "0") == "1" # Nodo ligero: solo cabeceras y pruebas de inclusion, sin cadena completa ni wallet
+BROADCAST_WORKERS = int(os.environ.get("BROADCAST_WORKERS", 8)) # Hilos que envian transacciones y anuncios de bloques a los peers
+BROADCAST_MAX_PENDING = int(os.environ.get("BROADCAST_MAX_PENDING", 1000)) # Envios a peers en cola como maximo
+PEER_CONNECT_TIMEOUT = float(os.environ.get("PEER_CONNECT_TIMEOUT", 1.0)) # Segundos para conectar con un peer
+PEER_READ_TIMEOUT = float(os.environ.get("PEER_READ_TIMEOUT", 3.0)) # Segundos para recibir la respuesta de un peer
+PEER_POOL_SIZE = int(os.environ.get("PEER_POOL_SIZE", 8)) # Conexiones keep-alive por peer
+SERVICE_POOL_SIZE = int(os.environ.get("SERVICE_POOL_SIZE", 2)) # Conexiones keep-alive con Consul y con el cluster y gateway de IPFS
+SERVICE_DESTINATIONS = ("consul:8500", "cluster1:9094", "ipfs1:8080")
+GOSSIP_FANOUT = int(os.environ.get("GOSSIP_FANOUT", 4)) # Peers aleatorios a los que se reenvia cada transaccion o bloque nuevo
+GOSSIP_TTL = int(os.environ.get("GOSSIP_TTL", 6)) # Saltos maximos de una transaccion o anuncio de bloque
+COALESCE_DELAY_MS = float(os.environ.get("COALESCE_DELAY_MS", 5)) # Milisegundos que se acumulan transacciones salientes antes de enviarlas
+COALESCE_MAX_ITEMS = int(os.environ.get("COALESCE_MAX_ITEMS", 100)) # Transacciones por peticion a /transactions como maximo
+MAX_BATCH_TRANSACTIONS = 1000 # Transacciones aceptadas en una peticion a /transactions
+INGESTION_QUEUE_SIZE = int(os.environ.get("INGESTION_QUEUE_SIZE", 10000)) # Transacciones recibidas en espera como maximo, por encima se responde 429
+TRANSACTION_FIELDS = ("sender", "recipient", "amount", "type", "timestamp", "new_wallet", "file_size") # Campos que necesita Transaction.from_dict
+RELAY_STATUSES = ("Blocks applied", "Blockchain replaced", "Already up to date") # Tras estos estados el nodo tiene el bloque anunciado
 
 class Node:
     # Initialization and Network Setup
@@ -30,22 +70,65 @@ class Node:
         self.id = os.environ.get("NODE_ID")
         self.port = os.environ.get("NODE_PORT")
         self.app = Flask(__name__)
+        self.light = LIGHT_NODE
+        # Conexiones HTTP reutilizables por destino, todas las peticiones del nodo pasan por aqui
+        self.http = HTTPSessionPool(pool_size=PEER_POOL_SIZE,
+                                    pool_sizes={destination: SERVICE_POOL_SIZE for destination in SERVICE_DESTINATIONS})
+        # Los envios a peers se hacen desde un pool de hilos, los handlers no esperan a los peers
+        self.broadcaster = PeerBroadcaster(workers=BROADCAST_WORKERS, max_pending=BROADCAST_MAX_PENDING,
+                                           timeout=(PEER_CONNECT_TIMEOUT, PEER_READ_TIMEOUT), post=self.http.post)
+        # Las transacciones y bloques nuevos se reenvian a unos pocos peers aleatorios en lugar de a todos
+        # y las transacciones salientes se agrupan por peer en una peticion a /transactions
+        self.coalescer = OutboundCoalescer(self.broadcaster, delay_ms=COALESCE_DELAY_MS, max_items=COALESCE_MAX_ITEMS)
+        self.gossip = GossipRelay(self.coalescer, fanout=GOSSIP_FANOUT, ttl=GOSSIP_TTL)
+        # Los handlers de Flask, el hilo de ingestion y la creacion de bloques comparten la blockchain
+        self.chain_lock = RLock()
+        # Las transacciones recibidas se procesan en orden en un unico hilo, los handlers solo las encolan
+        self.ingestion = IngestionQueue(self.receive_gossip_transaction, max_size=INGESTION_QUEUE_SIZE)
+
+        if self.light:
+            # El nodo ligero no construye la blockchain: solo mantiene las cabeceras de los bloques
+            self.header_chain = HeaderChain()
+            self.descentrachain = None
+            self.wallet = None
+            self.wallet_address = self.id
+            self.setup_light_routes()
+        else:
+            self.descentrachain = Blockchain(checkpoint_dir=CHECKPOINT_DIR, checkpoint_interval=CHECKPOINT_INTERVAL,
+                                             signature_workers=SIGNATURE_VERIFY_WORKERS, execution_workers=EXECUTION_WORKERS,
+                                             block_store=BlockStore(BLOCK_STORE_DIR), state_store=SQLiteStateStore(STATE_DB),
+                                             key_store=LocalKeyStore(SPECIAL_KEYS_FILE))
 
-        self.descentrachain = Blockchain()
+            self.wallet_store = LocalKeyStore(NODE_WALLET_FILE)
+            self.wallet = self.load_or_create_wallet()
+            self.wallet_address = self.wallet.address
 
-        self.wallet = Wallet(self.descentrachain, 10000)
-        self.wallet_address = self.wallet.address
+            self.wallet.files_name_hash_list = self.cargar_registros_desde_json() # Cargar registros desde el archivo JSON
 
-        self.wallet.files_name_hash_list = self.cargar_registros_desde_json() # Cargar registros desde el archivo JSON
+            self.setup_routes()
 
         # Network configuration and Consul registration
-        self.setup_routes()
         self.register_with_consul()
         time.sleep(5)
 
         self.node_addresses = self.discover_nodes()
         self.logger.info(f"Node addresses: {self.node_addresses}")
 
+    # Wallet del nodo: se carga del almacen de claves y solo se crea (e inicializa) en el primer arranque
+    def load_or_create_wallet(self):
+        stored = self.wallet_store.load()
+        if not stored:
+            wallet = Wallet(self.descentrachain, NODE_WALLET_BALANCE)
+            self.wallet_store.save([wallet])
+            return wallet
+
+        wallet = self.descentrachain.load_local_wallet(next(iter(stored.values())))
+        if wallet.address not in self.descentrachain.wallets:
+            # La inicializacion no llego a incluirse en un bloque antes del reinicio: se repite con la misma clave
+            wallet.initialize_transaction_dict = self.descentrachain.initialize_wallet(wallet.address, DescentraCoin(NODE_WALLET_BALANCE), wallet)
+        self.logger.info(f"Node wallet loaded: {wallet.address}")
+        return wallet
+
 # Funciones almacenar registro IPFS ------------------------------------------------   
 
     # Cargar registros desde el archivo JSON si existe
@@ -74,12 +157,12 @@ class Node:
     def register_with_consul(self):
         consul_url = 'http://consul:8500/v1/agent/service/register'
         service = {"Name": self.id, "Port": int(self.port), "Address": self.wallet_address}
-        requests.put(consul_url, json=service)
+        self.http.put(consul_url, json=service)
         self.logger.info(f"Registered service with Consul: {service}")
 
     def discover_nodes(self):
         consul_url = 'http://consul:8500/v1/agent/services'
-        response = requests.get(consul_url)
+        response = self.http.get(consul_url)
         services = response.json()
 
         node_addresses = []
@@ -111,13 +194,21 @@ class Node:
         self.logger.info("Esperando a que el servidor Flask se inicie...")
         time.sleep(10)  # Ajustar este tiempo según sea necesario
 
+        if self.light:
+            # El nodo ligero descarga las cabeceras de cualquier nodo completo y sigue los anuncios de bloques
+            for peer in self.node_addresses:
+                if self.sync_headers_from_node(peer["id"]) != "Sync failed":
+                    break
+            return
+
         # Luego de la espera, realizar la transacción inicial
         self.logger.info("Verificando si realizar broadcast o proceso de validacion...")
 
         if len(self.descentrachain.pending_transactions) >= MIN_PENDING_TRANSACTIONS:
             self.logger.info(f"Pending transactions are full.")
             self.validate_and_create_block_if_needed()
-        else:
+        elif self.wallet.initialize_transaction_dict:
+            # Tras un reinicio la wallet del nodo ya esta registrada y no hay transaccion de inicializacion
             self.broadcast_transaction(self.wallet.initialize_transaction_dict)
 
 # --------------------------------------------------------------------------------
@@ -143,27 +234,28 @@ class Node:
             # Log the received action
             self.logger.info(f"Received wallet action: {action}")
 
-            if action == 'stake':
-                transaction_dict = self.wallet.stake(DescentraCoin(amount))
-            elif action == 'unstake':
-                transaction_dict = self.wallet.unstake(DescentraCoin(amount))
-            elif action == 'become_validator':
-                transaction_dict = self.wallet.become_validator()
-            elif action == 'cease_validator':
-                transaction_dict = self.wallet.cease_validator()
-            else:
-                return jsonify({"status": "Unrecognized action"}), 400
-            
-            transaction = Transaction.from_dict(transaction_dict)
-            self.descentrachain.add_transaction(transaction)
+            with self.chain_lock:
+                if action == 'stake':
+                    transaction_dict = self.wallet.stake(DescentraCoin(amount))
+                elif action == 'unstake':
+                    transaction_dict = self.wallet.unstake(DescentraCoin(amount))
+                elif action == 'become_validator':
+                    transaction_dict = self.wallet.become_validator()
+                elif action == 'cease_validator':
+                    transaction_dict = self.wallet.cease_validator()
+                else:
+                    return jsonify({"status": "Unrecognized action"}), 400
 
-            # Check if the pending transactions queue is full
-            if len(self.descentrachain.pending_transactions) >= MIN_PENDING_TRANSACTIONS:
-               self.logger.info(f"Pending transactions are full.")
-               self.validate_and_create_block_if_needed()
-            else:
-                # If not full, broadcast the transaction
-                self.broadcast_transaction(transaction_dict)
+                transaction = Transaction.from_dict(transaction_dict)
+                self.descentrachain.add_transaction(transaction)
+
+                # Check if the pending transactions queue is full
+                if len(self.descentrachain.pending_transactions) >= MIN_PENDING_TRANSACTIONS:
+                   self.logger.info(f"Pending transactions are full.")
+                   self.validate_and_create_block_if_needed()
+                else:
+                    # If not full, broadcast the transaction
+                    self.broadcast_transaction(transaction_dict)
 
             response = {
                 "status": "Action completed and transaction broadcasted",
@@ -176,68 +268,85 @@ class Node:
         # Recibir transaccion
         @self.app.route('/transaction', methods=['POST'])
         def receive_transaction():
-            transaction_dict = request.json
-            self.process_received_transaction(transaction_dict)
-
-            self.logger.info(f"Processed transaction: {transaction_dict}")
+            return self.enqueue_transactions([request.get_json(silent=True)])
 
-            response = {
-                "status": "Transaction received and processed",
-                "transaction_info": transaction_dict
-            }
-            return jsonify(response), 200
+        # Recibir un lote de transacciones en una sola peticion, {"transactions": [...]}
+        @self.app.route('/transactions', methods=['POST'])
+        def receive_transactions():
+            return self.receive_transaction_batch(request.get_json(silent=True))
         
 
-        # Actualizar blockchain tras validacion
-        @self.app.route('/update_blockchain', methods=['POST'])
-        def update_blockchain():
-            self.descentrachain.pending_transactions = [] # Reset pending transactions 
-            data = request.json
-
-            blockchain_data = data.get("blockchain")
-            target_node_data = data.get("target_node")
-
-            self.logger.info(f"Received blockchain update: {blockchain_data}")
-            # Crear una nueva instancia de Blockchain a partir del diccionario recibido
-            nueva_blockchain = Blockchain.from_dict(blockchain_data)
-            self.logger.info(f"New blockchain type: {type(nueva_blockchain)} ------------------")
-
-            # Actualizar la instancia actual con la nueva instancia creada
-            self.descentrachain = nueva_blockchain
-            self.logger.info(f"Blockchain actualizada: {self.descentrachain.to_dict()}")
-            self.logger.info(f"Blockchain actualizada type: {type(self.descentrachain)} ------------------")
-
-            # Crear una nueva instancia de Wallet a partir del diccionario recibido
-            new_Wallet = Wallet.from_dict(target_node_data, self.descentrachain)
-            self.logger.info(f"New wallet type: {type(new_Wallet)} ------------------")
-            self.wallet.blockchain = self.descentrachain # Actualizar blockchain de la wallet
-
-            # Actualizar la instancia actual con la nueva instancia creada
-            self.wallet = new_Wallet
-            self.logger.info(f"Wallet actualizada: {self.wallet.to_dict()}")
-            self.wallet.set_blockchain(self.descentrachain)
-            self.logger.info(f"Blockchain de la wallet actualizada type: {type(self.wallet.blockchain)} ------------------")
-
-
-            # wallet_info = self.descentrachain.get_wallet_info(self.wallet_address)
-            # self.logger.info(f"Wallet info: {wallet_info}")
-            # self.wallet.update_wallet_info(wallet_info) # Update wallet info after blockchain update
-            # Definir títulos intermedios
-            # wallets_title = "Wallets de la blockchain tras validar"
-            # validated_transactions_title = "Transacciones validadas"
-            # invalid_transactions_title = "Transacciones no validadas"
-
-            # # Construir el mensaje de registro
-            # log_message = (
-            #     "\n\n"
-            #     f"{wallets_title}: {self.descentrachain.print_wallets()}\n"
-            #     f"{validated_transactions_title}: {self.descentrachain.print_validated_transactions()}\n"
-            #     f"{invalid_transactions_title}: {self.descentrachain.print_invalid_transactions()}\n\n"
-            # )
-
-            # # Registra el mensaje
-            # self.logger.info(log_message)
-            return jsonify({"status": "Blockchain updated"}), 200
+        # Anuncio de un nuevo bloque (altura + hash), el nodo descarga solo los bloques que le faltan
+        @self.app.route('/announce_block', methods=['POST'])
+        def announce_block():
+            announcement = request.json
+            if not self.gossip.receive(announcement["hash"]):
+                return jsonify({"status": "Block already announced"}), 200
+            self.logger.info(f"Received block announcement: {announcement}")
+            status = self.process_block_announcement(announcement)
+            if status in RELAY_STATUSES:
+                # El nodo ya tiene el bloque: los peers siguientes lo descargan de este nodo
+                announcement = {**announcement, "origin": self.id}
+            self.gossip.relay(self.node_addresses, "announce_block", announcement)
+            return jsonify({"status": status}), 200
+
+        # Bloques a partir de una altura, /blocks?from=<height>
+        @self.app.route('/blocks', methods=['GET'])
+        def get_blocks():
+            from_height = request.args.get('from', default=0, type=int)
+            with self.chain_lock:
+                blocks = self.descentrachain.get_blocks_from(from_height)
+                height = len(self.descentrachain.chain)
+            return jsonify({"height": height, "blocks": blocks}), 200
+
+        # Ultimo checkpoint del estado de este nodo, solo informativo: los demas nodos no lo importan, su state_hash
+        # lo calcula quien lo envia y no prueba que el estado corresponda a la cadena
+        @self.app.route('/checkpoint', methods=['GET'])
+        def get_checkpoint():
+            checkpoint = self.descentrachain.checkpoints.load_latest()
+            if checkpoint is None:
+                return jsonify({"error": "No checkpoint available"}), 404
+            return jsonify(checkpoint), 200
+
+        # Cabeceras a partir de una altura, /headers?from=<height>, para los nodos ligeros
+        @self.app.route('/headers', methods=['GET'])
+        def get_headers():
+            from_height = request.args.get('from', default=0, type=int)
+            with self.chain_lock:
+                headers = self.descentrachain.get_headers_from(from_height)
+                height = len(self.descentrachain.chain)
+            return jsonify({"height": height, "headers": headers}), 200
+
+        # Prueba de inclusion de Merkle de una transaccion incluida en la cadena
+        @self.app.route('/proof/<tx_id>', methods=['GET'])
+        def get_proof(tx_id):
+            with self.chain_lock:
+                proof = self.descentrachain.get_transaction_proof(tx_id)
+            if proof is None:
+                return jsonify({"error": "Transaction not found in the chain"}), 404
+            return jsonify(proof), 200
+
+        # Metricas del nodo
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics():
+            return jsonify(self.get_metrics()), 200
+
+        # Historial paginado de una direccion, /history/<address>?offset=0&limit=50
+        @self.app.route('/history/<address>', methods=['GET'])
+        def get_history(address):
+            offset = max(request.args.get('offset', default=0, type=int), 0)
+            limit = min(max(request.args.get('limit', default=HISTORY_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+            with self.chain_lock:
+                index = self.descentrachain.address_index
+                history = {
+                    "address": address,
+                    "balance": DescentraCoin.from_base_units(index.get_balance(address)).value,
+                    "total": index.count(address),
+                    "offset": offset,
+                    "limit": limit,
+                    "transactions": self.descentrachain.get_address_history(address, offset, limit)
+                }
+            return jsonify(history), 200
 
         # Endpoints IPFS / IPFS Cluster --------------------------------------------
 
@@ -255,12 +364,16 @@ class Node:
 
             file = request.files['file']
             sender_address = request.form.get('sender_address')
-            file_size_mb = request.form.get('file_size_mb')
-            file_size_mb = float(file_size_mb)
-
             if file.filename == '':
                 return jsonify({"error": "No selected file"}), 400
 
+            # La tarifa se calcula antes de subir el archivo: con un tamano invalido no se sube nada a IPFS
+            try:
+                file_size_mb = float(request.form.get('file_size_mb'))
+                self.wallet.calculate_transaction_fee_IPFS(file_size_mb)
+            except (TypeError, ValueError):
+                return jsonify({"error": "Invalid file_size_mb, expected a positive number of MB"}), 400
+
             # Guardar temporalmente el archivo
             temp_path = os.path.join("temp_files", file.filename)
             if not os.path.exists("temp_files"):
@@ -277,7 +390,7 @@ class Node:
                 add_url = f'http://cluster1:9094/add'
 
                 # Enviar el archivo al Cluster 1 a través de una solicitud HTTP POST
-                response = requests.post(f"{add_url}", files={"file": (file.filename, open(temp_path, 'rb'))})
+                response = self.http.post(f"{add_url}", files={"file": (file.filename, open(temp_path, 'rb'))})
 
                 if response.status_code == 200:
                     # La solicitud fue exitosa, puedes obtener el resultado si es necesario
@@ -304,16 +417,17 @@ class Node:
 
             self.logger.info(f"File size: {file_size_mb}")
             #Utilizar file_size para crear transaction de upload IPFS
-            upload_file_transaction = self.wallet.upload_file(file_size=file_size_mb)
-            self.descentrachain.add_transaction(upload_file_transaction)  #, ya se agrega en el metodo upload_file
-            
-            self.logger.info(f"Pending transactions: {len(self.descentrachain.pending_transactions)} / {MIN_PENDING_TRANSACTIONS}")
-            if len(self.descentrachain.pending_transactions) >= MIN_PENDING_TRANSACTIONS:
-                
-                self.logger.info(f"Pending transactions are full.")
-                self.validate_and_create_block_if_needed()
-            else:
-                self.broadcast_transaction(upload_file_transaction)
+            with self.chain_lock:
+                upload_file_transaction = self.wallet.upload_file(file_size=file_size_mb)
+                self.descentrachain.add_transaction(upload_file_transaction)  #, ya se agrega en el metodo upload_file
+
+                self.logger.info(f"Pending transactions: {len(self.descentrachain.pending_transactions)} / {MIN_PENDING_TRANSACTIONS}")
+                if len(self.descentrachain.pending_transactions) >= MIN_PENDING_TRANSACTIONS:
+
+                    self.logger.info(f"Pending transactions are full.")
+                    self.validate_and_create_block_if_needed()
+                else:
+                    self.broadcast_transaction(upload_file_transaction)
 
 
             return jsonify({"hash": file_hash, "filename": file.filename, "sender_address": sender_address})
@@ -328,7 +442,7 @@ class Node:
                 ipfs_gateway_url = f'http://ipfs1:8080/ipfs/{cid}'
 
                 # Realizar la solicitud para descargar el archivo desde el gateway IPFS
-                response = requests.get(ipfs_gateway_url, stream=True)
+                response = self.http.get(ipfs_gateway_url, stream=True)
 
                 if response.status_code == 200:
                     print(f"Downloading file: {filename}")
@@ -340,15 +454,16 @@ class Node:
                         for chunk in response.iter_content(chunk_size=8192):
                             f.write(chunk)
 
-                    retrieve_file_transaction = self.wallet.download_file()
-                    
-                    self.descentrachain.add_transaction(retrieve_file_transaction)#, ya se agrega en el metodo download_file
-            
-                    if len(self.descentrachain.pending_transactions) >= MIN_PENDING_TRANSACTIONS:
-                        self.logger.info(f"Pending transactions are full.")
-                        self.validate_and_create_block_if_needed()
-                    else:
-                        self.broadcast_transaction(retrieve_file_transaction)
+                    with self.chain_lock:
+                        retrieve_file_transaction = self.wallet.download_file()
+
+                        self.descentrachain.add_transaction(retrieve_file_transaction)#, ya se agrega en el metodo download_file
+
+                        if len(self.descentrachain.pending_transactions) >= MIN_PENDING_TRANSACTIONS:
+                            self.logger.info(f"Pending transactions are full.")
+                            self.validate_and_create_block_if_needed()
+                        else:
+                            self.broadcast_transaction(retrieve_file_transaction)
 
                     return send_file(file_path, as_attachment=True)
                 
@@ -373,48 +488,119 @@ class Node:
         
 
 
-# --------------------------------------------------------------------------------
+    # Rutas del nodo ligero: sigue los anuncios de bloques descargando solo cabeceras
+    # y verifica localmente las pruebas de inclusion que piden los clientes
+    def setup_light_routes(self):
 
-# Other Functions
+        @self.app.route('/')
+        def home():
+            return jsonify({"message": "API/Light node Running"}), 200
+
+        @self.app.route('/announce_block', methods=['POST'])
+        def announce_block():
+            announcement = request.json
+            if not self.gossip.receive(announcement["hash"]):
+                return jsonify({"status": "Block already announced"}), 200
+            self.logger.info(f"Received block announcement: {announcement}")
+            status = self.process_header_announcement(announcement)
+            # El nodo ligero no tiene los bloques, reenvia el anuncio con el origen original
+            self.gossip.relay(self.node_addresses, "announce_block", announcement)
+            return jsonify({"status": status}), 200
+
+        # El nodo ligero no mantiene transacciones pendientes, solo las reenvia
+        @self.app.route('/transaction', methods=['POST'])
+        def receive_transaction():
+            return self.enqueue_transactions([request.get_json(silent=True)])
 
-    # Send Blockchain Update to a Specific Node
-    def send_blockchain_to_node(self, target_node, blockchain_dict):
-        url = f"http://{target_node['id']}:6000/update_blockchain"
-        self.logger.info(f"Sending blockchain update to {url}")
+        @self.app.route('/transactions', methods=['POST'])
+        def receive_transactions():
+            return self.receive_transaction_batch(request.get_json(silent=True))
 
-        target_node_wallet = self.descentrachain.wallets.get(target_node['address'])
-        target_node_dict = Wallet.to_dict(target_node_wallet)
+        # Confirma que una transaccion esta incluida en la cadena, /verify/<tx_id>
+        @self.app.route('/verify/<tx_id>', methods=['GET'])
+        def verify_transaction(tx_id):
+            result = self.verify_transaction_inclusion(tx_id)
+            return jsonify(result), 200 if result["included"] else 404
 
-        data_to_send = {
-        "blockchain": blockchain_dict,
-        "target_node": target_node_dict
-        }
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics():
+            return jsonify(self.get_metrics()), 200
 
-        try:
-            response = requests.post(url, json=data_to_send)
-            response_json = response.json()
-            self.logger.info(f"Blockchain update sent from {self.id} to {target_node['id']}: {response_json}")
-        except Exception as e:
-            self.logger.error(f"Error sending blockchain update from {self.id} to {target_node['id']}: {e}")
 
-    # Send Transaction to a Specific Node (remain unchanged)
+# --------------------------------------------------------------------------------
+
+# Other Functions
+
+    # Send Block Announcement to a Specific Node, the send is queued in the broadcaster pool
+    def send_block_announcement_to_node(self, target_node, announcement):
+        self.logger.info(f"Queueing block announcement for {target_node['id']}")
+        return self.broadcaster.submit(target_node, "announce_block", announcement)
+
+    # Send Transaction to a Specific Node, the send is queued in the broadcaster pool
     def send_transaction_to_node(self, target_node, transaction_dict):
-        url = f"http://{target_node['id']}:6000/transaction"
-        self.logger.info(f"Sending transaction to {url}")
-        try:
-            response = requests.post(url, json=transaction_dict)
-            response_json = response.json()
-            self.logger.info(f"Transaction sent from {self.id} to {target_node['id']}: {response_json}")
-        except Exception as e:
-            self.logger.error(f"Error sending transaction from {self.id} to {target_node['id']}: {e}")
+        self.logger.info(f"Queueing transaction for {target_node['id']}")
+        return self.broadcaster.submit(target_node, "transaction", transaction_dict)
+
+    # Receive a Gossiped Transaction: duplicates are dropped, new ones are processed (full nodes) and relayed
+    def receive_gossip_transaction(self, transaction_dict):
+        if not self.gossip.receive(self.transaction_gossip_id(transaction_dict)):
+            return False
+        if not self.light:
+            self.process_received_transaction(transaction_dict)
+        self.gossip.relay(self.node_addresses, "transaction", transaction_dict)
+        return True
+
+    # Receive a Batch of Transactions sent by a peer's coalescer
+    def receive_transaction_batch(self, batch):
+        transaction_dicts = batch.get("transactions") if isinstance(batch, dict) else None
+        if not isinstance(transaction_dicts, list):
+            return jsonify({"error": "Expected a list of transactions"}), 400
+        if len(transaction_dicts) > MAX_BATCH_TRANSACTIONS:
+            return jsonify({"error": f"At most {MAX_BATCH_TRANSACTIONS} transactions per batch"}), 413
+        return self.enqueue_transactions(transaction_dicts)
+
+    # Queue Received Transactions for the ingestion worker: only cheap checks run on the request thread
+    def enqueue_transactions(self, transaction_dicts):
+        queued = duplicates = invalid = rejected = 0
+        for transaction_dict in transaction_dicts:
+            # Una transaccion mal formada o repetida no invalida el resto del lote
+            if not isinstance(transaction_dict, dict) or any(field not in transaction_dict for field in TRANSACTION_FIELDS):
+                invalid += 1
+                continue
+            try:
+                gossip_id = self.transaction_gossip_id(transaction_dict)
+            except (KeyError, TypeError, ValueError, struct.error, binascii.Error):
+                invalid += 1
+                continue
+            if gossip_id in self.gossip.seen:
+                duplicates += 1
+            elif self.ingestion.offer(transaction_dict):
+                queued += 1
+            else:
+                rejected += 1
+
+        result = {"received": len(transaction_dicts), "queued": queued, "duplicates": duplicates, "invalid": invalid, "rejected": rejected}
+        if rejected:
+            # Cola llena: el peer debe reintentar las transacciones rechazadas mas tarde
+            self.logger.warning(f"Ingestion queue full, rejected {rejected} transactions")
+            response = jsonify({"status": "Ingestion queue full", **result})
+            response.headers["Retry-After"] = str(self.ingestion.retry_after())
+            return response, 429
+        if invalid == len(transaction_dicts):
+            return jsonify({"error": "Invalid transaction", **result}), 400
+        status = "Transactions queued" if queued else "Transactions already seen, ignored"
+        return jsonify({"status": status, **result}), 202 if queued else 200
 
     # Process Received Transaction
     def process_received_transaction(self, transaction_dict):
         #self.logger.info(f"\nProcessing received transaction dict: {transaction_dict}")
         transaction = Transaction.from_dict(transaction_dict)
         #self.logger.info(f"\nProcessing received transaction: {transaction}")
-        # Add transaction to pending list or other processing
-        self.descentrachain.add_transaction(transaction)
+        # Add transaction to the mempool, duplicates are ignored
+        with self.chain_lock:
+            added = self.descentrachain.add_transaction(transaction)
+        if not added:
+            self.logger.info(f"Transaction already pending or mempool full, ignored")
 
         # # Check if the pending transactions queue is full
         # if len(self.descentrachain.pending_transactions) >= 5:
@@ -424,34 +610,191 @@ class Node:
         #self.logger.info(f"\nTransacciones pendientes tras anadir transaccion: {len(self.descentrachain.pending_transactions)}\n")
         #self.logger.info(f"\n\nDiccionario de wallets tras recibir transaccion: {self.descentrachain.print_wallets()}\n\n")
 
+    # Block Synchronization
+    def process_block_announcement(self, announcement):
+        height = announcement["height"]
+
+        with self.chain_lock:
+            chain = self.descentrachain.chain
+            local_length = len(chain)
+            known_hash = chain[height].hash if height < local_length else None
+        if known_hash == announcement["hash"]:
+            return "Already up to date"
+        if height < local_length:
+            # Bifurcacion que no es mas larga que la cadena local: se conserva la cadena local
+            return "Fork not longer than local chain, ignored"
+
+        return self.sync_blocks_from_node(announcement["origin"])
+
+    def sync_blocks_from_node(self, node_id):
+        with self.chain_lock:
+            from_height = len(self.descentrachain.chain)
+        url = f"http://{node_id}:6000/blocks"
+        try:
+            response = self.http.get(url, params={"from": from_height})
+            blocks = response.json()["blocks"]
+        except Exception as e:
+            self.logger.error(f"Error fetching blocks from {node_id}: {e}")
+            return "Sync failed"
+
+        # Los bloques se descargan sin el lock, solo su aplicacion bloquea la blockchain
+        diverged = False
+        with self.chain_lock:
+            try:
+                diverged = not all(self.descentrachain.add_block(block_dict) for block_dict in blocks)
+            except ValueError as e:
+                self.logger.error(f"Error applying blocks from {node_id}: {e}")
+                diverged = True
+            if not diverged:
+                self.refresh_wallet()
+        if diverged:
+            return self.full_sync_from_node(node_id)
+
+        self.logger.info(f"Applied {len(blocks)} blocks from {node_id}, height: {len(self.descentrachain.chain)}")
+        return "Blocks applied"
+
+    def full_sync_from_node(self, node_id):
+        # Descarga la cadena completa y reconstruye el estado localmente a partir de los bloques
+        url = f"http://{node_id}:6000/blocks"
+        self.logger.info(f"Chain diverged from {node_id}, requesting all blocks")
+        try:
+            response = self.http.get(url, params={"from": 0})
+            new_chain = [Block.from_dict(block_dict) for block_dict in response.json()["blocks"]]
+        except Exception as e:
+            self.logger.error(f"Error fetching blocks from {node_id}: {e}")
+            return "Sync failed"
+
+        # El estado se reconstruye localmente (desde un checkpoint propio o el genesis): no se importan checkpoints
+        # de otros nodos, un peer con una cadena mas larga podria enviar cualquier balance con un state_hash correcto
+        with self.chain_lock:
+            if not self.descentrachain.update_chain(new_chain):
+                self.logger.error(f"Chain received from {node_id} is not valid or not longer than the local chain")
+                return "Sync failed"
+
+            self.refresh_wallet()
+        return "Blockchain replaced"
+
+    # Light Node Synchronization
+    def process_header_announcement(self, announcement):
+        height = announcement["height"]
+        headers = self.header_chain.headers
+        if height < len(headers) and headers[height]["hash"] == announcement["hash"]:
+            return "Already up to date"
+        return self.sync_headers_from_node(announcement["origin"])
+
+    def sync_headers_from_node(self, node_id):
+        url = f"http://{node_id}:6000/headers"
+        try:
+            response = self.http.get(url, params={"from": len(self.header_chain)})
+            headers = response.json()["headers"]
+            if self.header_chain.add_headers(headers):
+                self.logger.info(f"Applied {len(headers)} headers from {node_id}, height: {len(self.header_chain)}")
+                return "Headers applied"
+
+            # Las cabeceras no continuan la cadena local, se descargan todas
+            response = self.http.get(url, params={"from": 0})
+            if self.header_chain.replace_headers(response.json()["headers"]):
+                self.logger.info(f"Header chain replaced from {node_id}, height: {len(self.header_chain)}")
+                return "Headers replaced"
+        except Exception as e:
+            self.logger.error(f"Error fetching headers from {node_id}: {e}")
+            return "Sync failed"
+
+        self.logger.error(f"Headers received from {node_id} are not valid")
+        return "Sync failed"
+
+    def verify_transaction_inclusion(self, tx_id):
+        # Pide la prueba a los nodos completos y la comprueba contra las cabeceras locales
+        for peer in self.node_addresses:
+            url = f"http://{peer['id']}:6000/proof/{tx_id}"
+            try:
+                response = self.http.get(url)
+                if response.status_code != 200:
+                    continue
+                proof = response.json()
+                if proof["block_index"] >= len(self.header_chain):
+                    self.sync_headers_from_node(peer["id"])
+            except Exception as e:
+                self.logger.error(f"Error fetching proof for {tx_id} from {peer['id']}: {e}")
+                continue
+
+            if self.header_chain.verify_proof(proof, tx_id):
+                return {
+                    "tx_id": tx_id,
+                    "included": True,
+                    "block_index": proof["block_index"],
+                    "confirmations": self.header_chain.confirmations(proof["block_index"]),
+                    "transaction": Transaction.decode(base64.b64decode(proof["transaction"])).to_dict_with_signature()
+                }
+            self.logger.error(f"Invalid proof for {tx_id} from {peer['id']}")
+        return {"tx_id": tx_id, "included": False}
+
+    def get_metrics(self):
+        if self.light:
+            metrics = {"height": len(self.header_chain)}
+        else:
+            metrics = {
+                "height": len(self.descentrachain.chain),
+                "pending_transactions": len(self.descentrachain.pending_transactions),
+                "signature_cache": SIGNATURE_CACHE.stats()
+            }
+        metrics.update({
+            "gossip": self.gossip.stats(),
+            "coalescer": self.coalescer.stats(),
+            "ingestion": self.ingestion.stats(),
+            "broadcast": self.broadcaster.stats(),
+            "http": self.http.stats()
+        })
+        return metrics
+
+    # Actualiza la wallet del nodo con la informacion de la blockchain local
+    def refresh_wallet(self):
+        self.wallet.set_blockchain(self.descentrachain)
+        if self.wallet_address in self.descentrachain.wallets:
+            wallet_info = self.descentrachain.get_wallet_info(self.wallet_address)
+            self.wallet.update_wallet_info(wallet_info)
+        self.wallet.update_balance()
+
     def validate_and_create_block_if_needed(self):
-        validator_address = self.descentrachain.choose_validator()
-        validator_wallet = self.descentrachain.wallets.get(validator_address)
-        self.logger.info(f"Validating and creating block with validator {validator_wallet.address}")
-        reward_transaction = self.descentrachain.validate_and_create_block(validator_wallet)
+        with self.chain_lock:
+            validator_address = self.descentrachain.choose_validator()
+            validator_wallet = self.descentrachain.wallets.get(validator_address)
+            self.logger.info(f"Validating and creating block with validator {validator_wallet.address}")
+            chain_length = len(self.descentrachain.chain)
+            reward_transaction = self.descentrachain.validate_and_create_block(validator_wallet)
         #self.logger.info(f"Wallets de la blockchain tras validar: {self.descentrachain.print_wallets()}\nTransacciones validadas: {self.descentrachain.print_validated_transactions()}\nTransacciones no validadas: {self.descentrachain.print_invalid_transactions()}")
-        self.broadcast_blockchain()
+        if len(self.descentrachain.chain) > chain_length:
+            self.broadcast_blockchain()
 
-        if reward_transaction != 0:
+        # Sin transacciones suficientes no se crea bloque ni recompensa (None)
+        if reward_transaction:
             self.broadcast_transaction(reward_transaction)
 
 # --------------------------------------------------------------------------------
 
 # Broadcasting Functions
 
-    # Broadcast Blockchain to All Known Nodes
+    # Announce the Last Block to a Random Fanout of Peers (relayed by gossip), peers pull the blocks they are missing from /blocks
     def broadcast_blockchain(self):
-        self.logger.info("Broadcasting blockchain...")
-        blockchain_dict = self.descentrachain.to_dict()
-        self.logger.info(f"\nBlockchain dict, broadcasting blockchain from node:{self.id}:\n{blockchain_dict}\n")
-        for peer in self.node_addresses:
-            self.send_blockchain_to_node(peer, blockchain_dict)
-        self.logger.info("Blockchain broadcasted.")
+        self.logger.info("Broadcasting new block...")
+        last_block = self.descentrachain.get_last_block()
+        announcement = {
+            "origin": self.id,
+            "height": last_block.index,
+            "hash": last_block.hash,
+            "previous_hash": last_block.previous_hash
+        }
+        queued = self.gossip.publish(self.node_addresses, "announce_block", last_block.hash, announcement)
+        self.logger.info(f"New block announcement queued for {queued} peers.")
 
-    # Broadcast Transaction to All Known Nodes (remain unchanged)
+    # Gossip a Transaction to a Random Fanout of Peers, returns once the sends are queued
     def broadcast_transaction(self, transaction_dict):
-        for peer in self.node_addresses:
-            self.send_transaction_to_node(peer, transaction_dict)
+        return self.gossip.publish(self.node_addresses, "transaction", self.transaction_gossip_id(transaction_dict), transaction_dict)
+
+    # Gossip Id of a Transaction: its signed digest, so a re-signed copy (malleated ECDSA signature) is a duplicate
+    @staticmethod
+    def transaction_gossip_id(transaction_dict):
+        return Transaction.from_dict(transaction_dict).digest.hex()
 
     
 
@@ -0,0 +1,87 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+BROADCAST_WORKERS = 8  # Hilos que envian mensajes a los peers en paralelo
+BROADCAST_MAX_PENDING = 1000  # Envios en cola como maximo; por encima se descartan (el peer se sincroniza despues)
+PEER_CONNECT_TIMEOUT = 1.0  # Segundos para conectar con un peer
+PEER_READ_TIMEOUT = 3.0  # Segundos para recibir la respuesta de un peer
+PEER_PORT = 6000
+LATENCY_EWMA_ALPHA = 0.2  # Peso de la ultima medicion en la latencia media de cada peer
+
+
+class PeerBroadcaster:
+    """
+    Envia mensajes a los peers desde un pool acotado de hilos. broadcast() solo encola los envios y retorna,
+    de forma que un peer lento o caido no bloquea el handler de Flask que origino el mensaje; cada envio
+    tiene su propio timeout. Se registra la latencia y los fallos de cada peer.
+    """
+
+    def __init__(self, workers=BROADCAST_WORKERS, max_pending=BROADCAST_MAX_PENDING,
+                 timeout=(PEER_CONNECT_TIMEOUT, PEER_READ_TIMEOUT), post=requests.post):
+        self.logger = logging.getLogger('PeerBroadcaster')
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="broadcast")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.timeout = timeout
+        self.post = post  # Funcion de envio (requests.post por defecto), con la misma firma
+        self.lock = threading.Lock()
+        self.peer_stats = {}  # peer id -> {"sent", "failed", "last_ms", "avg_ms", "max_ms"}
+        self.dropped = 0
+
+    def url_for(self, peer, path):
+        return f"http://{peer['id']}:{PEER_PORT}/{path}"
+
+    def broadcast(self, peers, path, payload):
+        # Encola el envio a cada peer y retorna el numero de envios encolados
+        queued = 0
+        for peer in peers:
+            if self.submit(peer, path, payload):
+                queued += 1
+        return queued
+
+    def submit(self, peer, path, payload):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.dropped += 1
+            self.logger.warning(f"Broadcast queue full, dropping {path} for {peer['id']}")
+            return False
+        future = self.executor.submit(self.send, peer, path, payload)
+        future.add_done_callback(lambda _: self.slots.release())
+        return True
+
+    def send(self, peer, path, payload):
+        # Envio bloqueante a un peer, se ejecuta en los hilos del pool. Retorna la respuesta o None si fallo
+        url = self.url_for(peer, path)
+        start = time.perf_counter()
+        try:
+            response = self.post(url, json=payload, timeout=self.timeout)
+            ok = response.status_code < 400
+        except Exception as e:
+            self.logger.error(f"Error sending {path} to {peer['id']}: {e}")
+            response, ok = None, False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if ok:
+            self.logger.info(f"{path} sent to {peer['id']} in {elapsed_ms:.1f} ms")
+        self.record(peer["id"], elapsed_ms, ok)
+        return response
+
+    def record(self, peer_id, elapsed_ms, ok):
+        with self.lock:
+            stats = self.peer_stats.setdefault(peer_id, {"sent": 0, "failed": 0, "last_ms": 0.0, "avg_ms": None, "max_ms": 0.0})
+            stats["sent"] += 1
+            if not ok:
+                stats["failed"] += 1
+            stats["last_ms"] = round(elapsed_ms, 2)
+            stats["max_ms"] = round(max(stats["max_ms"], elapsed_ms), 2)
+            previous = stats["avg_ms"]
+            average = elapsed_ms if previous is None else previous + LATENCY_EWMA_ALPHA * (elapsed_ms - previous)
+            stats["avg_ms"] = round(average, 2)
+
+    def stats(self):
+        with self.lock:
+            return {"dropped": self.dropped, "peers": {peer_id: dict(stats) for peer_id, stats in self.peer_stats.items()}}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
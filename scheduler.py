@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+
+EXECUTION_WORKERS = 1  # Hilos para ejecutar grupos de transacciones sin conflictos, 1 = ejecucion en serie
+
+# Claves de estado compartido ademas de las direcciones
+STAKE_STATE = ("state", "stake")  # stakeholders, validators y selector de validadores
+WALLET_REGISTRY = ("state", "wallets")  # Registro de wallets (el orden de insercion forma parte del estado)
+
+STAKE_TYPES = ("Staking", "Unstaking", "Become validator", "Cease validator")
+# Transacciones que leen o modifican el estado de todas las wallets, se ejecutan solas y en su posicion
+BARRIER_TYPES = ("upload-IPFS",)
+
+
+def transaction_keys(transaction):
+    # Estado que lee o escribe una transaccion: remitente, destinatario y estado compartido segun el tipo
+    keys = {("address", transaction.sender), ("address", transaction.recipient)}
+    if transaction.type in STAKE_TYPES:
+        keys.add(STAKE_STATE)
+    if transaction.type == "Initialize wallet":
+        keys.add(WALLET_REGISTRY)
+    return keys
+
+
+def partition(items):
+    """
+    Divide una lista de (tx_hash, transaction) en grupos sin conflictos: dos transacciones que comparten
+    alguna clave de estado terminan en el mismo grupo. Cada grupo conserva el orden original.
+    """
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner = {}  # clave de estado -> primera transaccion que la usa
+    for i, (_, transaction) in enumerate(items):
+        for key in transaction_keys(transaction):
+            if key in owner:
+                root_a, root_b = find(owner[key]), find(i)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+            else:
+                owner[key] = i
+
+    groups = {}
+    for i in range(len(items)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def build_schedule(items):
+    # Fases en orden: grupos paralelos entre barreras, y cada transaccion barrera en su propia fase
+    phases = []
+    segment = []
+    for i, (_, transaction) in enumerate(items):
+        if transaction.type in BARRIER_TYPES:
+            if segment:
+                phases.append(segment)
+            phases.append([i])
+            segment = []
+        else:
+            segment.append(i)
+    if segment:
+        phases.append(segment)
+    return phases
+
+
+class ConflictScheduler:
+    """
+    Ejecuta las transacciones de un bloque agrupadas por conflictos: los grupos que no comparten
+    direcciones ni estado se ejecutan en paralelo y el resultado es el mismo que en orden serie.
+    """
+
+    def __init__(self, workers=EXECUTION_WORKERS):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+
+    def run(self, items, apply):
+        # apply(tx_hash, transaction) -> resultado. Retorna los resultados en el orden de items
+        results = [None] * len(items)
+        if self.executor is None:
+            for i, (tx_hash, transaction) in enumerate(items):
+                results[i] = apply(tx_hash, transaction)
+            return results
+
+        def run_group(indexes):
+            for i in indexes:
+                tx_hash, transaction = items[i]
+                results[i] = apply(tx_hash, transaction)
+
+        for phase in build_schedule(items):
+            phase_items = [items[i] for i in phase]
+            groups = [[phase[j] for j in group] for group in partition(phase_items)]
+            if len(groups) == 1:
+                run_group(groups[0])
+                continue
+            futures = [self.executor.submit(run_group, group) for group in groups]
+            for future in futures:
+                future.result()  # Propaga las excepciones de los grupos
+        return results
@@ -0,0 +1,61 @@
+import hashlib
+import math
+import threading
+
+SEEN_CAPACITY = 50000  # Identificadores por generacion del filtro
+SEEN_ERROR_RATE = 0.00001  # Probabilidad de tomar por repetido un mensaje nuevo (falso positivo)
+SEEN_GENERATIONS = 2  # Generaciones que se conservan; al llenarse la actual se descarta la mas antigua
+
+
+class RotatingBloomFilter:
+    """
+    Conjunto acotado de identificadores ya vistos (transacciones y bloques del gossip). Cada generacion es un
+    filtro de Bloom de tamano fijo; cuando la actual recibe capacity identificadores se abre una nueva y se
+    descarta la mas antigua, de forma que la memoria no crece con el trafico y un identificador se recuerda
+    al menos capacity * (generations - 1) inserciones. No hay falsos negativos dentro de esa ventana.
+    """
+
+    def __init__(self, capacity=SEEN_CAPACITY, error_rate=SEEN_ERROR_RATE, generations=SEEN_GENERATIONS):
+        self.capacity = capacity
+        self.generations = generations
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.filters = [bytearray((self.num_bits + 7) // 8)]  # La ultima es la generacion actual
+        self.count = 0  # Identificadores en la generacion actual
+        self.lock = threading.Lock()
+
+    def positions(self, key):
+        # Doble hashing: k posiciones a partir de dos valores de 64 bits de un unico hash
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def _contains(self, positions):
+        for bits in self.filters:
+            if all(bits[position >> 3] & (1 << (position & 7)) for position in positions):
+                return True
+        return False
+
+    def __contains__(self, key):
+        positions = self.positions(key)
+        with self.lock:
+            return self._contains(positions)
+
+    def add(self, key):
+        # Retorna True si el identificador no se habia visto (y lo registra), False si es un repetido
+        positions = self.positions(key)
+        with self.lock:
+            if self._contains(positions):
+                return False
+            if self.count >= self.capacity:
+                self.filters.append(bytearray(len(self.filters[-1])))
+                del self.filters[:-self.generations]
+                self.count = 0
+            bits = self.filters[-1]
+            for position in positions:
+                bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+            return True
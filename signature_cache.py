@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+
+SIGNATURE_CACHE_SIZE = 100000  # Numero maximo de resultados de verificacion guardados
+
+
+class SignatureCache:
+    """
+    Cache LRU de resultados de verificacion de firmas, clave (digest de la transaccion, firma, clave publica).
+    Evita repetir la verificacion ECDSA de una misma transaccion en rondas de validacion y resincronizaciones,
+    tanto si la firma era valida como si no.
+    """
+
+    def __init__(self, maxsize=SIGNATURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # Se consulta desde los hilos de Flask y del planificador de ejecucion
+
+    @staticmethod
+    def make_key(digest, signature, public_key_bytes):
+        return (digest, signature, public_key_bytes)
+
+    def get(self, key):
+        # Retorna True / False si el resultado esta en cache, None si no
+        with self.lock:
+            result = self.results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.results),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Cache compartida por todas las wallets y el verificador de firmas del nodo
+SIGNATURE_CACHE = SignatureCache()
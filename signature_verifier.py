@@ -0,0 +1,107 @@
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from cryptography.hazmat.primitives import serialization
+from wallet import verify_digest, public_key_bytes
+from signature_cache import SIGNATURE_CACHE, SignatureCache
+
+SIGNATURE_VERIFY_WORKERS = 4  # Tamano del pool de verificacion de firmas
+SIGNATURE_VERIFY_USE_PROCESSES = True  # Pool de procesos (paralelismo real) o de hilos
+SIGNATURE_PARALLEL_MIN_BATCH = 16  # Por debajo de este numero de firmas se verifica en serie, el pool no compensa
+
+
+def verify_pem_item(item):
+    # Se ejecuta en los procesos del pool: la clave publica llega como PEM porque los objetos clave no se pueden serializar
+    public_key_pem, signature, digest = item
+    public_key = serialization.load_pem_public_key(public_key_pem)
+    return verify_digest(public_key, signature, digest)
+
+
+def verify_item(item):
+    public_key, signature, digest = item
+    return verify_digest(public_key, signature, digest)
+
+
+class SignatureVerifier:
+    """
+    Verifica en paralelo las firmas ECDSA de un lote de transacciones.
+    Es una etapa sin estado: solo depende de la clave publica, la firma y el digest de cada transaccion.
+    """
+
+    def __init__(self, workers=SIGNATURE_VERIFY_WORKERS, use_processes=SIGNATURE_VERIFY_USE_PROCESSES,
+                 min_batch=SIGNATURE_PARALLEL_MIN_BATCH, cache=SIGNATURE_CACHE):
+        self.workers = workers
+        self.use_processes = use_processes
+        self.min_batch = min_batch
+        self.cache = cache  # Resultados de verificaciones anteriores, solo se envian al pool las firmas no verificadas
+        self.executor = None  # Se crea al primer lote que lo necesita y se reutiliza
+        self.lock = threading.Lock()  # El verificador compartido se puede usar desde varios hilos
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                self.executor = executor_class(max_workers=self.workers)
+            return self.executor
+
+    def verify_batch(self, items):
+        # items: lista de (public_key, signature, digest). Retorna una lista de bool en el mismo orden
+        results = [None] * len(items)
+        cache_keys = [None] * len(items)
+        missing = []
+        for i, (public_key, signature, digest) in enumerate(items):
+            cache_keys[i] = SignatureCache.make_key(digest, signature, public_key_bytes(public_key))
+            results[i] = self.cache.get(cache_keys[i])
+            if results[i] is None:
+                missing.append(i)
+
+        verified = self._verify_uncached([items[i] for i in missing])
+        for i, result in zip(missing, verified):
+            results[i] = result
+            self.cache.put(cache_keys[i], result)
+        return results
+
+    def _verify_uncached(self, items):
+        if not self.workers or self.workers <= 1 or len(items) < self.min_batch:
+            return [verify_item(item) for item in items]
+
+        if self.use_processes:
+            pem_items = [
+                (public_key.public_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PublicFormat.SubjectPublicKeyInfo
+                ), signature, digest)
+                for public_key, signature, digest in items
+            ]
+            chunksize = max(1, len(pem_items) // (self.workers * 4))
+            return list(self._get_executor().map(verify_pem_item, pem_items, chunksize=chunksize))
+
+        return list(self._get_executor().map(verify_item, items))
+
+    def close(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+# Verificadores compartidos por todas las blockchains del proceso (uno por numero de workers). Las blockchains
+# temporales (from_dict, sincronizacion) no crean su propio pool de procesos; se cierran al terminar el proceso
+_shared_verifiers = {}
+_shared_verifiers_lock = threading.Lock()
+
+
+def get_shared_verifier(workers=SIGNATURE_VERIFY_WORKERS):
+    with _shared_verifiers_lock:
+        verifier = _shared_verifiers.get(workers)
+        if verifier is None:
+            verifier = _shared_verifiers[workers] = SignatureVerifier(workers=workers)
+        return verifier
+
+
+@atexit.register
+def close_shared_verifiers():
+    with _shared_verifiers_lock:
+        verifiers = list(_shared_verifiers.values())
+    for verifier in verifiers:
+        verifier.close()
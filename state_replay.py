@@ -0,0 +1,43 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from transaction import Transaction
+
+PARALLEL_REPLAY_MIN_BLOCKS = 500  # A partir de esta longitud de cadena se decodifican los bloques en un pool de procesos
+BLOCKS_IN_FLIGHT_PER_WORKER = 2  # Bloques enviados al pool por cada proceso, limita la memoria usada durante la reconstruccion
+
+
+def decode_block_transactions(encoded_transactions):
+    # Convierte las transacciones de un bloque (codificacion binaria) en instancias de Transaction
+    return [Transaction.decode(encoded) for encoded in encoded_transactions]
+
+
+def default_replay_workers(chain_length):
+    if chain_length < PARALLEL_REPLAY_MIN_BLOCKS:
+        return None
+    return os.cpu_count()
+
+
+def iter_block_transactions(blocks, workers=None):
+    """
+    Recorre los bloques en orden y entrega (bloque, transacciones decodificadas) de uno en uno.
+    Con workers > 1 la decodificacion se hace en un pool de procesos, manteniendo solo unos pocos
+    bloques decodificados en memoria a la vez.
+    """
+    if not workers or workers <= 1:
+        for block in blocks:
+            yield block, decode_block_transactions(block.transactions)
+        return
+
+    max_in_flight = workers * BLOCKS_IN_FLIGHT_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for block in blocks:
+            in_flight.append((block, executor.submit(decode_block_transactions, block.transactions)))
+            if len(in_flight) >= max_in_flight:
+                done_block, future = in_flight.popleft()
+                yield done_block, future.result()
+
+        while in_flight:
+            done_block, future = in_flight.popleft()
+            yield done_block, future.result()
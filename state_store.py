@@ -0,0 +1,304 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from account import Account
+
+STATE_SCHEMA_VERSION = "2"  # Version del esquema; desde la 2 balances en unidades enteras (INTEGER)
+NONE_ADDRESS = ""  # Las transacciones genesis tienen remitente None, en SQLite se guarda como cadena vacia
+
+
+def to_db_address(address):
+    return NONE_ADDRESS if address is None else address
+
+
+def from_db_address(address):
+    return None if address == NONE_ADDRESS else address
+
+
+class MemoryStateStore:
+    """
+    Estado de la blockchain en memoria (balances, registro de wallets, stakeholders y validadores).
+    Es el backend por defecto; las transacciones por bloque no hacen nada.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def attach(self, blockchain):
+        pass
+
+    def reset(self):
+        # Se crean objetos nuevos: las referencias anteriores conservan el estado previo
+        self.balances = {}
+        self.wallets = {}
+        self.stakeholders = []
+        self.validators = []
+        self.tip = None
+
+    @contextmanager
+    def transaction(self):
+        yield
+
+    def set_tip(self, height, block_hash):
+        self.tip = (height, block_hash)
+
+    def get_tip(self):
+        return self.tip
+
+    def close(self):
+        pass
+
+
+class SQLiteStateStore:
+    """
+    Estado de la blockchain en SQLite (modo WAL). Balances, wallets y listas de stakeholders y validadores
+    se consultan por direccion, sin cargar todo el estado en memoria, y se conservan entre reinicios.
+    Cada bloque se aplica dentro de una unica transaccion (transaction()), que se confirma al terminar el bloque.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Los hilos de Flask y del planificador de ejecucion comparten la conexion, protegida por un lock
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.in_transaction = False
+        self.execute("PRAGMA journal_mode=WAL")
+        self.execute("PRAGMA synchronous=NORMAL")
+        self.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._check_schema()
+        self.execute("""CREATE TABLE IF NOT EXISTS balances (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, address TEXT UNIQUE NOT NULL,
+            balance INTEGER NOT NULL, last_block_index INTEGER NOT NULL)""")
+        self.execute("""CREATE TABLE IF NOT EXISTS wallets (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, address TEXT UNIQUE NOT NULL, data TEXT NOT NULL)""")
+        self.execute("""CREATE TABLE IF NOT EXISTS address_lists (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, list TEXT NOT NULL, address TEXT NOT NULL, UNIQUE (list, address))""")
+        self.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema', ?)", (STATE_SCHEMA_VERSION,))
+
+        self.balances = SQLiteBalances(self)
+        self.wallets = SQLiteWallets(self)
+        self.stakeholders = SQLiteAddressList(self, "stakeholders")
+        self.validators = SQLiteAddressList(self, "validators")
+
+    def attach(self, blockchain):
+        pass
+
+    def _check_schema(self):
+        # El estado se deriva de la cadena: una base de datos de otra version se descarta y se reconstruye al arrancar
+        rows = self.execute("SELECT value FROM meta WHERE key = 'schema'")
+        if rows and rows[0][0] == STATE_SCHEMA_VERSION:
+            return
+        for table in ("balances", "wallets", "address_lists"):
+            self.execute(f"DROP TABLE IF EXISTS {table}")
+        self.execute("DELETE FROM meta")
+
+    def execute(self, sql, parameters=()):
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def reset(self):
+        with self.transaction():
+            for table in ("balances", "wallets", "address_lists"):
+                self.execute(f"DELETE FROM {table}")
+            self.execute("DELETE FROM meta WHERE key != 'schema'")
+            self.wallets.discard()
+
+    @contextmanager
+    def transaction(self):
+        # Transaccion de un bloque; si ya hay una abierta, las operaciones forman parte de ella
+        if self.in_transaction:
+            yield
+            return
+        self.execute("BEGIN")
+        self.in_transaction = True
+        try:
+            yield
+            self.wallets.flush()
+            self.execute("COMMIT")
+        except BaseException:
+            self.execute("ROLLBACK")
+            self.wallets.discard()
+            raise
+        finally:
+            self.in_transaction = False
+
+    def set_tip(self, height, block_hash):
+        # Ultimo bloque aplicado al estado, al reiniciar indica si el estado corresponde a la cadena
+        self.execute("INSERT INTO meta (key, value) VALUES ('tip', ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                     (json.dumps([height, block_hash]),))
+
+    def get_tip(self):
+        rows = self.execute("SELECT value FROM meta WHERE key = 'tip'")
+        return tuple(json.loads(rows[0][0])) if rows else None
+
+    def close(self):
+        self.wallets.flush()
+        self.connection.close()
+
+
+class SQLiteBalances:
+    # Registro de balances con la interfaz de dict: address -> {"balance", "last_block_index"}, en orden de insercion
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, address, default=None):
+        rows = self.store.execute("SELECT balance, last_block_index FROM balances WHERE address = ?", (to_db_address(address),))
+        if not rows:
+            return default
+        return {"balance": rows[0][0], "last_block_index": rows[0][1]}
+
+    def __getitem__(self, address):
+        entry = self.get(address)
+        if entry is None:
+            raise KeyError(address)
+        return entry
+
+    def __setitem__(self, address, entry):
+        self.store.execute(
+            "INSERT INTO balances (address, balance, last_block_index) VALUES (?, ?, ?) "
+            "ON CONFLICT(address) DO UPDATE SET balance = excluded.balance, last_block_index = excluded.last_block_index",
+            (to_db_address(address), entry["balance"], entry["last_block_index"])
+        )
+
+    def pop(self, address):
+        entry = self[address]
+        self.store.execute("DELETE FROM balances WHERE address = ?", (to_db_address(address),))
+        return entry
+
+    def __contains__(self, address):
+        return bool(self.store.execute("SELECT 1 FROM balances WHERE address = ?", (to_db_address(address),)))
+
+    def __len__(self):
+        return self.store.execute("SELECT COUNT(*) FROM balances")[0][0]
+
+    def items(self):
+        rows = self.store.execute("SELECT address, balance, last_block_index FROM balances ORDER BY seq")
+        return [(from_db_address(address), {"balance": balance, "last_block_index": last_block_index})
+                for address, balance, last_block_index in rows]
+
+    def keys(self):
+        return [address for address, _ in self.items()]
+
+    def values(self):
+        return [entry for _, entry in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        return dict(self.items()) == dict(other.items())
+
+
+class SQLiteWallets:
+    """
+    Registro de cuentas con la interfaz de dict. Las cuentas se guardan como el JSON de Account.to_dict();
+    las que se leen o modifican se mantienen en memoria (la blockchain modifica los objetos directamente)
+    y se escriben en la base de datos al confirmar la transaccion del bloque.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.loaded = {}  # address -> Account leida o anadida desde la ultima confirmacion
+        self.lock = threading.Lock()
+
+    def _load(self, address):
+        with self.lock:
+            wallet = self.loaded.get(address)
+        if wallet is not None:
+            return wallet
+        rows = self.store.execute("SELECT data FROM wallets WHERE address = ?", (address,))
+        if not rows:
+            return None
+        wallet = Account.from_dict(json.loads(rows[0][0]))
+        with self.lock:
+            return self.loaded.setdefault(address, wallet)
+
+    def get(self, address, default=None):
+        if address is None:
+            return default
+        wallet = self._load(address)
+        return wallet if wallet is not None else default
+
+    def __getitem__(self, address):
+        wallet = self.get(address)
+        if wallet is None:
+            raise KeyError(address)
+        return wallet
+
+    def __setitem__(self, address, wallet):
+        self.store.execute(
+            "INSERT INTO wallets (address, data) VALUES (?, ?) ON CONFLICT(address) DO UPDATE SET data = excluded.data",
+            (address, json.dumps(wallet.to_dict()))
+        )
+        with self.lock:
+            self.loaded[address] = wallet
+
+    def __contains__(self, address):
+        with self.lock:
+            if address in self.loaded:
+                return True
+        return bool(self.store.execute("SELECT 1 FROM wallets WHERE address = ?", (address,)))
+
+    def __len__(self):
+        return self.store.execute("SELECT COUNT(*) FROM wallets")[0][0]
+
+    def keys(self):
+        return [address for (address,) in self.store.execute("SELECT address FROM wallets ORDER BY seq")]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        for address in self.keys():
+            yield address, self._load(address)
+
+    def values(self):
+        for _, wallet in self.items():
+            yield wallet
+
+    def flush(self):
+        # Escribe las wallets cargadas (pueden haber sido modificadas) y las libera de memoria
+        with self.lock:
+            loaded, self.loaded = self.loaded, {}
+        for address, wallet in loaded.items():
+            self.store.execute("UPDATE wallets SET data = ? WHERE address = ?", (json.dumps(wallet.to_dict()), address))
+
+    def discard(self):
+        with self.lock:
+            self.loaded = {}
+
+
+class SQLiteAddressList:
+    # Lista de direcciones sin repetidos (stakeholders o validadores) con la interfaz de list
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+
+    def append(self, address):
+        self.store.execute("INSERT OR IGNORE INTO address_lists (list, address) VALUES (?, ?)", (self.name, address))
+
+    def extend(self, addresses):
+        for address in addresses:
+            self.append(address)
+
+    def remove(self, address):
+        self.store.execute("DELETE FROM address_lists WHERE list = ? AND address = ?", (self.name, address))
+
+    def __contains__(self, address):
+        return bool(self.store.execute("SELECT 1 FROM address_lists WHERE list = ? AND address = ?", (self.name, address)))
+
+    def __len__(self):
+        return self.store.execute("SELECT COUNT(*) FROM address_lists WHERE list = ?", (self.name,))[0][0]
+
+    def __iter__(self):
+        rows = self.store.execute("SELECT address FROM address_lists WHERE list = ? ORDER BY seq", (self.name,))
+        return iter([address for (address,) in rows])
+
+    def __eq__(self, other):
+        return list(self) == list(other)
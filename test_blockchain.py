@@ -2,12 +2,13 @@ import base64
 from blockchain import Blockchain
 from block import Block
 from transaction import Transaction
-from wallet import Wallet
-from descentracoin import DescentraCoin
+from wallet import Wallet, verify_transaction_signature
+from descentracoin import DescentraCoin, to_base_units
 
 
 def compare_wallets(wallet1, wallet2): # Funciona
-    attributes_to_compare = ['address', 'balance', 'is_stakeholder', 'staked_amount', 'is_validator', 'public_key']
+    # El registro de cuentas no guarda saldo, los balances se comparan en el registro de balances
+    attributes_to_compare = ['address', 'is_stakeholder', 'staked_amount', 'is_validator', 'public_key']
     for attr in attributes_to_compare:
         val1 = wallet1[attr] if isinstance(wallet1, dict) else getattr(wallet1, attr)
         val2 = wallet2[attr] if isinstance(wallet2, dict) else getattr(wallet2, attr)
@@ -80,7 +81,7 @@ def compare_blocks(block1, block2):
             print(f"Diferencia encontrada en {attr}: {getattr(block1, attr)} != {getattr(block2, attr)}")
             return False
 
-    # Comparar las transacciones como strings JSON
+    # Comparar las transacciones por su codificacion binaria
     if len(block1.transactions) != len(block2.transactions):
         print("El número de transacciones es diferente.")
         return False
@@ -330,3 +331,727 @@ if original_info != new_info:
     print("La actualización fue exitosa.")
 else:
     print("La actualización falló.")
+
+# 12. Sincronizacion incremental de bloques entre dos blockchains
+print("\n12. Probando sincronizacion incremental de bloques...")
+peer_blockchain = Blockchain.from_dict(DescentraChain.to_dict())
+wallet2.send_transaction(wallet1.address, DescentraCoin(20))
+wallet2.send_transaction(wallet1.address, DescentraCoin(5))
+DescentraChain.validate_and_create_block(DescentraChain.wallets.get("V" * 64))
+
+missing_blocks = DescentraChain.get_blocks_from(len(peer_blockchain.chain))
+applied = all(peer_blockchain.add_block(block_dict) for block_dict in missing_blocks)
+if applied and peer_blockchain.balances == DescentraChain.balances and peer_blockchain.get_last_block().hash == DescentraChain.get_last_block().hash:
+    print("Los bloques se aplicaron correctamente.")
+else:
+    print("La sincronizacion incremental falló.")
+
+# 13. Validacion incremental de la cadena
+print("\n13. Probando validacion incremental de la cadena...")
+verified_before = DescentraChain.verified_height
+DescentraChain.chain[1].timestamp += 1 # Alterar un bloque ya verificado no se vuelve a comprobar
+incremental_valid = DescentraChain.is_chain_valid()
+full_valid = DescentraChain.is_chain_valid(list(DescentraChain.chain))
+DescentraChain.chain[1].timestamp -= 1
+if verified_before == len(DescentraChain.chain) - 1 and incremental_valid and not full_valid:
+    print("Solo se verificaron los bloques nuevos.")
+else:
+    print("La validacion incremental falló.")
+
+fork_chain = list(DescentraChain.chain)
+if DescentraChain.find_common_ancestor(fork_chain) == len(DescentraChain.chain) - 1:
+    print("Ancestro comun encontrado correctamente.")
+else:
+    print("La busqueda del ancestro comun falló.")
+
+# Una cadena de la misma longitud o mas corta no reemplaza a la local
+local_tip = DescentraChain.get_last_block().hash
+if (not DescentraChain.update_chain(fork_chain) and not DescentraChain.update_chain(fork_chain[:-1])
+        and DescentraChain.get_last_block().hash == local_tip and len(DescentraChain.chain) == len(fork_chain)):
+    print("Solo se adoptan cadenas mas largas.")
+else:
+    print("El reemplazo de cadenas no mas largas falló.")
+
+# 14. Indice de direcciones frente a recorrer toda la cadena
+print("\n14. Probando indice de direcciones...")
+def scan_balance(chain, address):
+    balance = 0
+    for block in chain:
+        for encoded in block.transactions:
+            transaction = Transaction.decode(encoded)
+            if transaction.sender == address:
+                balance -= transaction.amount.value
+            if transaction.recipient == address:
+                balance += transaction.amount.value
+    return balance
+
+index_ok = all(DescentraChain.get_balance_blockchain(address).value == scan_balance(DescentraChain.chain, address) for address in DescentraChain.wallets)
+history = DescentraChain.get_address_history(wallet1.address, offset=0, limit=2)
+if index_ok and len(history) == 2 and DescentraChain.address_index.count(wallet1.address) == 4:
+    print("El indice de direcciones es correcto.")
+else:
+    print("El indice de direcciones falló.")
+
+# 15. Reconstruccion del estado a partir de la cadena
+print("\n15. Probando recalculate_balances...")
+live_state = (dict((k, dict(v)) for k, v in DescentraChain.balances.items()), list(DescentraChain.stakeholders), list(DescentraChain.validators), list(DescentraChain.wallets))
+DescentraChain.recalculate_balances()
+serial_state = (DescentraChain.balances, list(DescentraChain.stakeholders), list(DescentraChain.validators), list(DescentraChain.wallets))
+DescentraChain.recalculate_balances(workers=2)
+parallel_state = (DescentraChain.balances, DescentraChain.stakeholders, DescentraChain.validators, list(DescentraChain.wallets))
+if live_state == serial_state == parallel_state:
+    print("El estado reconstruido coincide con el estado original.")
+else:
+    print("La reconstruccion del estado falló.")
+
+# 16. Checkpoints del estado
+print("\n16. Probando checkpoints del estado...")
+import tempfile
+from checkpoint import CheckpointManager, is_valid_checkpoint
+DescentraChain.checkpoints = CheckpointManager(tempfile.mkdtemp(), interval=1)
+DescentraChain.save_checkpoint()
+checkpoint_state = (dict((k, dict(v)) for k, v in DescentraChain.balances.items()), list(DescentraChain.validators), list(DescentraChain.wallets))
+DescentraChain.recalculate_balances()
+if checkpoint_state == (DescentraChain.balances, DescentraChain.validators, list(DescentraChain.wallets)) and DescentraChain.checkpoints.load_latest_for_chain(DescentraChain.chain):
+    print("El estado restaurado desde el checkpoint es correcto.")
+else:
+    print("La restauracion desde el checkpoint falló.")
+valid_checkpoint = DescentraChain.create_checkpoint()
+forged_checkpoints = [
+    dict(valid_checkpoint, version=1),
+    dict(valid_checkpoint, hash="../../x"),
+    dict(valid_checkpoint, height="1"),
+    dict(valid_checkpoint, validators=valid_checkpoint["validators"] + [wallet1.address])
+]
+forged_rejected = 0
+for forged in forged_checkpoints:
+    try:
+        DescentraChain.checkpoints.write(forged)
+    except ValueError:
+        forged_rejected += 1
+if forged_rejected == len(forged_checkpoints) and is_valid_checkpoint(valid_checkpoint):
+    print("Los checkpoints alterados o con version, altura o hash invalidos se rechazan.")
+else:
+    print("La validacion de checkpoints falló.")
+DescentraChain.checkpoints = None
+
+# 17. Mempool sin duplicados y con tamano maximo
+print("\n17. Probando mempool...")
+from mempool import Mempool
+duplicated_tx = wallet1.send_transaction(wallet2.address, DescentraCoin(1))
+added_again = DescentraChain.add_transaction(Transaction.from_dict(duplicated_tx))
+small_mempool = Mempool(max_transactions=2)
+for amount in (1, 2, 3):
+    small_mempool.add(wallet1.create_transaction(wallet2.address, DescentraCoin(amount)))
+small_mempool.add(wallet2.create_transaction(wallet1.address, DescentraCoin(4)))
+remaining = [tx.amount.value for tx in small_mempool]
+if not added_again and len(DescentraChain.pending_transactions) == 1 and remaining == [1, 4]:
+    print("El mempool descarta duplicados y respeta el tamano maximo.")
+else:
+    print("El mempool falló.")
+# La misma transaccion con la firma alterada (s -> n - s sigue siendo valida) no es una transaccion nueva
+from cryptography.hazmat.primitives.asymmetric import utils as ec_utils
+SECP256R1_ORDER = 0xFFFFFFFF00000000FFFFFFFFFFFFFFFFBCE6FAADA7179E84F3B9CAC2FC632551
+malleable_mempool = Mempool()
+original_tx = wallet1.create_transaction(wallet2.address, DescentraCoin(2))
+original_tx.signature = wallet1.sign_transaction(original_tx)
+r, s_value = ec_utils.decode_dss_signature(original_tx.signature)
+malleated_tx = Transaction.from_dict(original_tx.to_dict_with_signature())
+malleated_tx.signature = ec_utils.encode_dss_signature(r, SECP256R1_ORDER - s_value)
+malleated_valid = verify_transaction_signature(malleated_tx, malleated_tx.signature, wallet1.public_key)
+if malleated_valid and malleated_tx.tx_id != original_tx.tx_id and malleable_mempool.add(original_tx) and not malleable_mempool.add(malleated_tx):
+    print("El mempool descarta una transaccion repetida con la firma alterada.")
+else:
+    print("El mempool acepto una transaccion con la firma alterada.")
+DescentraChain.pending_transactions.clear()
+
+# 18. Seleccion de validador ponderada por stake
+print("\n18. Probando seleccion de validador con arbol de Fenwick...")
+import random
+from validator_sampler import ValidatorSampler
+sampler = ValidatorSampler()
+for address, stake in (("a", 1), ("b", 0), ("c", 3), ("d", 5)):
+    sampler.set_weight(address, stake)
+sampler.remove("d")
+rng = random.Random(7)
+picks = [sampler.sample(rng) for _ in range(4000)]
+sampler_stake = DescentraChain.validator_sampler.weights[DescentraChain.validator_sampler.positions[wallet3.address]]
+if "b" not in picks and "d" not in picks and 2.5 < picks.count("c") / picks.count("a") < 3.5 and sampler_stake == DescentraChain.wallets[wallet3.address].staked:
+    print("La seleccion de validador es proporcional al stake.")
+else:
+    print("La seleccion de validador falló.")
+
+# 19. Verificacion de firmas en paralelo
+print("\n19. Probando verificacion de firmas en paralelo...")
+from signature_verifier import SignatureVerifier, get_shared_verifier
+signed_transactions = []
+for amount in range(1, 5):
+    transaction = wallet1.create_transaction(wallet2.address, DescentraCoin(amount))
+    transaction.signature = wallet1.sign_transaction(transaction)
+    signed_transactions.append((f"tx{amount}", transaction))
+signed_transactions[2][1].signature = signed_transactions[3][1].signature # Firma de otra transaccion
+shared_verifier = DescentraChain.signature_verifier
+DescentraChain.signature_verifier = SignatureVerifier(workers=2, min_batch=1)
+signature_results = DescentraChain.verify_signatures(signed_transactions, DescentraChain.wallets[wallet3.address])
+DescentraChain.signature_verifier.close()
+DescentraChain.signature_verifier = shared_verifier
+# Las blockchains temporales reutilizan el verificador (y su pool de procesos) en lugar de crear uno cada una
+shared_ok = shared_verifier is get_shared_verifier() and Blockchain.from_dict(DescentraChain.to_dict()).signature_verifier is shared_verifier
+if signature_results == {"tx1": True, "tx2": True, "tx3": False, "tx4": True} and shared_ok:
+    print("Las firmas se verificaron correctamente en paralelo.")
+else:
+    print("La verificacion de firmas en paralelo falló.")
+
+# 20. Ejecucion en paralelo de transacciones sin conflictos: mismo estado que en serie
+print("\n20. Probando determinismo de la ejecucion en paralelo...")
+from scheduler import ConflictScheduler, partition
+wallet4 = Wallet(DescentraChain, 30) # Transaccion Initialize wallet en el mismo lote
+batch = [DescentraChain.pending_transactions.drain()[0][1].to_dict_with_signature()]
+DescentraChain.pending_transactions.clear()
+for sender, recipient, amount in ((wallet1, wallet2, 3), (wallet2, wallet1, 7), (wallet2, wallet1, 100000), (wallet4, wallet1, 1)):
+    transaction = sender.create_transaction(recipient.address, DescentraCoin(amount))
+    transaction.signature = sender.sign_transaction(transaction)
+    batch.append(transaction.to_dict_with_signature())
+unstake = DescentraChain.local_wallets["S" * 64].create_transaction(wallet3.address, DescentraCoin(10), type="Unstaking")
+batch.append(unstake.to_dict_with_signature())
+restake = wallet3.create_transaction("S" * 64, DescentraCoin(5), type="Staking")
+restake.signature = wallet3.sign_transaction(restake)
+batch.append(restake.to_dict_with_signature())
+
+def run_batch(workers):
+    chain = Blockchain.from_dict(DescentraChain.to_dict())
+    chain.execution_scheduler = ConflictScheduler(workers=workers)
+    for tx_dict in batch:
+        chain.add_transaction(Transaction.from_dict(tx_dict))
+    chain.validate_and_create_block(chain.wallets["V" * 64])
+    return (list(chain.balances.items()), chain.stakeholders, chain.validators, list(chain.wallets),
+            [(w.is_stakeholder, w.is_validator, w.staked_amount.value) for w in chain.wallets.values()],
+            chain.get_last_block().transactions, [tx.to_dict_with_signature() for tx in chain.invalid_transactions])
+
+serial_result = run_batch(1)
+parallel_result = run_batch(4)
+groups = partition([(None, Transaction.from_dict(tx_dict)) for tx_dict in batch])
+if serial_result == parallel_result and len(groups) > 1 and len(serial_result[6]) > len(DescentraChain.invalid_transactions):
+    print("La ejecucion en paralelo produce el mismo estado que en serie.")
+else:
+    print("La ejecucion en paralelo falló.")
+
+# 21. Cache de verificacion de firmas
+print("\n21. Probando cache de verificacion de firmas...")
+from signature_cache import SIGNATURE_CACHE
+SIGNATURE_CACHE.clear()
+first_round = DescentraChain.verify_signatures(signed_transactions, DescentraChain.wallets[wallet3.address])
+second_round = DescentraChain.verify_signatures(signed_transactions, DescentraChain.wallets[wallet3.address])
+stats = SIGNATURE_CACHE.stats()
+if first_round == second_round == signature_results and stats["misses"] == 4 and stats["hits"] == 4:
+    print("La segunda ronda de verificacion se sirvio desde la cache.")
+else:
+    print("La cache de verificacion de firmas falló.")
+
+# 22. Codificacion binaria canonica de las transacciones
+print("\n22. Probando codificacion binaria de transacciones...")
+transaction = wallet1.create_transaction(wallet2.address, DescentraCoin(2.5))
+digest_before_signing = transaction.digest
+transaction.signature = wallet1.sign_transaction(transaction)
+decoded = Transaction.decode(transaction.encode())
+# Misma transaccion y misma firma con otra cantidad
+tampered = Transaction(transaction.sender, transaction.recipient, DescentraCoin(25), transaction.type,
+                       timestamp=transaction.timestamp, signature=transaction.signature)
+if (decoded.encode() == transaction.encode() and decoded.tx_id == transaction.tx_id
+        and decoded.digest == digest_before_signing and decoded.to_dict() == transaction.to_dict()
+        and wallet1.verify_signature(decoded, decoded.signature, wallet1.public_key)
+        and not wallet1.verify_signature(tampered, tampered.signature, wallet1.public_key)):
+    print("La codificacion binaria es canonica y la firma la cubre.")
+else:
+    print("La codificacion binaria de transacciones falló.")
+
+# 23. Raiz de Merkle en la cabecera del bloque
+print("\n23. Probando raiz de Merkle de los bloques...")
+from merkle import merkle_root, merkle_proof, verify_merkle_proof
+last_block = DescentraChain.get_last_block()
+tx_ids = last_block.get_tx_ids()
+proofs_ok = all(
+    verify_merkle_proof(tx_id, last_block.get_merkle_proof(position), last_block.merkle_root)
+    for position, tx_id in enumerate(tx_ids)
+)
+sizes_ok = all(
+    verify_merkle_proof(ids[position], merkle_proof(ids, position), merkle_root(ids))
+    for ids in ([f"{i:064x}" for i in range(n)] for n in range(1, 8)) for position in range(len(ids))
+)
+block_dict = last_block.to_dict()
+block_dict["transactions"] = block_dict["transactions"][:-1] # Quitar una transaccion no coincide con el hash recibido
+truncated_block = Block.from_dict(block_dict)
+# Bloque almacenado con las transacciones alteradas: la cabecera y su hash siguen siendo los originales
+tampered_block = Block.decode(last_block.encode())
+tampered_block.transactions = truncated_block.transactions
+tampered_chain = DescentraChain.chain[:-1] + [tampered_block]
+tampered_rejected = tampered_block.hash == tampered_block.calculate_hash() and not DescentraChain.is_chain_valid(tampered_chain)
+if (proofs_ok and sizes_ok and truncated_block.hash != truncated_block.calculate_hash() and tampered_rejected
+        and Block.from_dict(last_block.to_dict()).calculate_hash() == last_block.hash and DescentraChain.is_chain_valid(list(DescentraChain.chain))):
+    print("La raiz de Merkle cubre las transacciones del bloque.")
+else:
+    print("La raiz de Merkle de los bloques falló.")
+
+# 24. Nodo ligero: cadena de cabeceras y pruebas de inclusion
+print("\n24. Probando cabeceras y pruebas de inclusion del nodo ligero...")
+from light_client import HeaderChain
+header_chain = HeaderChain()
+headers_ok = header_chain.add_headers(DescentraChain.get_headers_from(0))
+last_block = DescentraChain.get_last_block()
+tx_id = last_block.get_tx_ids()[-1]
+proof = DescentraChain.get_transaction_proof(tx_id)
+forged_proof = dict(proof, tx_id=DescentraChain.chain[0].get_tx_ids()[0])
+# Bytes que no son una transaccion, con el tx_id calculado sobre ellos
+garbage = b"\x01" + bytes(64)
+garbage_proof = dict(proof, tx_id=Transaction.compute_tx_id(garbage), transaction=base64.b64encode(garbage).decode('utf-8'))
+bad_headers = DescentraChain.get_headers_from(0)
+bad_headers[1]["merkle_root"] = "0" * 64 # Cabecera alterada, su hash ya no coincide
+if (headers_ok and header_chain.verify_proof(proof, tx_id) and not header_chain.verify_proof(forged_proof, forged_proof["tx_id"])
+        and not header_chain.verify_proof(proof, forged_proof["tx_id"])
+        and not header_chain.verify_proof(garbage_proof, garbage_proof["tx_id"])
+        and DescentraChain.get_transaction_proof("f" * 64) is None and not HeaderChain().add_headers(bad_headers)):
+    print("Las pruebas de inclusion se verifican contra las cabeceras.")
+else:
+    print("El nodo ligero falló.")
+
+# 25. Almacen de bloques en disco: la cadena sobrevive a un reinicio
+print("\n25. Probando almacen de bloques en disco...")
+import os
+from block_store import BlockStore, BLOCK_DATA_FILE
+store_dir = tempfile.mkdtemp()
+stored_chain = Blockchain(block_store=BlockStore(store_dir, fsync=False))
+stored_wallet = Wallet(stored_chain, 500)
+stored_wallet.send_transaction(stored_chain.wallets["V" * 64].address, DescentraCoin(40))
+stored_chain.validate_and_create_block(stored_chain.wallets.get("V" * 64))
+stored_wallet.send_transaction(stored_chain.wallets["V" * 64].address, DescentraCoin(10))
+stored_wallet.send_transaction(stored_chain.wallets["V" * 64].address, DescentraCoin(5))
+stored_chain.validate_and_create_block(stored_chain.wallets.get("V" * 64))
+stored_chain.chain.close()
+with open(os.path.join(store_dir, BLOCK_DATA_FILE), "ab") as data_file:
+    data_file.write(b"\x00\x00\x10\x00 bloque a medio escribir") # Escritura interrumpida
+reopened_store = BlockStore(store_dir, fsync=False)
+restarted_chain = Blockchain(block_store=reopened_store)
+middle_block = restarted_chain.chain[1]
+if (len(restarted_chain.chain) == 3 and restarted_chain.balances == stored_chain.balances
+        and restarted_chain.get_last_block().hash == stored_chain.get_last_block().hash
+        and reopened_store.get_by_hash(middle_block.hash).hash == middle_block.hash
+        and restarted_chain.is_chain_valid(list(restarted_chain.chain))):
+    print("La cadena se recupero del almacen de bloques.")
+else:
+    print("El almacen de bloques falló.")
+reopened_store.close()
+
+# 26. Estado en SQLite: mismo resultado que en memoria y se conserva entre reinicios
+print("\n26. Probando estado en SQLite...")
+from state_store import SQLiteStateStore
+state_dir = tempfile.mkdtemp()
+sqlite_chain = Blockchain(block_store=BlockStore(state_dir, fsync=False), state_store=SQLiteStateStore(os.path.join(state_dir, "state.db")))
+sqlite_wallet = Wallet(sqlite_chain, 5000)
+Wallet(sqlite_chain, 50)
+sqlite_chain.validate_and_create_block(sqlite_chain.wallets.get("V" * 64))
+sqlite_wallet.stake(DescentraCoin(2000))
+sqlite_wallet.send_transaction("V" * 64, DescentraCoin(25))
+sqlite_chain.validate_and_create_block(sqlite_chain.wallets.get("V" * 64))
+memory_copy = Blockchain.from_dict(sqlite_chain.to_dict())
+memory_copy.recalculate_balances()
+sqlite_state = (list(sqlite_chain.balances.items()), list(sqlite_chain.stakeholders), sqlite_chain.wallets[sqlite_wallet.address].staked_amount.value)
+sqlite_chain.chain.close()
+sqlite_chain.state.close()
+
+reopened_state = SQLiteStateStore(os.path.join(state_dir, "state.db"))
+tip_before_restart = reopened_state.get_tip()
+reopened_chain = Blockchain(block_store=BlockStore(state_dir, fsync=False), state_store=reopened_state)
+if (sqlite_state == (list(reopened_chain.balances.items()), list(reopened_chain.stakeholders), reopened_chain.wallets[sqlite_wallet.address].staked_amount.value)
+        and tip_before_restart == (2, reopened_chain.get_last_block().hash)
+        and sqlite_state[0] == list(memory_copy.balances.items()) and sqlite_state[1] == [sqlite_wallet.address]):
+    print("El estado en SQLite coincide con el estado en memoria y sobrevive al reinicio.")
+else:
+    print("El estado en SQLite falló.")
+reopened_chain.chain.close()
+reopened_state.close()
+
+# 27. Claves de la wallet en PEM: se parsean al primer uso y la serializacion se reutiliza
+print("\n27. Probando carga diferida de claves de la wallet...")
+lazy_dict = wallet1.to_dict()
+lazy_wallet = Wallet.from_dict(lazy_dict, DescentraChain)
+keys_not_parsed = lazy_wallet._public_key is None and lazy_wallet._private_key is None
+round_trip_equal = lazy_wallet.to_dict() == lazy_dict and lazy_wallet._public_key is None
+lazy_wallet.set_blockchain(DescentraChain)
+lazy_transaction = lazy_wallet.create_transaction("V" * 64, DescentraCoin(1))
+lazy_transaction.signature = lazy_wallet.sign_transaction(lazy_transaction)
+if (keys_not_parsed and round_trip_equal
+        and lazy_wallet.public_key == wallet1.public_key
+        and wallet1.verify_signature(lazy_transaction, lazy_transaction.signature, wallet1.public_key)):
+    print("Las claves de la wallet se cargan solo al usarlas.")
+else:
+    print("La carga diferida de claves falló.")
+
+# 28. Registro publico de cuentas: las claves privadas no salen de las wallets locales
+print("\n28. Probando registro publico de cuentas...")
+import json
+from account import Account
+account_chain = Blockchain()
+account_wallet = Wallet(account_chain, 100)
+exported = json.dumps(account_chain.to_dict())
+initialize_dict = account_chain.pending_transactions.drain()[0][1].to_dict_with_signature()
+registry_account = Account.from_dict(initialize_dict["new_wallet"])
+if ("PRIVATE KEY" not in exported and "private_key" not in initialize_dict["new_wallet"]
+        and registry_account.public_key == account_wallet.public_key
+        and account_chain.local_wallets[account_wallet.address] is account_wallet
+        and isinstance(account_chain.wallets["0" * 64], Account)):
+    print("El registro solo contiene cuentas publicas.")
+else:
+    print("El registro de cuentas falló.")
+
+# 29. Cantidades en unidades enteras: sin errores de redondeo acumulados en los balances
+print("\n29. Probando balances en unidades enteras...")
+units_chain = Blockchain()
+units_wallet = Wallet(units_chain, 1)
+Wallet(units_chain, 1)
+units_chain.validate_and_create_block(units_chain.wallets["V" * 64])
+for _ in range(10):
+    units_wallet.send_transaction("V" * 64, DescentraCoin(0.1))
+units_chain.validate_and_create_block(units_chain.wallets["V" * 64])
+units_balance = units_chain.balances[units_wallet.address]["balance"]
+# Un int como cantidad es ambiguo (DSC o unidades enteras): se exige DescentraCoin o base_units explicito
+try:
+    Transaction(units_wallet.address, "V" * 64, 5, "regular")
+    bare_int_rejected = False
+except TypeError:
+    bare_int_rejected = True
+explicit_units = Transaction(units_wallet.address, "V" * 64, None, "regular", base_units=5)
+if (units_balance == 0 and isinstance(units_balance, int) and units_chain.get_balance(units_wallet.address).value == 0
+        and units_wallet.calculate_transaction_fee_IPFS(3) == to_base_units(0.3)
+        and bare_int_rejected and explicit_units.amount_units == 5):
+    print("Los balances en unidades enteras son exactos.")
+else:
+    print("Los balances en unidades enteras fallaron.")
+
+# 30. Envio a peers en paralelo: un peer lento o caido no bloquea al que hace el broadcast
+print("\n30. Probando envio de mensajes a peers en paralelo...")
+import time
+from peer_broadcaster import PeerBroadcaster
+
+class FakeResponse:
+    status_code = 200
+
+def fake_post(url, json=None, timeout=None):
+    if "slow" in url:
+        time.sleep(0.3)
+    if "down" in url:
+        raise ConnectionError("connection refused")
+    return FakeResponse()
+
+broadcaster = PeerBroadcaster(workers=3, post=fake_post)
+broadcast_start = time.perf_counter()
+queued = broadcaster.broadcast([{"id": "node-slow"}, {"id": "node-down"}, {"id": "node-ok"}], "transaction", {"tx": 1})
+broadcast_elapsed = time.perf_counter() - broadcast_start
+broadcaster.close()
+peer_stats = broadcaster.stats()["peers"]
+if (queued == 3 and broadcast_elapsed < 0.1 and peer_stats["node-slow"]["last_ms"] >= 300
+        and peer_stats["node-down"]["failed"] == 1 and peer_stats["node-ok"] == {**peer_stats["node-ok"], "sent": 1, "failed": 0}):
+    print("Los mensajes a peers se envian en paralelo sin bloquear el broadcast.")
+else:
+    print("El envio a peers en paralelo falló.")
+
+# 31. Conexiones keep-alive por destino: las peticiones a un mismo peer reutilizan la conexion
+print("\n31. Probando reutilizacion de conexiones HTTP...")
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http_pool import HTTPSessionPool
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = b'{"message": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+peer_server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+threading.Thread(target=peer_server.serve_forever, daemon=True).start()
+peer_url = f"http://127.0.0.1:{peer_server.server_address[1]}/transaction"
+http_pool = HTTPSessionPool(pool_size=2)
+responses = [http_pool.post(peer_url, json={"tx": n}, timeout=2) for n in range(10)]
+http_stats = http_pool.stats()
+http_pool.close()
+peer_server.shutdown()
+peer_server.server_close()
+if (all(response.json() == {"message": "ok"} for response in responses)
+        and http_stats["destinations"][f"127.0.0.1:{peer_server.server_address[1]}"]["connections"] == 1
+        and http_stats["reuse_rate"] == 0.9):
+    print("Las peticiones a un mismo destino reutilizan la conexion.")
+else:
+    print("La reutilizacion de conexiones HTTP falló.")
+
+# 32. Gossip: cada nodo reenvia a unos pocos peers y descarta los repetidos
+print("\n32. Probando difusion por gossip...")
+import random
+from collections import deque
+from seen_filter import RotatingBloomFilter
+from gossip import GossipRelay
+
+seen_filter = RotatingBloomFilter(capacity=10, generations=2)
+first_seen = seen_filter.add("tx-a") and not seen_filter.add("tx-a")
+for n in range(25):
+    seen_filter.add(f"tx-{n}")
+forgotten = "tx-a" not in seen_filter and "tx-24" in seen_filter
+
+class QueueTransport:
+    # Entrega los envios en una cola comun, en lugar de por HTTP
+    def __init__(self, queue):
+        self.queue = queue
+
+    def submit(self, peer, path, payload):
+        self.queue.append((peer["id"], path, payload))
+        return True
+
+gossip_queue = deque()
+gossip_nodes = {f"node{n}": GossipRelay(QueueTransport(gossip_queue), fanout=3, ttl=6, rng=random.Random(n)) for n in range(30)}
+gossip_peers = {node_id: [{"id": other} for other in gossip_nodes if other != node_id] for node_id in gossip_nodes}
+gossip_payload = {"sender": "0" * 64, "recipient": "1" * 64, "amount": {"value": 1.0}}
+gossip_id = GossipRelay.payload_id(gossip_payload)
+origin_sends = gossip_nodes["node0"].publish(gossip_peers["node0"], "transaction", gossip_id, gossip_payload)
+gossip_messages = 0
+reached = {"node0"}
+while gossip_queue:
+    node_id, path, payload = gossip_queue.popleft()
+    gossip_messages += 1
+    if gossip_nodes[node_id].receive(GossipRelay.payload_id(payload)):
+        reached.add(node_id)
+        gossip_nodes[node_id].relay(gossip_peers[node_id], path, payload)
+duplicates = sum(node.stats()["duplicates"] for node in gossip_nodes.values())
+try:
+    gossip_nodes["node0"].publish(gossip_peers["node0"], "transaction", "none", None)  # Sin recompensa no hay transaccion
+    rejects_none = False
+except TypeError:
+    rejects_none = not gossip_queue
+if (first_seen and forgotten and origin_sends == 3 and len(reached) == 30 and rejects_none
+        and gossip_messages <= 30 * 3 and duplicates == gossip_messages - 29):
+    print("El gossip llega a todos los nodos y descarta los repetidos.")
+else:
+    print("La difusion por gossip falló.")
+
+# 33. Agrupacion de transacciones salientes: una peticion por peer con varias transacciones
+print("\n33. Probando agrupacion de transacciones salientes...")
+from coalescer import OutboundCoalescer
+
+class RecordingBroadcaster:
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, peer, path, payload):
+        self.sent.append((peer["id"], path, payload))
+        return True
+
+recording = RecordingBroadcaster()
+coalescer = OutboundCoalescer(recording, delay_ms=20, max_items=10)
+for n in range(25):
+    for peer_id in ("node1", "node2"):
+        coalescer.submit({"id": peer_id}, "transaction", {"n": n})
+coalescer.submit({"id": "node1"}, "announce_block", {"hash": "abc"})
+sent_before_delay = len(recording.sent)
+time.sleep(0.1)
+coalescer.close()
+batches = [(peer_id, [item["n"] for item in payload["transactions"]]) for peer_id, path, payload in recording.sent if path == "transactions"]
+node1_items = [n for peer_id, items in batches if peer_id == "node1" for n in items]
+coalesced_stats = coalescer.stats()
+# Despues de close no queda hilo que vacie los buffers: la transaccion se envia sin agrupar
+late_submitted = coalescer.submit({"id": "node1"}, "transaction", {"n": 25})
+late_sent = recording.sent[-1] == ("node1", "transactions", {"transactions": [{"n": 25}]}) and coalescer.stats()["pending"] == 0
+if (sent_before_delay == 5 and len(batches) == 6 and node1_items == list(range(25))
+        and ("node1", "announce_block", {"hash": "abc"}) in recording.sent
+        and coalesced_stats["items_per_batch"] == 8.33 and late_submitted and late_sent):
+    print("Las transacciones salientes se agrupan por peer.")
+else:
+    print("La agrupacion de transacciones salientes falló.")
+
+# 34. Cola de ingestion: las transacciones recibidas se procesan en un hilo y la cola llena se rechaza
+print("\n34. Probando cola de ingestion de transacciones...")
+import threading
+from ingestion_queue import IngestionQueue
+
+release_worker = threading.Event()
+ingested = []
+
+def slow_ingest(item):
+    release_worker.wait()
+    ingested.append(item)
+
+ingestion = IngestionQueue(slow_ingest, max_size=3)
+offers = [ingestion.offer(0)]
+time.sleep(0.05)  # El hilo toma la primera y queda esperando, en la cola caben 3 mas
+offers += [ingestion.offer(n) for n in range(1, 6)]
+full_stats = ingestion.stats()
+retry_after = ingestion.retry_after()
+time.sleep(0.05)
+release_worker.set()
+ingestion.close()
+final_stats = ingestion.stats()
+if (offers.count(False) == 2 and full_stats["depth"] == 3 and retry_after >= 1
+        and ingested == [n for n, accepted in enumerate(offers) if accepted]
+        and final_stats["processed"] == len(ingested) and final_stats["rejected"] == offers.count(False)
+        and final_stats["max_wait_ms"] >= 40 and final_stats["depth"] == 0):
+    print("La cola de ingestion procesa en orden y rechaza cuando esta llena.")
+else:
+    print("La cola de ingestion falló.")
+
+# 35. Reinicio de un nodo: las claves de las wallets especiales se conservan y se pueden crear wallets nuevas
+print("\n35. Probando reinicio con claves especiales persistidas...")
+from key_store import LocalKeyStore
+restart_dir = tempfile.mkdtemp()
+
+def open_restart_chain():
+    return Blockchain(block_store=BlockStore(restart_dir, fsync=False), state_store=SQLiteStateStore(os.path.join(restart_dir, "state.db")),
+                      key_store=LocalKeyStore(os.path.join(restart_dir, "special_keys.json")))
+
+def close_restart_chain(chain):
+    chain.chain.close()
+    chain.state.close()
+    chain.address_index.close()
+
+first_run = open_restart_chain()
+Wallet(first_run, 100)
+first_run.validate_and_create_block(first_run.wallets["V" * 64])
+genesis_pem = first_run.wallets["0" * 64].public_key_pem
+close_restart_chain(first_run)
+
+restarted_runs = []
+for drop_state in (False, True):  # Con el estado persistido y con el estado reconstruido desde los bloques
+    if drop_state:
+        os.remove(os.path.join(restart_dir, "state.db"))
+    restarted = open_restart_chain()
+    restarted_wallet = Wallet(restarted, 50)
+    initialize_transaction = restarted.pending_transactions.drain()[0][1]
+    restarted_runs.append(restarted.wallets["0" * 64].public_key_pem == genesis_pem
+                          and restarted.local_wallets["0" * 64].public_key_pem() == genesis_pem
+                          and verify_transaction_signature(initialize_transaction, initialize_transaction.signature,
+                                                           restarted.get_public_key("0" * 64)))
+    close_restart_chain(restarted)
+if all(restarted_runs):
+    print("El nodo reinicia con las mismas claves especiales y crea wallets nuevas.")
+else:
+    print("El reinicio con claves especiales falló.")
+
+# 36. Arbol de Merkle: un nodo interno no puede presentarse como transaccion
+print("\n36. Probando separacion de hojas y nodos internos de Merkle...")
+import hashlib
+from merkle import build_levels, NODE_PREFIX
+collision_ids = [hashlib.sha256(bytes([n])).hexdigest() for n in range(4)]
+collision_levels = build_levels(bytes.fromhex(tx_id) for tx_id in collision_ids)
+# Blob 0x01||L||R: antes su sha256 (su "tx_id") era el nodo interno, con el hermano como prueba llegaba a la raiz
+interior_blob = NODE_PREFIX + collision_levels[0][0] + collision_levels[0][1]
+forged_tx_id = hashlib.sha256(interior_blob).hexdigest()
+forged_proof = [["right", collision_levels[1][1].hex()]]
+if (not verify_merkle_proof(forged_tx_id, forged_proof, merkle_root(collision_ids))
+        and verify_merkle_proof(collision_ids[0], merkle_proof(collision_ids, 0), merkle_root(collision_ids))):
+    print("Las pruebas de Merkle no aceptan un nodo interno como transaccion.")
+else:
+    print("La separacion de hojas y nodos internos falló.")
+
+# 37. Adoptar una cadena con transacciones que siguen en el mempool local
+print("\n37. Probando adopcion de una cadena con transacciones pendientes...")
+source_chain = Blockchain()
+source_wallet = Wallet(source_chain, 100)
+source_chain.validate_and_create_block(source_chain.wallets["V" * 64])
+synced_chain = Blockchain.from_dict(source_chain.to_dict())
+for amount in (7, 3):
+    # La transaccion llega a los dos nodos, pero solo el origen la incluye en un bloque
+    synced_chain.add_transaction(Transaction.from_dict(source_wallet.send_transaction("V" * 64, DescentraCoin(amount))))
+source_chain.validate_and_create_block(source_chain.wallets["V" * 64])
+adopted = synced_chain.update_chain(list(source_chain.chain))
+synced_chain.validate_and_create_block(synced_chain.wallets["V" * 64]) # Con el mempool vacio no se vuelve a ejecutar nada
+if (adopted and len(synced_chain.pending_transactions) == 0 and len(synced_chain.chain) == len(source_chain.chain)
+        and synced_chain.balances[source_wallet.address] == source_chain.balances[source_wallet.address]):
+    print("Las transacciones de los bloques adoptados salen del mempool.")
+else:
+    print("La adopcion de una cadena con transacciones pendientes falló.")
+
+# 38. Cuentas especiales de una cadena adoptada de otro nodo
+print("\n38. Probando las claves de las cuentas especiales entre nodos...")
+other_node = Blockchain() # Genera sus propias claves especiales
+other_genesis_pem = other_node.wallets["0" * 64].public_key_pem
+other_node.update_chain(list(source_chain.chain))
+# Recompensa firmada por el nodo que creo la cadena, con su clave genesis
+peer_reward = Transaction.from_dict(source_chain.reward_function(source_wallet.address, 5))
+if (other_node.wallets["0" * 64].public_key_pem == source_chain.wallets["0" * 64].public_key_pem != other_genesis_pem
+        and other_node.wallets["S" * 64].public_key_pem == source_chain.wallets["S" * 64].public_key_pem
+        and other_node.is_transaction_valid(peer_reward, other_node.wallets[source_wallet.address])
+        and "0" * 64 not in other_node.local_wallets and other_node.reward_function(source_wallet.address, 5) is None):
+    print("Las cuentas especiales se toman del genesis de la cadena adoptada.")
+else:
+    print("Las cuentas especiales de la cadena adoptada fallaron.")
+
+# 39. Tarifa de subida a IPFS con tamanos fraccionarios en MB
+print("\n39. Probando la tarifa de IPFS con tamanos fraccionarios...")
+fee_wallet = Wallet(units_chain, 1)
+fees_ok = (fee_wallet.calculate_transaction_fee_IPFS(0.3) == to_base_units(0.03)
+           and fee_wallet.calculate_transaction_fee_IPFS(2.5) == to_base_units(0.25)
+           and fee_wallet.calculate_transaction_fee_IPFS(1e-12) == 1) # Como minimo una unidad
+upload_transaction = fee_wallet.upload_file(file_size=0.3)
+invalid_sizes_rejected = 0
+for invalid_size in (0, -1, float("nan"), float("inf"), "abc"):
+    try:
+        fee_wallet.calculate_transaction_fee_IPFS(invalid_size)
+    except ValueError:
+        invalid_sizes_rejected += 1
+if fees_ok and Transaction.from_dict(upload_transaction).amount_units == to_base_units(0.03) and invalid_sizes_rejected == 5:
+    print("La tarifa de IPFS cobra los MB exactos, tambien por debajo de 1 MB.")
+else:
+    print("La tarifa de IPFS con tamanos fraccionarios falló.")
+
+# 40. Wallet del nodo persistida en un almacen de claves
+print("\n40. Probando la wallet del nodo entre reinicios...")
+wallet_dir = tempfile.mkdtemp()
+node_wallet_store = LocalKeyStore(os.path.join(wallet_dir, "node_wallet.json"))
+node_run = Blockchain(block_store=BlockStore(wallet_dir, fsync=False), state_store=SQLiteStateStore(os.path.join(wallet_dir, "state.db")),
+                      key_store=LocalKeyStore(os.path.join(wallet_dir, "special_keys.json")))
+node_wallet = Wallet(node_run, 100)
+node_wallet_store.save([node_wallet])
+Wallet(node_run, 1) # Se necesita mas de una transaccion pendiente para crear el bloque
+node_run.validate_and_create_block(node_run.wallets["V" * 64])
+node_balance = node_run.get_balance_units(node_wallet.address)
+close_restart_chain(node_run)
+node_run = Blockchain(block_store=BlockStore(wallet_dir, fsync=False), state_store=SQLiteStateStore(os.path.join(wallet_dir, "state.db")),
+                      key_store=LocalKeyStore(os.path.join(wallet_dir, "special_keys.json")))
+reloaded_wallet = node_run.load_local_wallet(next(iter(node_wallet_store.load().values())))
+reloaded_transaction = Transaction.from_dict(reloaded_wallet.send_transaction("V" * 64, DescentraCoin(1)))
+if (reloaded_wallet.address == node_wallet.address and reloaded_wallet.balance_units == node_balance == to_base_units(100)
+        and verify_transaction_signature(reloaded_transaction, reloaded_transaction.signature, node_run.get_public_key(node_wallet.address))):
+    print("La wallet del nodo conserva su direccion y sus fondos tras reiniciar.")
+else:
+    print("La persistencia de la wallet del nodo falló.")
+close_restart_chain(node_run)
+
+# 41. Indice de direcciones persistido junto al almacen de bloques
+print("\n41. Probando el indice de direcciones persistido...")
+from address_index import AddressIndex, ADDRESS_INDEX_FILE
+index_dir = tempfile.mkdtemp()
+indexed_chain = Blockchain(block_store=BlockStore(index_dir, fsync=False))
+indexed_wallet = Wallet(indexed_chain, 100)
+Wallet(indexed_chain, 1)
+indexed_chain.validate_and_create_block(indexed_chain.wallets["V" * 64])
+index_path = os.path.join(index_dir, ADDRESS_INDEX_FILE)
+with open(index_path, "ab") as index_file:
+    index_file.write(b'{"index":2,"hash"') # Linea incompleta de una escritura interrumpida
+reopened_index = AddressIndex(index_path)
+loaded_blocks = reopened_index.load(indexed_chain.chain) # Sin decodificar ningun bloque
+other_chain_index = AddressIndex(index_path)
+discarded = other_chain_index.load(source_chain.chain) # Registro de otra cadena: se reconstruye desde los bloques
+if (loaded_blocks == len(indexed_chain.chain) and reopened_index.balances == indexed_chain.address_index.balances
+        and reopened_index.tx_locations == indexed_chain.address_index.tx_locations
+        and discarded == 0 and other_chain_index.balances == source_chain.address_index.balances):
+    print("El indice de direcciones se carga del disco y solo indexa los bloques nuevos.")
+else:
+    print("El indice de direcciones persistido falló.")
+for index in (reopened_index, other_chain_index, indexed_chain.address_index):
+    index.close()
+indexed_chain.chain.close()
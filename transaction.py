@@ -1,17 +1,45 @@
-from descentracoin import DescentraCoin
+from descentracoin import DescentraCoin, to_base_units
 import time
 import base64
+import hashlib
+import json
+import struct
+from encoding import pack_bytes, unpack_bytes, pack_text, unpack_text
+
+TRANSACTION_ENCODING_VERSION = 1 # Version de la codificacion binaria de las transacciones
 
 # GLOBAL_FEE = 1 # Tarifa global por transaccion
 
 class Transaction:
-    def __init__(self, sender, recipient, amount, type, new_wallet=None, timestamp=None, signature=None, file_size=None): #, fee=GLOBAL_FEE):
-        if amount.value <= 0:
+    # Sin __dict__ por instancia: el historial completo puede tener cientos de miles de transacciones en memoria
+    __slots__ = ("sender", "recipient", "amount_units", "type", "timestamp", "file_size", "_signature",
+                 "_new_wallet", "_new_wallet_bytes", "_signing_bytes", "_signing_end", "_digest", "_encoded", "_tx_id")
+
+    def __init__(self, sender, recipient, amount, type, new_wallet=None, timestamp=None, signature=None, file_size=None, *, base_units=None): #, fee=GLOBAL_FEE):
+        # amount es un DescentraCoin; una cantidad en unidades enteras se pasa explicitamente con base_units (y amount=None).
+        # Un int como amount se rechaza: no se puede saber si son DSC o unidades enteras.
+        # Se guarda en unidades enteras, la ejecucion y los balances operan con enteros y DescentraCoin solo se crea al consultar amount
+        if base_units is not None:
+            if amount is not None:
+                raise TypeError("Pass either amount or base_units, not both.")
+            if not isinstance(base_units, int) or isinstance(base_units, bool):
+                raise TypeError(f"base_units must be an int, got {base_units.__class__.__name__}")
+            amount_units = base_units
+        elif isinstance(amount, DescentraCoin):
+            amount_units = to_base_units(amount.value)
+        else:
+            raise TypeError(f"Transaction amount must be a DescentraCoin (or base_units=), got {amount.__class__.__name__}")
+        if amount_units <= 0:
             raise ValueError("Invalid transaction amount. It should be greater than zero.")
         self.sender = sender
         self.recipient = recipient
-        self.amount = amount
+        self.amount_units = amount_units
         # self.fee = DescentraCoin(fee)
+        self._signing_bytes = None # Codificacion de los campos firmados, se calcula una vez
+        self._signing_end = None # En las transacciones decodificadas, longitud de la parte firmada dentro de _encoded
+        self._digest = None
+        self._encoded = None # Codificacion completa (campos firmados, firma y wallet nueva)
+        self._tx_id = None
         self.signature = signature
         self.type = type
         
@@ -21,13 +49,140 @@ class Transaction:
             self.timestamp =  time.time()
 
         self.new_Wallet = new_wallet # Para el caso de creacion de wallets, necesitamos enviar la wallet para anadirla al registro de wallets de la blockchain
-                                    # Es el diccionario de la wallet
+                                    # Es el diccionario de la cuenta
+
+        self.file_size = int(file_size) if file_size is not None else None # Para el caso de subida de archivos, necesitamos enviar el tamano del archivo para calcular el fee y las recompensas de los demas nodos
+
+    @property
+    def amount(self):
+        return DescentraCoin.from_base_units(self.amount_units)
+
+    @property
+    def new_Wallet(self):
+        # En las transacciones decodificadas la cuenta se guarda como su JSON y se parsea solo si se consulta
+        if self._new_wallet is None and self._new_wallet_bytes:
+            self._new_wallet = json.loads(self._new_wallet_bytes)
+        return self._new_wallet
+
+    @new_Wallet.setter
+    def new_Wallet(self, new_wallet):
+        self._new_wallet = new_wallet
+        self._new_wallet_bytes = None
+
+    @property
+    def signature(self):
+        return self._signature
 
-        self.file_size = file_size # Para el caso de subida de archivos, necesitamos enviar el tamano del archivo para calcular el fee y las recompensas de los demas nodos
+    @signature.setter
+    def signature(self, signature):
+        # Cambiar la firma cambia la codificacion completa y el tx_id, pero no el digest firmado
+        self._signature = signature
+        self._encoded = None
+        self._tx_id = None
 
     def sign(self, signature):
             self.signature = signature
 
+    # Codificacion binaria canonica ---------------------------------------------------
+    # Los campos se codifican siempre en el mismo orden: version, tipo, remitente, destinatario,
+    # cantidad en unidades enteras, timestamp y tamano de archivo. Esa es la parte firmada;
+    # la codificacion completa anade la firma en bytes y la wallet nueva (JSON canonico).
+    # Los campos de una transaccion no se modifican despues de crearla, salvo la firma.
+
+    def signing_bytes(self):
+        if self._signing_bytes is None and self._encoded is not None and self._signing_end is not None:
+            # Transaccion decodificada: la parte firmada es un prefijo de la codificacion recibida, no se guarda aparte
+            return self._encoded[:self._signing_end]
+        if self._signing_bytes is None:
+            parts = [
+                struct.pack(">B", TRANSACTION_ENCODING_VERSION),
+                pack_text(self.type),
+                pack_text(self.sender),
+                pack_text(self.recipient),
+                struct.pack(">Qd", self.amount_units, float(self.timestamp)),
+            ]
+            if self.file_size is None:
+                parts.append(struct.pack(">B", 0))
+            else:
+                parts.append(struct.pack(">BQ", 1, self.file_size))
+            self._signing_bytes = b"".join(parts)
+        return self._signing_bytes
+
+    @property
+    def digest(self):
+        # SHA-256 de los campos firmados, es lo que se firma y verifica
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.signing_bytes()).digest()
+        return self._digest
+
+    def new_wallet_bytes(self):
+        if self._new_wallet_bytes is not None:
+            return self._new_wallet_bytes
+        if self._new_wallet is None:
+            return b""
+        wallet_dict = self._new_wallet if type(self._new_wallet) is dict else self._new_wallet.to_dict()
+        return json.dumps(wallet_dict, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+    def encode(self):
+        if self._encoded is None:
+            self._encoded = b"".join([
+                self.signing_bytes(),
+                pack_bytes(self.signature or b""),
+                pack_bytes(self.new_wallet_bytes(), ">I"),
+            ])
+        return self._encoded
+
+    @staticmethod
+    def compute_tx_id(encoded):
+        return hashlib.sha256(encoded).hexdigest()
+
+    @property
+    def tx_id(self):
+        # Identificador de la transaccion: hash de la codificacion completa (incluye la firma)
+        if self._tx_id is None:
+            self._tx_id = self.compute_tx_id(self.encode())
+        return self._tx_id
+
+    @classmethod
+    def decode(cls, encoded):
+        encoded = bytes(encoded)
+        (version,) = struct.unpack_from(">B", encoded, 0)
+        if version != TRANSACTION_ENCODING_VERSION:
+            raise ValueError(f"Unsupported transaction encoding version: {version}")
+        transaction_type, offset = unpack_text(encoded, 1)
+        sender, offset = unpack_text(encoded, offset)
+        recipient, offset = unpack_text(encoded, offset)
+        amount_units, timestamp = struct.unpack_from(">Qd", encoded, offset)
+        offset += struct.calcsize(">Qd")
+        (has_file_size,) = struct.unpack_from(">B", encoded, offset)
+        offset += 1
+        file_size = None
+        if has_file_size:
+            (file_size,) = struct.unpack_from(">Q", encoded, offset)
+            offset += 8
+        signing_end = offset
+        signature, offset = unpack_bytes(encoded, offset)
+        wallet_bytes, offset = unpack_bytes(encoded, offset, ">I")
+        if offset != len(encoded):
+            raise ValueError("Invalid transaction encoding: unexpected trailing bytes.")
+
+        transaction = cls(
+            sender=sender,
+            recipient=recipient,
+            amount=None,
+            base_units=amount_units,
+            type=transaction_type,
+            timestamp=timestamp,
+            signature=signature or None,
+            file_size=file_size
+        )
+        # La codificacion recibida ya es la canonica, no hace falta volver a generarla.
+        # La cuenta nueva se conserva como JSON (new_Wallet la parsea al consultarla)
+        transaction._new_wallet_bytes = wallet_bytes or None
+        transaction._signing_end = signing_end
+        transaction._encoded = encoded
+        return transaction
+
     def to_dict(self):
         return {
             "sender": self.sender,
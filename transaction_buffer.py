@@ -0,0 +1,76 @@
+import struct
+from array import array
+from transaction import Transaction
+
+LENGTH_PREFIX = struct.Struct(">I")  # Longitud de cada transaccion dentro del buffer
+
+
+class TransactionBuffer:
+    """
+    Transacciones codificadas de un bloque en un unico buffer contiguo: por cada transaccion su longitud (>I)
+    y su codificacion binaria, el mismo formato que usa Block.encode. Un array de offsets permite acceder a
+    cualquier transaccion sin un objeto bytes por transaccion; solo se decodifica la que se consulta.
+    Se comporta como una secuencia de solo lectura de codificaciones (len, indices, slices e iteracion).
+    """
+
+    __slots__ = ("buffer", "offsets")
+
+    def __init__(self, buffer=b"", offsets=None):
+        self.buffer = buffer  # Registros longitud + codificacion, uno tras otro
+        self.offsets = offsets if offsets is not None else array("Q")  # Inicio de cada codificacion en el buffer
+
+    @classmethod
+    def from_encoded(cls, encoded_transactions):
+        parts = []
+        offsets = array("Q")
+        position = 0
+        for encoded in encoded_transactions:
+            parts.append(LENGTH_PREFIX.pack(len(encoded)))
+            parts.append(encoded)
+            offsets.append(position + LENGTH_PREFIX.size)
+            position += LENGTH_PREFIX.size + len(encoded)
+        return cls(b"".join(parts), offsets)
+
+    @classmethod
+    def parse(cls, data, offset, count):
+        # Lee count registros de data a partir de offset sin copiar cada transaccion. Retorna (buffer, fin)
+        offsets = array("Q")
+        position = offset
+        for _ in range(count):
+            (length,) = LENGTH_PREFIX.unpack_from(data, position)
+            offsets.append(position + LENGTH_PREFIX.size - offset)
+            position += LENGTH_PREFIX.size + length
+        if position > len(data):
+            raise ValueError("Invalid block encoding: truncated transactions.")
+        return cls(bytes(data[offset:position]), offsets), position
+
+    def _bounds(self, position):
+        start = self.offsets[position]
+        (length,) = LENGTH_PREFIX.unpack_from(self.buffer, start - LENGTH_PREFIX.size)
+        return start, start + length
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[position] for position in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError("transaction position out of range")
+        start, end = self._bounds(key)
+        return self.buffer[start:end]
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def __eq__(self, other):
+        if isinstance(other, TransactionBuffer):
+            return self.buffer == other.buffer
+        return list(self) == list(other)
+
+    def decode(self, position):
+        # Decodifica solo la transaccion indicada
+        return Transaction.decode(self[position])
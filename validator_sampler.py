@@ -0,0 +1,91 @@
+import random
+
+
+class ValidatorSampler:
+    """
+    Seleccion de validadores ponderada por stake usando un arbol de Fenwick (Binary Indexed Tree).
+    Actualizar el stake de un validador y elegir un validador cuestan O(log n), sin recorrer todas las wallets.
+    """
+
+    def __init__(self):
+        self.tree = [0]  # Arbol de Fenwick, indexado desde 1
+        self.weights = []  # Stake de cada posicion
+        self.addresses = []  # Direccion de cada posicion (None si la posicion esta libre)
+        self.positions = {}  # address -> posicion
+        self.free_positions = []  # Posiciones liberadas por validadores eliminados, se reutilizan
+        self.total = 0
+
+    def __contains__(self, address):
+        return address in self.positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _prefix_sum(self, position):
+        # Suma de los pesos de las posiciones [0, position)
+        total = 0
+        while position > 0:
+            total += self.tree[position]
+            position -= position & -position
+        return total
+
+    def _add(self, position, delta):
+        i = position + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+        self.weights[position] += delta
+        self.total += delta
+
+    def _new_position(self):
+        if self.free_positions:
+            return self.free_positions.pop()
+        # Al anadir una hoja, el nodo nuevo cubre el rango (n - lowbit(n), n] del que ya se conocen los pesos
+        n = len(self.tree)
+        self.tree.append(self._prefix_sum(n - 1) - self._prefix_sum(n - (n & -n)))
+        self.weights.append(0)
+        self.addresses.append(None)
+        return n - 1
+
+    def set_weight(self, address, weight):
+        position = self.positions.get(address)
+        if position is None:
+            position = self._new_position()
+            self.positions[address] = position
+            self.addresses[position] = address
+        self._add(position, weight - self.weights[position])
+
+    def remove(self, address):
+        position = self.positions.pop(address, None)
+        if position is None:
+            return
+        self._add(position, -self.weights[position])
+        self.addresses[position] = None
+        self.free_positions.append(position)
+
+    def sample(self, rng=random):
+        # Elige una direccion con probabilidad proporcional a su stake, None si no hay stake
+        if self.total <= 0:
+            return None
+
+        pick = rng.uniform(0, self.total)
+        # Descenso por el arbol: posicion mas alta cuya suma acumulada es <= pick
+        position = 0
+        remaining = pick
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            next_position = position + step
+            if next_position < len(self.tree) and self.tree[next_position] <= remaining:
+                position = next_position
+                remaining -= self.tree[position]
+            step >>= 1
+
+        if position >= len(self.addresses):
+            return None
+        return self.addresses[position]
+
+    def rebuild(self, weights):
+        # weights: iterable de (address, stake)
+        self.__init__()
+        for address, weight in weights:
+            self.set_weight(address, weight)
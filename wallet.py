@@ -1,9 +1,12 @@
 import hashlib
+from decimal import Decimal, InvalidOperation
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import ec, utils # elliptic curve cryptography
 from cryptography.exceptions import InvalidSignature
-from descentracoin import DescentraCoin
+from descentracoin import DescentraCoin, to_base_units
 from transaction import Transaction
+from signature_cache import SIGNATURE_CACHE, SignatureCache
+from account import Account
 
 MIN_STAKE_AMOUNT = 1000 # Stake minimo para ser validador
 GENESIS_ADDRESS = "0" * 64  # Cadena de 64 ceros
@@ -13,12 +16,71 @@ BECOME_CEASE_VALIDATOR_COMISSION = 1 # Comision de transaccion para aplicar a va
 
 INITIAL_REWARD = 0.1 # Recompensa inicial por crear una wallet
 RATE_PER_MB = 0.1 # Tarifa por MB para subir archivos a IPFS
+RATE_PER_MB_UNITS = to_base_units(RATE_PER_MB) # Tarifa por MB en unidades enteras, la tarifa se calcula sin floats
+
+
+# Hash SHA-256 de la codificacion binaria de los campos firmados, la transaccion lo calcula una sola vez
+def transaction_digest(transaction):
+    return transaction.digest
+
+
+# Verifica una firma ECDSA sobre el digest de una transaccion, no depende de ninguna wallet
+def verify_digest(public_key, signature, digest):
+    try:
+        # El digest ya es un SHA-256, se firma y verifica directamente (Prehashed) sin volver a hashearlo
+        public_key.verify(signature, digest, ec.ECDSA(utils.Prehashed(hashes.SHA256())))
+        return True
+    except InvalidSignature:
+        return False
+
+
+# Bytes de la clave publica que identifican la clave en la cache de firmas
+def public_key_bytes(public_key):
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+# Como verify_digest, pero consultando primero la cache de verificaciones
+def verify_digest_cached(public_key, signature, digest):
+    cache_key = SignatureCache.make_key(digest, signature, public_key_bytes(public_key))
+    result = SIGNATURE_CACHE.get(cache_key)
+    if result is None:
+        result = verify_digest(public_key, signature, digest)
+        SIGNATURE_CACHE.put(cache_key, result)
+    return result
+
+
+# Comprueba si la clave pública es un objeto de tipo clave pública EC
+def is_valid_public_key(public_key):
+    return isinstance(public_key, ec.EllipticCurvePublicKey)
+
+
+# Verifica la firma de una transaccion con una clave publica (de una wallet local o de una cuenta del registro)
+def verify_transaction_signature(transaction, signature, public_key):
+    # Comprobación de la validez de la clave pública
+    if not is_valid_public_key(public_key):
+        print("Clave pública inválida.")
+        return False
+
+    # Hash SHA-256 de la codificacion binaria de la transacción
+    transaction_hash = transaction_digest(transaction)
+
+    # Verifica la firma usando la clave pública (o el resultado en cache de una verificacion anterior)
+    return verify_digest_cached(public_key, signature, transaction_hash)
 
 
 class Wallet:
 
     def __init__(self, blockchain=None, balance=INITIAL_REWARD, is_stakeholder=False, staked_amount=0, is_validator=False, is_genesis=False, is_staking=False, is_first_validator=False, empty=False, space=100, files_name_hash_list=[]): 
         
+        # Claves en PEM (tal como llegan en to_dict/from_dict) y objetos clave, que se cargan al primer uso
+        self._public_key = None
+        self._private_key = None
+        self._public_key_pem = None
+        self._private_key_pem = None
+
         # is_genesis, is_stacking, is_first_validator son billeteras especiales de la blockchain
         if empty == False:
             self.private_key = ec.generate_private_key(ec.SECP256R1())  
@@ -56,7 +118,7 @@ class Wallet:
                     self.become_validator()
             
             elif is_genesis or is_staking or is_first_validator:
-                self.blockchain.wallets[self.address] = self
+                self.blockchain.add_local_wallet(self)
                 
         elif empty: # Si tiene el atributo empty en True, se crea una wallet vacia sin llamar a ninguna funcion de la blockchain
             self.address = None
@@ -70,6 +132,67 @@ class Wallet:
             self.files_name_hash_list = None
 
    
+    # Saldo y stake: se guardan en unidades enteras, balance y staked_amount los exponen como DescentraCoin
+
+    @property
+    def balance(self):
+        return DescentraCoin.from_base_units(self.balance_units) if self.balance_units is not None else None
+
+    @balance.setter
+    def balance(self, amount):
+        self.balance_units = to_base_units(amount.value) if amount is not None else None
+
+    @property
+    def staked_amount(self):
+        return DescentraCoin.from_base_units(self.staked_units) if self.staked_units is not None else None
+
+    @staked_amount.setter
+    def staked_amount(self, amount):
+        self.staked_units = to_base_units(amount.value) if amount is not None else None
+
+    # Claves ---------------------------------------------------------------------------
+
+    @property
+    def public_key(self):
+        # La clave publica de una wallet recibida solo se parsea cuando se usa (verificar firmas)
+        if self._public_key is None and self._public_key_pem is not None:
+            self._public_key = serialization.load_pem_public_key(self._public_key_pem)
+        return self._public_key
+
+    @public_key.setter
+    def public_key(self, public_key):
+        self._public_key = public_key
+        self._public_key_pem = None
+
+    @property
+    def private_key(self):
+        if self._private_key is None and self._private_key_pem is not None:
+            self._private_key = serialization.load_pem_private_key(self._private_key_pem, password=None)
+        return self._private_key
+
+    @private_key.setter
+    def private_key(self, private_key):
+        self._private_key = private_key
+        self._private_key_pem = None
+
+    def public_key_pem(self):
+        # PEM de la clave publica, se serializa una sola vez y se reutiliza en cada to_dict
+        if self._public_key_pem is None and self._public_key is not None:
+            self._public_key_pem = self._public_key.public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+        return self._public_key_pem
+
+    def private_key_pem(self):
+        if self._private_key_pem is None and self._private_key is not None:
+            self._private_key_pem = self._private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+        return self._private_key_pem
+
     # Wallet methods--------------------------------------------------------------
 
     def add_file_name_hash(self, file_name, hash):
@@ -88,39 +211,38 @@ class Wallet:
 
     def update_balance_blockchain(self):
         # Metodo para actualizar el saldo de la cartera basado en la blockchain
-        self.balance = self.blockchain.get_balance_blockchain(self.address)
+        self.balance_units = self.blockchain.address_index.get_balance(self.address)
 
     def update_balance(self):
         # Metodo para actualizar el saldo de la cartera basado diccionario balances
-        self.balance = self.blockchain.get_balance(self.address)
+        self.balance_units = self.blockchain.get_balance_units(self.address)
 
     
-    def create_transaction(self, recipient, amount, type="regular", wallet=None, file_size=None):
-        # Metodo para crear una nueva transacción
-        transaction = Transaction(self.address, recipient, amount, type, wallet, file_size)
+    def create_transaction(self, recipient, amount, type="regular", wallet=None, file_size=None, base_units=None):
+        # Metodo para crear una nueva transacción; amount es un DescentraCoin, o None con la cantidad en base_units
+        transaction = Transaction(self.address, recipient, amount, type, wallet, file_size, base_units=base_units)
         return transaction
     
     # Metodo para firmar una transaccion
     def sign_transaction(self, transaction):
     
-        transaction_bytes = str(transaction.to_dict()).encode('utf-8') # Serializa la transacción a una representación en bytes    
-        # Calcula el hash SHA-256 de los datos de la transacción
-        transaction_hash = hashlib.sha256(transaction_bytes).digest()
+        # Hash SHA-256 de la codificacion binaria de la transacción
+        transaction_hash = transaction_digest(transaction)
         
         # Firma el hash de la transacción con la clave privada
         signature = self.private_key.sign(
             transaction_hash,
-            ec.ECDSA(hashes.SHA256())  # ECDSA (Elliptic Curve Digital Signature Algorithm) 
+            ec.ECDSA(utils.Prehashed(hashes.SHA256()))  # ECDSA (Elliptic Curve Digital Signature Algorithm) 
         )
         return signature
     
     # Método para enviar una transaccion, crea,firma y la agrega a las transacciones pendientes de blockchain
-    def send_transaction(self, recipient_address, amount, type="regular", wallet=None, file_size=None):
+    def send_transaction(self, recipient_address, amount, type="regular", wallet=None, file_size=None, base_units=None):
         # Crear y firmar en un solo paso
         if wallet != None:
-            wallet = wallet.to_dict() # En vez de almacenar el objeto, almacenamos el diccionario de la wallet
+            wallet = wallet.to_public_dict() # En vez de almacenar el objeto, almacenamos la cuenta publica (sin clave privada)
 
-        transaction = self.create_transaction(recipient_address, amount, type, wallet)
+        transaction = self.create_transaction(recipient_address, amount, type, wallet, base_units=base_units)
         transaction.signature = self.sign_transaction(transaction)
         
         # Añadir a transacciones pendientes en la blockchain
@@ -129,42 +251,19 @@ class Wallet:
 
     # Método para verificar la firma de una transacción
     def verify_signature(self, transaction, signature, public_key):
-        # Comprobación de la validez de la clave pública
-        if not self.is_valid_public_key(public_key):
-            print("Clave pública inválida.")
-            return False
-
-        # Serializa la transacción a una representación en bytes,
-        transaction_bytes = str(transaction.to_dict()).encode('utf-8')
-        
-        # Calcula el hash SHA-256 de los datos de la transacción
-        transaction_hash = hashlib.sha256(transaction_bytes).digest()
-
-        try:
-            # Verifica la firma usando la clave pública
-            public_key.verify(
-                signature,  # La firma de la transacción
-                transaction_hash,  # El hash de la transacción
-                ec.ECDSA(hashes.SHA256())
-            )
-            #print("La firma es válida.")
-            return True
-        except InvalidSignature:
-            #print("La firma es inválida.")
-            return False
+        return verify_transaction_signature(transaction, signature, public_key)
         
     def is_valid_public_key(self, public_key):
-        # Comprueba si la clave pública es un objeto de tipo clave pública EC
-        return isinstance(public_key, ec.EllipticCurvePublicKey)
+        return is_valid_public_key(public_key)
         
 
     # IPFS methods---------------------------------------------------------------------
 
     def upload_file(self, file_size, recipient_address=GENESIS_ADDRESS):
         print(file_size)
-        amount = self.calculate_transaction_fee_IPFS(file_size)
+        amount_units = self.calculate_transaction_fee_IPFS(file_size)
         #def send_transaction(self, recipient_address, amount, type="regular", wallet=None, file_size=None):
-        return self.send_transaction(recipient_address, DescentraCoin(amount=amount), type="upload-IPFS", file_size=file_size)
+        return self.send_transaction(recipient_address, None, type="upload-IPFS", file_size=file_size, base_units=amount_units)
 
 
     def download_file(self, recipient_address=GENESIS_ADDRESS):
@@ -172,10 +271,15 @@ class Wallet:
 
 
     def calculate_transaction_fee_IPFS(self, file_size):
-        # Convertir bytes a megabytes
-        size_in_mb = file_size / (1024 * 1024)
-        amount = size_in_mb * RATE_PER_MB       # Calcular la tarifa total
-        return amount
+        # Tarifa en unidades enteras para un tamano en MB (puede ser fraccionario, /upload recibe bytes / 2**20).
+        # Se convierte el valor exacto con Decimal, sin truncar los MB; como minimo 1 unidad, una transaccion no puede ser de 0
+        try:
+            size_mb = Decimal(str(file_size))
+        except InvalidOperation:
+            raise ValueError(f"Invalid file size: {file_size!r}")
+        if not size_mb.is_finite() or size_mb <= 0:
+            raise ValueError(f"Invalid file size: {file_size!r}")
+        return max(1, round(size_mb * RATE_PER_MB_UNITS))
 
     # Stakeholder methods--------------------------------------------------------------
 
@@ -208,19 +312,11 @@ class Wallet:
         """
         Convierte la instancia de Wallet en un diccionario.
         """
-        public_key_bytes = self.public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
+        # PEM en cache: una wallet sin cambios de claves no vuelve a serializarlas
+        public_key_bytes = self.public_key_pem()
         
-        # Asegúrate de que la clave privada esté presente antes de intentar serializarla
-        private_key_bytes = None
-        if self.private_key:
-            private_key_bytes = self.private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.PKCS8,
-                encryption_algorithm=serialization.NoEncryption()
-            )
+        # La clave privada puede no estar presente (wallets de otros nodos)
+        private_key_bytes = self.private_key_pem()
         
         return {
             "address": self.address,
@@ -229,11 +325,15 @@ class Wallet:
             "is_stakeholder": self.is_stakeholder,
             "is_validator": self.is_validator,
             "private_key": private_key_bytes.decode('utf-8') if private_key_bytes else None,
-            "public_key": public_key_bytes.decode('utf-8'),
+            "public_key": public_key_bytes.decode('utf-8') if public_key_bytes else None,
             "space": self.space,
             "files_name_hash_list": self.files_name_hash_list
         }
     
+    def to_public_dict(self):
+        # Solo la parte publica de la wallet (Account), es lo que se registra en la blockchain y se envia a otros nodos
+        return Account.from_wallet(self).to_dict()
+
     @staticmethod
     def from_dict(wallet_dict, blockchain):
         # Crear una instancia de Wallet sin inicializar balance y staked_amount
@@ -248,25 +348,20 @@ class Wallet:
         wallet.space = wallet_dict.get("space")  # Añadir asignación de space
         wallet.files_name_hash_list = wallet_dict.get("files_name_hash_list", [])  # Añadir asignación de files_name_hash_list con un valor predeterminado en caso de que no exista
 
-        # Cargar la clave pública desde la representación string en formato PEM
-        wallet.public_key = serialization.load_pem_public_key(
-            wallet_dict["public_key"].encode('utf-8')
-        )
+        # Las claves se guardan en PEM, se parsean la primera vez que se usan (public_key, private_key)
+        if wallet_dict.get("public_key"):
+            wallet._public_key_pem = wallet_dict["public_key"].encode('utf-8')
 
-        # Cargar la clave privada si está presente
+        # Clave privada si está presente
         if wallet_dict.get("private_key"):
-            wallet.private_key = serialization.load_pem_private_key(
-                wallet_dict["private_key"].encode('utf-8'),
-                password=None
-            )
+            wallet._private_key_pem = wallet_dict["private_key"].encode('utf-8')
 
         return wallet
     
     def update_wallet_info(self, wallet_info):
         if isinstance(wallet_info, tuple):
-            self.is_validator, self.is_stakeholder, balance_value, staked_amount_value = wallet_info
-            self.balance = DescentraCoin(balance_value)
-            self.staked_amount = DescentraCoin(staked_amount_value)
+            # Tupla de Blockchain.get_wallet_info, con saldo y stake en unidades enteras
+            self.is_validator, self.is_stakeholder, self.balance_units, self.staked_units = wallet_info
         elif isinstance(wallet_info, dict):
             self.is_validator = wallet_info.get("is_validator", self.is_validator)
             self.is_stakeholder = wallet_info.get("is_stakeholder", self.is_stakeholder)